@@ -0,0 +1,130 @@
+# binance/binance_http.py
+# Satu HTTP client async (httpx) untuk seluruh trafik REST Binance Futures:
+# preload, backfill, HTF & refresh universe. Koneksi keep-alive dipakai ulang
+# (tanpa handshake TCP+TLS per request), HTTP/2 kalau paket h2 tersedia,
+# dan jumlah koneksi ke fapi dibatasi BINANCE_HTTP_MAX_CONNECTIONS.
+# Setiap request lewat limiter request-weight (binance_ratelimit).
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from binance.binance_ratelimit import PRIORITY_BACKFILL, endpoint_weight, limiter
+from config import BINANCE_REST_URL, BINANCE_HTTP_MAX_CONNECTIONS, BINANCE_HTTP2
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# timeout default request REST (detik)
+HTTP_TIMEOUT_SECONDS = 10.0
+
+# client aktif + event loop pemiliknya (client httpx terikat ke 1 loop)
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_thread: Optional[threading.Thread] = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=BINANCE_REST_URL,
+        http2=BINANCE_HTTP2 and _HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=BINANCE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=BINANCE_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=60.0,
+        ),
+        # pool timeout longgar: request menunggu koneksi bebas, bukan gagal
+        timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, pool=60.0),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Client shared untuk event loop yang sedang berjalan (dibuat saat pertama
+    dipakai). Harus dipanggil dari dalam event loop.
+    """
+    global _client, _client_loop, _client_thread
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _new_client()
+        _client_loop = loop
+        _client_thread = threading.current_thread()
+        proto = "HTTP/2" if BINANCE_HTTP2 and _HTTP2_AVAILABLE else "HTTP/1.1"
+        print(f"Binance HTTP client siap ({proto}, maks {BINANCE_HTTP_MAX_CONNECTIONS} koneksi).")
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _client_loop
+    client = _client
+    _client = None
+    _client_loop = None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+async def get_json(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+    priority: int = PRIORITY_BACKFILL,
+) -> Any:
+    """
+    GET {BINANCE_REST_URL}{path} → JSON. Status non-2xx → httpx.HTTPStatusError.
+    Menunggu budget weight dulu (sesuai prioritas), lalu sinkron ke header
+    X-MBX-USED-WEIGHT-1M; 418/429 → limiter ditahan selama Retry-After.
+    """
+    await limiter.acquire(endpoint_weight(path, params), priority)
+    r = await get_client().get(path, params=params, timeout=timeout)
+
+    used = r.headers.get("X-MBX-USED-WEIGHT-1M")
+    if used is not None and used.isdigit():
+        limiter.sync_used_weight(int(used))
+    if r.status_code in (418, 429):
+        retry_after = r.headers.get("Retry-After")
+        limiter.ban(float(retry_after) if retry_after and retry_after.isdigit() else None, r.status_code)
+
+    r.raise_for_status()
+    return r.json()
+
+
+async def fetch_klines(
+    symbol: str,
+    interval: str,
+    limit: int,
+    start_time: Optional[int] = None,
+    priority: int = PRIORITY_BACKFILL,
+) -> list:
+    """
+    GET /fapi/v1/klines (list mentah dari Binance).
+    """
+    params: Dict[str, Any] = {"symbol": symbol.upper(), "interval": interval, "limit": int(limit)}
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    return await get_json("/fapi/v1/klines", params, priority=priority)
+
+
+def run_sync(coro_fn, *args, timeout: float = 60.0) -> Any:
+    """
+    Jalankan coroutine client dari thread biasa (mis. worker analisa / to_thread):
+    dikirim ke event loop pemilik client supaya pool koneksi tetap dipakai.
+    Tanpa loop aktif (script offline) → jalan di loop sementara.
+    """
+    loop = _client_loop
+    if loop is not None and loop.is_running():
+        if threading.current_thread() is _client_thread:
+            raise RuntimeError("run_sync dipanggil dari thread event loop; pakai await langsung")
+        return asyncio.run_coroutine_threadsafe(coro_fn(*args), loop).result(timeout)
+
+    async def _oneshot():
+        try:
+            return await coro_fn(*args)
+        finally:
+            await close_client()
+
+    return asyncio.run(_oneshot())
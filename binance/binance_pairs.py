@@ -1,25 +1,15 @@
 # binance/binance_pairs.py
 # Ambil dan filter pair USDT perpetual futures berdasarkan volume.
 
+import asyncio
 from typing import List, Dict
-import requests
 import pandas as pd
 
-from config import BINANCE_REST_URL
+from binance.binance_http import get_json
+from binance.binance_ratelimit import PRIORITY_UNIVERSE
 
 
-def get_usdt_pairs(max_pairs: int, min_volume_usdt: float) -> List[str]:
-    """
-    Ambil semua pair USDT PERPETUAL yang statusnya TRADING,
-    lalu filter hanya yang 24h quote volume >= min_volume_usdt USDT.
-    Return: list symbol lower-case (ethusdt, btcusdt, ...)
-    """
-    # 1) Ambil info exchange untuk filter symbol yang valid
-    info_url = f"{BINANCE_REST_URL}/fapi/v1/exchangeInfo"
-    r = requests.get(info_url, timeout=10)
-    r.raise_for_status()
-    info = r.json()
-
+def _usdt_perpetuals(info: dict) -> List[str]:
     usdt_symbols: List[str] = []
     for s in info.get("symbols", []):
         if (
@@ -28,18 +18,50 @@ def get_usdt_pairs(max_pairs: int, min_volume_usdt: float) -> List[str]:
             and s.get("contractType") == "PERPETUAL"
         ):
             usdt_symbols.append(s["symbol"])
+    return usdt_symbols
+
+
+async def get_usdt_perpetuals() -> List[str]:
+    """
+    Daftar symbol USDT PERPETUAL yang TRADING (uppercase) dari exchangeInfo.
+    """
+    info = await get_json("/fapi/v1/exchangeInfo", priority=PRIORITY_UNIVERSE)
+    return _usdt_perpetuals(info)
+
+
+async def get_quote_volumes() -> Dict[str, float]:
+    """
+    Quote volume 24h semua symbol dari ticker/24hr (untuk seed ranking awal).
+    """
+    tickers = await get_json("/fapi/v1/ticker/24hr", priority=PRIORITY_UNIVERSE)
+    volumes: Dict[str, float] = {}
+    for t in tickers:
+        try:
+            volumes[t["symbol"]] = float(t.get("quoteVolume", 0.0))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return volumes
+
+
+async def get_usdt_pairs(max_pairs: int, min_volume_usdt: float) -> List[str]:
+    """
+    Ambil semua pair USDT PERPETUAL yang statusnya TRADING,
+    lalu filter hanya yang 24h quote volume >= min_volume_usdt USDT.
+    Return: list symbol lower-case (ethusdt, btcusdt, ...)
+    """
+    # 1) info exchange (filter symbol valid) & ticker 24h diambil paralel
+    info, tickers = await asyncio.gather(
+        get_json("/fapi/v1/exchangeInfo", priority=PRIORITY_UNIVERSE),
+        get_json("/fapi/v1/ticker/24hr", priority=PRIORITY_UNIVERSE),
+    )
+
+    usdt_symbols = _usdt_perpetuals(info)
 
     if not usdt_symbols:
         print("Tidak ada USDT perpetual symbols yang ditemukan.")
         return []
 
-    # 2) Ambil data ticker 24h untuk semua symbol
-    ticker_url = f"{BINANCE_REST_URL}/fapi/v1/ticker/24hr"
-    r2 = requests.get(ticker_url, timeout=10)
-    r2.raise_for_status()
-    tickers = r2.json()
-
-    # 3) Pakai Pandas untuk memproses volume
+    # 2) Pakai Pandas untuk memproses volume
     df = pd.DataFrame(tickers)
 
     # Pastikan kolom yang dibutuhkan ada
@@ -0,0 +1,202 @@
+# binance/binance_ratelimit.py
+# Limiter request-weight REST Binance Futures (token bucket) yang dipakai
+# bersama oleh preload, backfill, HTF & refresh universe lewat binance_http.
+# - bobot per endpoint (klines tergantung limit, ticker/24hr semua symbol = 40)
+# - sinkron ke header X-MBX-USED-WEIGHT-1M dari server
+# - 418/429 → hormati Retry-After (semua request ditahan sampai lewat)
+# - antrian prioritas: backfill > HTF > universe
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import BINANCE_WEIGHT_LIMIT_1M, BINANCE_WEIGHT_BUDGET_1M
+
+# kelas prioritas (angka kecil = dilayani lebih dulu)
+PRIORITY_BACKFILL = 0     # preload & backfill 5m (data detector)
+PRIORITY_HTF = 1          # seed / refresh HTF
+PRIORITY_UNIVERSE = 2     # exchangeInfo & ticker 24h
+
+_PRIORITY_NAMES = {
+    PRIORITY_BACKFILL: "backfill",
+    PRIORITY_HTF: "htf",
+    PRIORITY_UNIVERSE: "universe",
+}
+
+# bobot endpoint tetap (klines dihitung dari limit)
+ENDPOINT_WEIGHTS: Dict[str, int] = {
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v1/ticker/24hr": 40,     # tanpa parameter symbol
+}
+
+# Retry-After default kalau header tidak ada (detik)
+DEFAULT_RETRY_AFTER = 60.0
+
+
+def klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def endpoint_weight(path: str, params: Optional[dict] = None) -> int:
+    if path == "/fapi/v1/klines":
+        return klines_weight(int((params or {}).get("limit", 500)))
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+class WeightLimiter:
+    """
+    Token bucket: kapasitas = budget per menit, isi ulang linear budget/60
+    per detik. Request menunggu di heap (prioritas, urutan datang); hanya
+    kepala antrian yang boleh mengambil token, sisanya menunggu giliran.
+    """
+
+    def __init__(
+        self,
+        budget_per_minute: int = BINANCE_WEIGHT_BUDGET_1M,
+        server_limit: int = BINANCE_WEIGHT_LIMIT_1M,
+    ) -> None:
+        self.capacity = float(max(budget_per_minute, 1))
+        self.server_limit = int(server_limit)
+        self._rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._banned_until = 0.0
+
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._cond_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # metrik
+        self.used_weight_1m: Optional[int] = None   # laporan server terakhir
+        self.used_weight_ts = 0.0
+        self.requests = 0
+        self.waited = 0
+        self.bans = 0
+        self.weight_by_priority: Dict[int, int] = {p: 0 for p in _PRIORITY_NAMES}
+
+    # ------------------------------------------------------------------
+    # bucket
+    # ------------------------------------------------------------------
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def _wait_time(self, weight: float) -> float:
+        now = time.monotonic()
+        if now < self._banned_until:
+            return self._banned_until - now
+        missing = weight - self._tokens
+        return 0.0 if missing <= 0 else missing / self._rate
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._cond_loop is not loop:
+            self._cond = asyncio.Condition()
+            self._cond_loop = loop
+            self._queue = []
+        return self._cond
+
+    async def acquire(self, weight: int, priority: int = PRIORITY_BACKFILL) -> None:
+        weight = float(min(max(weight, 1), self.capacity))
+        cond = self._condition()
+        entry = (priority, next(self._seq))
+        waited = False
+
+        async with cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    self._refill()
+                    is_head = self._queue[0] == entry
+                    wait = self._wait_time(weight) if is_head else None
+                    if is_head and wait <= 0:
+                        heapq.heappop(self._queue)
+                        self._tokens -= weight
+                        break
+                    waited = True
+                    try:
+                        # kepala antrian tidur sampai token cukup; lainnya
+                        # menunggu notifikasi pergantian kepala
+                        await asyncio.wait_for(cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                cond.notify_all()
+                raise
+            cond.notify_all()
+
+        self.requests += 1
+        self.waited += int(waited)
+        self.weight_by_priority[priority] = self.weight_by_priority.get(priority, 0) + int(weight)
+
+    # ------------------------------------------------------------------
+    # umpan balik server
+    # ------------------------------------------------------------------
+    def sync_used_weight(self, used: int) -> None:
+        """
+        X-MBX-USED-WEIGHT-1M: bobot yang sudah terpakai di menit berjalan
+        (termasuk request dari proses / IP lain) → token lokal tidak boleh
+        melebihi sisa budget versi server.
+        """
+        self.used_weight_1m = int(used)
+        self.used_weight_ts = time.time()
+        self._refill()
+        self._tokens = min(self._tokens, self.capacity - used)
+
+    def ban(self, retry_after: Optional[float], status: int) -> None:
+        """
+        418 (IP ban) / 429 (terlalu banyak request) → tahan semua request.
+        """
+        secs = DEFAULT_RETRY_AFTER if retry_after is None else max(float(retry_after), 1.0)
+        self._banned_until = max(self._banned_until, time.monotonic() + secs)
+        self._tokens = min(self._tokens, 0.0)
+        self.bans += 1
+        print(f"[RATE LIMIT] Binance HTTP {status} → tahan semua request REST {secs:.0f}s.")
+
+    # ------------------------------------------------------------------
+    # metrik
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        self._refill()
+        banned = max(self._banned_until - time.monotonic(), 0.0)
+        return {
+            "used_weight_1m": self.used_weight_1m,
+            "server_limit": self.server_limit,
+            "budget": int(self.capacity),
+            "tokens": int(self._tokens),
+            "queued": len(self._queue),
+            "requests": self.requests,
+            "waited": self.waited,
+            "bans": self.bans,
+            "banned_for": round(banned, 1),
+            "weight_by_priority": {
+                _PRIORITY_NAMES.get(p, str(p)): w for p, w in self.weight_by_priority.items()
+            },
+        }
+
+
+# limiter global (satu IP = satu budget weight)
+limiter = WeightLimiter()
+
+
+def format_weight_stats() -> str:
+    st = limiter.stats()
+    used = "-" if st["used_weight_1m"] is None else st["used_weight_1m"]
+    ban = f", BAN {st['banned_for']:.0f}s" if st["banned_for"] > 0 else ""
+    return (
+        f"REST weight: {used}/{st['server_limit']} (1m server), budget {st['budget']}/m, "
+        f"token {st['tokens']}, antre {st['queued']}{ban}\n"
+    )
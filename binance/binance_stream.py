@@ -2,25 +2,47 @@
 # WebSocket scanner Binance Futures 5m + SNIPER analyzer.
 
 import asyncio
-import json
 import time
-from typing import List
-
-import requests
-import websockets
-
-from config import BINANCE_STREAM_URL, BINANCE_REST_URL, REFRESH_PAIR_INTERVAL_HOURS
-from binance.binance_pairs import get_usdt_pairs
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from config import (
+    REFRESH_PAIR_INTERVAL_HOURS,
+    SNIPER_BATCH_MODE,
+    SNIPER_BATCH_WINDOW_MS,
+    UNIVERSE_EVAL_SECONDS,
+    WS_KLINE_PREFILTER,
+    WS_RECORD_DIR,
+)
+from binance import binance_ws_pool
+from binance import binance_http
+from binance.binance_http import fetch_klines
+from binance import universe_ranker
+from binance.binance_pairs import get_quote_volumes, get_usdt_perpetuals
+from binance.binance_ws_pool import WSConnectionPool, WSShard
+from binance.feed_recorder import FeedRecorder
+from binance.kline_store import get_store, warm_klines
+from binance.mtf_aggregator import MTFAggregator
 from binance.ohlc_buffer import OHLCBufferManager
+from binance.universe_ranker import MINI_TICKER_STREAM, UniverseRanker
+from binance.ws_decode import DECODER_NAME, is_intrabar_kline
+from common import htf_context
+from core import clock
+from common.htf_prefetch import prefetch_htf, run_htf_prefetcher
 from core.bot_state import (
     state,
     load_subscribers,
     load_vip_users,
-    cleanup_expired_vip,
     load_bot_state,
 )
-from sniper.sniper_analyzer import analyze_symbol_sniper
-from telegram.telegram_broadcast import broadcast_signal
+from core.recipient_index import recipient_index, run_recipient_scheduler
+from core.user_filters import filter_index, load_user_filters
+from sniper import sniper_pipeline
+from sniper.sniper_batch import CloseBatcher, CloseEvent, detect_spike_reversal_batch
+from sniper.sniper_pipeline import AnalysisPipeline
+from sniper.sniper_settings import sniper_settings
+from telegram.telegram_digest import stop_digest, submit_signal
+from telegram.telegram_outbox import get_dispatcher, stop_dispatcher
+from telegram.telegram_sender import close_sender
 
 # jumlah candle maksimum yang disimpan per symbol
 MAX_5M_CANDLES = 120
@@ -30,218 +52,467 @@ PRELOAD_LIMIT_5M = 60
 # Batas preload REST /klines paralel (boleh dibesarkan kalau koneksi kuat)
 MAX_PRELOAD_CONCURRENCY = 20
 
+# Batas backfill REST /klines paralel setelah reconnect / gap
+MAX_BACKFILL_CONCURRENCY = 10
+# limit maksimum /fapi/v1/klines per request
+MAX_KLINES_PER_REQUEST = 1500
 
-def _fetch_klines(symbol: str, interval: str, limit: int) -> list:
-    """
-    Fetch klines via REST (dipanggil di thread lewat asyncio.to_thread).
-    """
-    url = f"{BINANCE_REST_URL}/fapi/v1/klines"
-    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    return r.json()
+# task background (backfill) — disimpan supaya tidak di-GC sebelum selesai
+_background_tasks: set = set()
 
 
-async def _analyze_and_broadcast(symbol: str, candles, now_ts: float):
+async def _analyze_batch(pipeline: AnalysisPipeline, events: List[CloseEvent]) -> None:
     """
-    Worker untuk:
-    - analisa SNIPER (sync, dijalankan di thread via asyncio.to_thread)
-    - jika ada sinyal: kirim Telegram (juga di thread)
-    - update cooldown dan log.
-
-    Tidak membatasi concurrency di level fungsi ini: semua diatur oleh event loop.
+    Flush CloseBatcher: 1 pass vectorized untuk semua close dalam batch,
+    hanya survivor yang masuk antrian pipeline (levels, HTF, tier, broadcast).
     """
+    windows = {sym: window for sym, window, _ in events}
+    t0 = time.perf_counter()
     try:
-        # analisa SNIPER di thread terpisah
-        result = await asyncio.to_thread(analyze_symbol_sniper, symbol, candles)
+        dets = await pipeline.run_cpu(detect_spike_reversal_batch, windows)
     except Exception as e:
-        print(f"[{symbol}] ERROR analyze_symbol_sniper:", e)
+        print("ERROR detect_spike_reversal_batch:", e)
+        return
+
+    if state.debug:
+        print(
+            f"[BATCH] {len(events)} close → {len(dets)} kandidat "
+            f"({(time.perf_counter() - t0) * 1000:.1f} ms)"
+        )
+
+    for sym, window, now_ts in events:
+        det = dets.get(sym)
+        if det:
+            pipeline.submit(sym, window, now_ts, det)
+
+
+def _handle_kline_message(
+    ohlc_mgr: OHLCBufferManager,
+    data: dict,
+    recv_ts: float,
+    pipeline: AnalysisPipeline,
+    batcher: Optional[CloseBatcher] = None,
+    mtf: Optional[MTFAggregator] = None,
+    active: Optional[Set[str]] = None,
+) -> None:
+    """
+    Handler frame kline dari WSConnectionPool (dipanggil di event loop).
+    Update buffer (+ agregator HTF lokal), lalu masukkan close ke batcher /
+    antrian pipeline. active: universe aktif; frame symbol lain (masih in-flight
+    setelah UNSUBSCRIBE) dibuang supaya buffer-nya tidak dibuat ulang.
+    """
+    kline = data.get("data", {}).get("k")
+    if not kline:
         return
 
-    if not result:
+    symbol = data.get("data", {}).get("s", "").lower()
+    if not symbol:
+        return
+    if active is not None and symbol not in active:
         return
 
-    text = result["message"]
+    # update buffer
+    ohlc_mgr.update_from_kline(symbol, kline)
+    candle_closed = bool(kline.get("x", False))
 
-    try:
-        # kirim Telegram di thread terpisah
-        await asyncio.to_thread(broadcast_signal, text)
-    except Exception as e:
-        print(f"[{symbol}] ERROR broadcast_signal:", e)
+    # candle 5m close → update bar 15m & 1h lokal (independen dari scanning)
+    if candle_closed and mtf is not None:
+        mtf.on_5m_close(symbol, ohlc_mgr.get_window(symbol, 1)[-1])
+
+    if state.debug and candle_closed:
+        buf_len = len(ohlc_mgr.get_candles(symbol))
+        print(
+            f"[{time.strftime('%H:%M:%S')}] 5m close: "
+            f"{symbol} — total candle: {buf_len}"
+        )
+
+    # hanya proses kalau candle close + scanning ON
+    if not candle_closed:
+        return
+    if not state.scanning:
+        return
+
+    candles = ohlc_mgr.get_candles(symbol)
+    if len(candles) < 40:
+        return
+
+    now_ts = clock.now()
 
-    # update cooldown timestamp
-    state.last_signal_time[symbol] = now_ts
+    # cooldown dicek DI SINI sebelum masuk antrian
+    if state.cooldown_seconds > 0:
+        last_ts = state.last_signal_time.get(symbol)
+        if last_ts and now_ts - last_ts < state.cooldown_seconds:
+            if state.debug:
+                print(
+                    f"[{symbol}] Skip cooldown "
+                    f"({int(now_ts - last_ts)}s/{state.cooldown_seconds}s)"
+                )
+            return
+
+    # analisa & kirim sinyal dijalankan sebagai task terpisah
+    # mode batch: kumpulkan close satu boundary, evaluasi sekaligus
+    if batcher is not None:
+        batcher.add(symbol, candles, now_ts)
+        return
+
+    # window = view read-only ke ring buffer (tanpa copy)
+    pipeline.submit(symbol, candles, now_ts)
 
+
+async def _preload_symbols(ohlc_mgr: OHLCBufferManager, symbols: List[str]) -> None:
+    """
+    Preload history 5m (paralel, dibatasi MAX_PRELOAD_CONCURRENCY).
+    Dengan store kline lokal hanya ekor sejak bar tersimpan terakhir yang
+    diambil dari REST.
+    symbols: lowercase (sesuai dengan yang dipakai WS & OHLCBufferManager).
+    """
+    store = get_store()
     print(
-        f"[{symbol}] SNIPER SIGNAL TERKIRIM — "
-        f"Tier {result['tier']} (Score {result['score']}) "
-        f"Entry {result['entry']:.6f} SL {result['sl']:.6f}"
+        f"Mulai preload history 5m untuk {len(symbols)} symbol "
+        f"(limit={PRELOAD_LIMIT_5M}, concurrency={MAX_PRELOAD_CONCURRENCY})..."
     )
 
+    sem_preload = asyncio.Semaphore(MAX_PRELOAD_CONCURRENCY)
+
+    async def _preload_one(sym: str):
+        async with sem_preload:
+            try:
+                kl = await warm_klines(store, sym, "5m", PRELOAD_LIMIT_5M)
+                if not kl:
+                    print(f"[PRELOAD] {sym} — klines kosong")
+                    return
+                ohlc_mgr.preload_candles(sym, kl)
+            except Exception as e:
+                print(f"[PRELOAD ERROR] {sym}: {e}")
+
+    await asyncio.gather(*(_preload_one(sym) for sym in symbols))
+
+    print("Preload selesai.")
+
+
+async def _backfill_gaps(
+    ohlc_mgr: OHLCBufferManager,
+    since: Dict[str, int],
+    mtf: Optional[MTFAggregator] = None,
+) -> None:
+    """
+    Ambil hanya candle 5m sejak close terakhir (startTime = close terakhir,
+    bukan preload penuh): candle yang terlewat disisipkan, bar parsial saat
+    koneksi putus dikoreksi versi final REST.
+    since: {symbol: open_time candle close terakhir}.
+    Symbol yang dapat candle backfill → bar HTF lokal di-seed ulang dari REST
+    (candle 5m yang terlewat tidak pernah masuk agregator).
+    """
+    interval_ms = ohlc_mgr.interval_ms
+    now_ms = int(time.time() * 1000)
+    # candle yang lebih tua dari kapasitas buffer tidak berguna
+    oldest_useful = now_ms - MAX_5M_CANDLES * interval_ms
+
+    jobs: Dict[str, int] = {}
+    for sym, last_open in since.items():
+        # belum ada candle baru yang close sejak close terakhir → tidak ada gap
+        if now_ms < last_open + 2 * interval_ms:
+            continue
+        start = max(last_open, oldest_useful)
+        jobs[sym] = start
+
+    if not jobs:
+        return
+
+    sem = asyncio.Semaphore(MAX_BACKFILL_CONCURRENCY)
+
+    async def _backfill_one(sym: str, start: int) -> int:
+        async with sem:
+            limit = min((now_ms - start) // interval_ms + 1, MAX_KLINES_PER_REQUEST)
+            try:
+                kl = await fetch_klines(sym, "5m", int(limit), start)
+            except Exception as e:
+                print(f"[BACKFILL ERROR] {sym}: {e}")
+                return 0
+            return ohlc_mgr.merge_closed_klines(sym, kl or [])
+
+    results = await asyncio.gather(*(_backfill_one(s, st) for s, st in jobs.items()))
+    filled = sum(results)
+
+    if mtf is not None:
+        reseed = [s for s, n in zip(jobs, results) if n > 0]
+        if reseed:
+            await prefetch_htf(reseed, aggregator=mtf)
+
+    print(
+        f"[BACKFILL] {len(jobs)} symbol dicek, {filled} candle disisipkan "
+        f"(total backfill: {ohlc_mgr.bars_backfilled}, gap terdeteksi: {ohlc_mgr.gaps_detected})."
+    )
+
+
+def _schedule_backfill(
+    ohlc_mgr: OHLCBufferManager,
+    since: Dict[str, int],
+    mtf: Optional[MTFAggregator] = None,
+) -> None:
+    if not since:
+        return
+    task = asyncio.create_task(_backfill_gaps(ohlc_mgr, since, mtf))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _on_shard_reconnect(
+    ohlc_mgr: OHLCBufferManager,
+    streams: List[str],
+    mtf: Optional[MTFAggregator] = None,
+) -> None:
+    since: Dict[str, int] = {}
+    for st in streams:
+        sym = st.split("@", 1)[0]
+        last_open = ohlc_mgr.last_closed_open_time(sym)
+        if last_open is not None:
+            since[sym] = last_open
+    _schedule_backfill(ohlc_mgr, since, mtf)
+
+
+class SniperEngine:
+    """
+    Komponen jalur sinyal: buffer 5m, agregator HTF, batcher & pipeline.
+    Dipakai run_sniper_bot (live) dan tools/replay_feed.py (replay rekaman),
+    jadi frame rekaman melewati handler yang sama persis dengan produksi.
+
+    replay=True → batcher di-flush manual oleh driver (jam simulasi) dan bar
+    HTF hasil stream dianggap valid tanpa seed REST.
+    """
+
+    def __init__(
+        self,
+        broadcast_fn: Callable[[Dict], Union[None, Awaitable[None]]] = submit_signal,
+        batch_mode: bool = SNIPER_BATCH_MODE,
+        replay: bool = False,
+    ) -> None:
+        self.ohlc_mgr = OHLCBufferManager(
+            max_candles=MAX_5M_CANDLES,
+            feature_lookbacks=(
+                sniper_settings.avg_body_lookback,
+                sniper_settings.leg_lookback,
+                sniper_settings.sweep_lookback,
+            ),
+        )
+        self.mtf = MTFAggregator(require_seed=not replay)
+        # universe aktif (None = terima semua symbol, mis. replay)
+        self.active: Optional[Set[str]] = None
+        self.pipeline = AnalysisPipeline(broadcast_fn=broadcast_fn)
+        self.batcher = (
+            CloseBatcher(
+                SNIPER_BATCH_WINDOW_MS / 1000.0,
+                lambda events: _analyze_batch(self.pipeline, events),
+                auto_flush=not replay,
+            )
+            if batch_mode
+            else None
+        )
+
+    def start(self) -> None:
+        htf_context.set_local_source(self.mtf)
+        sniper_pipeline.active_pipeline = self.pipeline
+        self.pipeline.start()
+
+    def on_kline(self, data: dict, recv_ts: float) -> None:
+        _handle_kline_message(
+            self.ohlc_mgr, data, recv_ts, self.pipeline, self.batcher, self.mtf, self.active
+        )
+
+    async def drain(self) -> None:
+        """
+        Selesaikan batch tertunda & seluruh antrian analisa.
+        """
+        if self.batcher is not None:
+            await self.batcher.drain()
+        await self.pipeline.drain()
+
+    async def stop(self) -> None:
+        await self.pipeline.stop()
+
 
 async def run_sniper_bot():
     """
     Loop utama sniper bot:
     - load state & subscribers/VIP
-    - refresh daftar pair berkala
-    - preload history 5m via REST (paralel)
-    - sambung WebSocket & update OHLCBuffer
-    - analisa + kirim sinyal di task terpisah
+    - ranking universe live dari !miniTicker@arr (shard WS khusus, hysteresis);
+      perubahan universe → SUBSCRIBE/UNSUBSCRIBE, tanpa reconnect
+    - preload history 5m via REST (paralel, hanya symbol baru)
+    - bangun 15m/1h lokal dari close 5m (seed REST sekali per symbol baru)
+    - jalankan WSConnectionPool (multi-shard) & update OHLCBuffer
+    - analisa + kirim sinyal lewat AnalysisPipeline (antrian terbatas + worker)
     """
     # Load state persistent
     state.subscribers = load_subscribers()
     state.vip_users = load_vip_users()
     state.daily_date = time.strftime("%Y-%m-%d")
-    cleanup_expired_vip()
     load_bot_state()
+    recipient_index.rebuild()
+    recipient_index.expire_vip()
+    filter_index.load(load_user_filters())
 
-    print(f"Loaded {len(state.subscribers)} subscribers, {len(state.vip_users)} VIP users.")
+    print(
+        f"Loaded {len(state.subscribers)} subscribers, {len(state.vip_users)} VIP users, "
+        f"{len(filter_index.filters)} user filter."
+    )
+
+    # outbox Telegram: lanjutkan delivery yang tertunda sebelum restart
+    get_dispatcher().start()
+    # reset kuota harian & VIP expired (di luar jalur broadcast)
+    recipient_task = asyncio.create_task(run_recipient_scheduler())
 
     symbols: List[str] = []
-    last_pairs_refresh: float = 0.0
+    last_perp_refresh: float = 0.0
+    last_universe_eval: float = 0.0
     refresh_interval = REFRESH_PAIR_INTERVAL_HOURS * 3600
-
-    ohlc_mgr = OHLCBufferManager(max_candles=MAX_5M_CANDLES)
+    last_stats_log: float = 0.0
+    htf_task: Optional[asyncio.Task] = None
+
+    engine = SniperEngine()
+    engine.start()
+    ohlc_mgr, mtf, pipeline = engine.ohlc_mgr, engine.mtf, engine.pipeline
+
+    # rekam frame mentah untuk replay offline (WS_RECORD_DIR kosong = mati)
+    recorder = FeedRecorder(WS_RECORD_DIR) if WS_RECORD_DIR else None
+    if recorder is not None:
+        recorder.start()
+    on_raw = recorder.record if recorder is not None else None
+
+    pool = WSConnectionPool(
+        on_message=engine.on_kline,
+        on_reconnect=lambda streams: _on_shard_reconnect(ohlc_mgr, streams, mtf),
+        # detector & agregator HTF hanya butuh candle close → frame intrabar
+        # dibuang sebelum decode (candle close yang hilang ditangani backfill)
+        skip_raw=is_intrabar_kline if WS_KLINE_PREFILTER else None,
+        on_raw=on_raw,
+    )
+    print(
+        f"WS decoder: {DECODER_NAME}, prefilter intrabar "
+        f"{'ON' if WS_KLINE_PREFILTER else 'OFF'}."
+    )
+    binance_ws_pool.active_pool = pool
+
+    ranker = UniverseRanker()
+    universe_ranker.active_ranker = ranker
+    ticker_shard = WSShard(
+        "ticker",
+        [MINI_TICKER_STREAM],
+        on_message=lambda data, recv_ts: ranker.on_mini_tickers(data.get("data")),
+        on_raw=on_raw,
+    )
+    ticker_shard.start()
 
     while state.running:
         try:
-            now = time.time()
-            need_refresh_pairs = (
-                not symbols
-                or (now - last_pairs_refresh) > refresh_interval
-                or state.force_pairs_refresh
-            )
+            # soft restart dari Telegram: refresh universe & engine,
+            # koneksi WS tetap terbuka (stream di-diff lewat SUBSCRIBE/UNSUBSCRIBE)
+            if state.request_soft_restart:
+                print("Soft restart diminta → refresh pair & engine tanpa reconnect...")
+                state.request_soft_restart = False
+                state.force_pairs_refresh = True
 
-            if need_refresh_pairs:
-                print("Refresh daftar pair USDT perpetual berdasarkan volume...")
-                symbols = get_usdt_pairs(state.max_pairs, state.min_volume_usdt)
-                last_pairs_refresh = now
+            now = time.time()
+            force_refresh = state.force_pairs_refresh
+
+            # daftar perpetual (exchangeInfo) hanya sesekali; volume dari stream
+            if (
+                not ranker.perpetuals
+                or (now - last_perp_refresh) > refresh_interval
+                or force_refresh
+            ):
+                print("Refresh daftar pair USDT perpetual (exchangeInfo)...")
+                ranker.set_perpetuals(await get_usdt_perpetuals())
+                if force_refresh or not ranker.has_volumes:
+                    ranker.seed_volumes(await get_quote_volumes())
+                last_perp_refresh = now
                 state.force_pairs_refresh = False
-                print(f"Scan {len(symbols)} pair:", ", ".join(s.upper() for s in symbols))
-
-                # ============================
-                # PRELOAD HISTORY 5M (PARALEL)
-                # ============================
-                print(
-                    f"Mulai preload history 5m untuk {len(symbols)} symbol "
-                    f"(limit={PRELOAD_LIMIT_5M}, concurrency={MAX_PRELOAD_CONCURRENCY})..."
-                )
 
-                sem_preload = asyncio.Semaphore(MAX_PRELOAD_CONCURRENCY)
+            new_symbols = symbols
+            if force_refresh or not symbols or (now - last_universe_eval) >= UNIVERSE_EVAL_SECONDS:
+                last_universe_eval = now
+                new_symbols = ranker.select(symbols, state.max_pairs, state.min_volume_usdt)
+
+            new_set = set(new_symbols)
+            old_set = set(symbols)
+            if new_set != old_set:
+                added = [s for s in new_symbols if s not in old_set]
+                removed = [s for s in symbols if s not in new_set]
+                first_load = not symbols
+                symbols = new_symbols
+                engine.active = new_set
+                htf_context.set_active_universe(symbols)
+
+                if first_load:
+                    print(
+                        f"Scan {len(symbols)} pair:",
+                        ", ".join(s.upper() for s in symbols),
+                    )
+                else:
+                    print(
+                        f"Universe berubah: {len(symbols)} pair "
+                        f"(+{', '.join(s.upper() for s in added) or '-'} "
+                        f"/ -{', '.join(s.upper() for s in removed) or '-'})"
+                    )
 
-                async def _preload_one(sym: str):
-                    # sym: lowercase symbol (sesuai dengan yang dipakai WS & OHLCBufferManager)
-                    async with sem_preload:
-                        try:
-                            kl = await asyncio.to_thread(
-                                _fetch_klines, sym, "5m", PRELOAD_LIMIT_5M
-                            )
-                            if not kl:
-                                print(f"[PRELOAD] {sym} — klines kosong")
-                                return
-                            ohlc_mgr.preload_candles(sym, kl)
-                        except Exception as e:
-                            print(f"[PRELOAD ERROR] {sym}: {e}")
+                # preload hanya untuk symbol yang baru masuk universe
+                if added:
+                    await _preload_symbols(ohlc_mgr, added)
+                    # seed history HTF sekali; selanjutnya dibangun dari stream 5m
+                    await prefetch_htf(added, aggregator=mtf)
 
-                await asyncio.gather(*(_preload_one(sym) for sym in symbols))
+                # stream di-diff langsung di koneksi yang terbuka (tanpa reconnect)
+                if pool.running:
+                    await pool.update_streams([f"{s}@kline_5m" for s in symbols])
 
-                print("Preload selesai.")
+                for sym in removed:
+                    ohlc_mgr.remove_symbol(sym)
+                    mtf.remove_symbol(sym)
 
             if not symbols:
                 print("Tidak ada symbol untuk discan. Tidur sebentar...")
                 await asyncio.sleep(5)
                 continue
 
-            streams = "/".join(f"{s}@kline_5m" for s in symbols)
-            ws_url = f"{BINANCE_STREAM_URL}?streams={streams}"
+            if htf_task is None:
+                htf_task = asyncio.create_task(run_htf_prefetcher(lambda: list(symbols), mtf))
 
-            print(f"Menghubungkan ke WebSocket: {ws_url}")
-            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=20) as ws:
-                print("WebSocket terhubung.")
+            if not pool.running:
+                pool.start([f"{s}@kline_5m" for s in symbols])
                 if state.scanning:
                     print("Scan sebelumnya AKTIF → melanjutkan scan otomatis.")
                 else:
                     print("Bot dalam mode STANDBY. Gunakan /startscan untuk mulai scan.\n")
 
-                while state.running:
-                    # soft restart dari Telegram
-                    if state.request_soft_restart:
-                        print("Soft restart diminta → putus WS & refresh engine...")
-                        state.request_soft_restart = False
-                        break
-
-                    # refresh daftar pair tiap interval
-                    if time.time() - last_pairs_refresh > refresh_interval:
-                        print("Interval refresh pair tercapai → refresh daftar pair & reconnect WebSocket...")
-                        break
-
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=60)
-                    except asyncio.TimeoutError:
-                        if state.debug:
-                            print("Timeout menunggu data WebSocket, lanjut...")
-                        continue
-
-                    try:
-                        data = json.loads(msg)
-                    except json.JSONDecodeError:
-                        if state.debug:
-                            print("Gagal decode JSON dari WebSocket.")
-                        continue
-
-                    kline = data.get("data", {}).get("k")
-                    if not kline:
-                        continue
-
-                    symbol = data.get("data", {}).get("s", "").lower()
-                    if not symbol:
-                        continue
-
-                    # update buffer
-                    ohlc_mgr.update_from_kline(symbol, kline)
-                    candle_closed = bool(kline.get("x", False))
-
-                    if state.debug and candle_closed:
-                        buf_len = len(ohlc_mgr.get_candles(symbol))
-                        print(
-                            f"[{time.strftime('%H:%M:%S')}] 5m close: "
-                            f"{symbol} — total candle: {buf_len}"
-                        )
-
-                    # hanya proses kalau candle close + scanning ON
-                    if not candle_closed:
-                        continue
-                    if not state.scanning:
-                        continue
-
-                    candles = ohlc_mgr.get_candles(symbol)
-                    if len(candles) < 40:
-                        continue
-
-                    now_ts = time.time()
-
-                    # cooldown dicek DI SINI sebelum lempar task
-                    if state.cooldown_seconds > 0:
-                        last_ts = state.last_signal_time.get(symbol)
-                        if last_ts and now_ts - last_ts < state.cooldown_seconds:
-                            if state.debug:
-                                print(
-                                    f"[{symbol}] Skip cooldown "
-                                    f"({int(now_ts - last_ts)}s/{state.cooldown_seconds}s)"
-                                )
-                            continue
-
-                    # analisa & kirim sinyal dijalankan sebagai task terpisah
-                    asyncio.create_task(
-                        _analyze_and_broadcast(symbol, list(candles), now_ts)
-                    )
+            # gap yang terdeteksi dari stream live → backfill symbol terkait
+            _schedule_backfill(ohlc_mgr, ohlc_mgr.pop_pending_gaps(), mtf)
+
+            if state.debug and time.time() - last_stats_log > 60:
+                last_stats_log = time.time()
+                for st in pool.stats():
+                    print(f"[WS STATS] {st}")
+                print(f"[PIPELINE STATS] {pipeline.stats()}")
+                print(
+                    f"[GAP STATS] terdeteksi={ohlc_mgr.gaps_detected} "
+                    f"backfill={ohlc_mgr.bars_backfilled} candle"
+                )
+
+            await asyncio.sleep(1)
 
-        except websockets.ConnectionClosed:
-            print("WebSocket terputus. Reconnect dalam 5 detik...")
-            await asyncio.sleep(5)
         except Exception as e:
             print("Error di run_sniper_bot (luar):", e)
-            print("Coba reconnect dalam 5 detik...")
+            print("Coba lagi dalam 5 detik...")
             await asyncio.sleep(5)
 
+    if htf_task is not None:
+        htf_task.cancel()
+    recipient_task.cancel()
+    await ticker_shard.stop()
+    await pool.stop()
+    await engine.stop()
+    if recorder is not None:
+        recorder.stop()
+    await stop_digest()
+    await stop_dispatcher()
+    await close_sender()
+    await binance_http.close_client()
     print("run_sniper_bot selesai karena state.running = False")
@@ -0,0 +1,404 @@
+# binance/binance_ws_pool.py
+# Pool koneksi WebSocket Binance Futures.
+# Daftar stream dipecah ke beberapa shard; tiap shard punya socket, task recv,
+# dan reconnect/backoff sendiri → putus di satu shard tidak menahan symbol lain.
+
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import websockets
+
+from binance.ws_decode import DecodeError, RawFrame, decode
+from config import BINANCE_STREAM_URL, WS_STREAMS_PER_SHARD
+from core.bot_state import state
+
+# backoff reconnect per shard (detik)
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+
+# panjang window untuk hitung message rate per shard (detik)
+RATE_WINDOW_SECONDS = 10.0
+
+# bobot EWMA untuk lag (0..1, makin besar makin responsif)
+LAG_EWMA_ALPHA = 0.1
+
+# SUBSCRIBE/UNSUBSCRIBE: jumlah stream per frame & jeda antar frame
+# (Binance membatasi 10 pesan masuk/detik per koneksi)
+SUBSCRIBE_BATCH_SIZE = 50
+SUBSCRIBE_FRAME_INTERVAL = 0.2
+
+MessageHandler = Callable[[dict, float], None]
+ReconnectHandler = Callable[[List[str]], None]
+# prefilter frame mentah: True → frame dibuang sebelum di-decode
+RawFilter = Callable[[RawFrame], bool]
+# hook frame mentah (mis. recorder): on_raw(raw, recv_ts)
+RawHandler = Callable[[RawFrame, float], None]
+# decoder frame mentah → dict (default ws_decode.decode)
+RawDecoder = Callable[[RawFrame], Any]
+
+
+class WSShard:
+    """
+    Satu koneksi combined-stream Binance.
+    on_message(data, recv_ts) dipanggil di event loop untuk setiap frame JSON.
+    skip_raw(raw) → True: frame hanya dihitung di metrik, tidak di-decode.
+    on_raw(raw, recv_ts) dipanggil untuk setiap frame sebelum prefilter.
+    decoder(raw) menggantikan ws_decode.decode (mis. benchmark).
+    """
+
+    def __init__(
+        self,
+        shard_id: Union[int, str],
+        streams: List[str],
+        on_message: MessageHandler,
+        on_reconnect: Optional[ReconnectHandler] = None,
+        skip_raw: Optional[RawFilter] = None,
+        on_raw: Optional[RawHandler] = None,
+        decoder: Optional[RawDecoder] = None,
+    ) -> None:
+        self.shard_id = shard_id
+        self.streams: List[str] = list(streams)
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+        self._skip_raw = skip_raw
+        self._on_raw = on_raw
+        self._decode = decoder if decoder is not None else decode
+        self._ever_connected = False
+        self._task: Optional[asyncio.Task] = None
+        self._ws = None
+        self._req_id = 0
+        self.connected = False
+
+        # metrik
+        self.msg_count = 0
+        self.skipped = 0
+        self.reconnects = 0
+        self.last_msg_ts = 0.0
+        self.msg_rate = 0.0
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._rate_count = 0
+        self._rate_start = time.time()
+
+    @property
+    def url(self) -> str:
+        return f"{BINANCE_STREAM_URL}?streams={'/'.join(self.streams)}"
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"ws-shard-{self.shard_id}")
+
+    async def stop(self) -> None:
+        task = self._task
+        self._task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[WS shard {self.shard_id}] error saat stop:", e)
+
+    async def _run(self) -> None:
+        backoff = RECONNECT_BACKOFF_MIN
+
+        while state.running:
+            try:
+                url_streams = list(self.streams)
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    backoff = RECONNECT_BACKOFF_MIN
+                    print(f"[WS shard {self.shard_id}] terhubung ({len(url_streams)} stream).")
+
+                    # reconnect (bukan connect pertama) → minta backfill candle yang terlewat
+                    if self._ever_connected and self._on_reconnect is not None:
+                        try:
+                            self._on_reconnect(list(url_streams))
+                        except Exception as e:
+                            print(f"[WS shard {self.shard_id}] error on_reconnect:", e)
+                    self._ever_connected = True
+
+                    # stream berubah selama proses connect → sinkronkan lewat frame
+                    await self._sync_subscriptions(url_streams)
+
+                    async for msg in ws:
+                        self._handle_raw(msg)
+                        if not state.running:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except websockets.ConnectionClosed:
+                print(f"[WS shard {self.shard_id}] WebSocket terputus.")
+            except Exception as e:
+                print(f"[WS shard {self.shard_id}] error:", e)
+            finally:
+                self._ws = None
+                self.connected = False
+
+            if not state.running:
+                break
+
+            self.reconnects += 1
+            # jitter kecil supaya shard tidak reconnect bersamaan
+            delay = backoff + random.uniform(0, 1.0)
+            print(f"[WS shard {self.shard_id}] reconnect dalam {delay:.1f} detik...")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    async def _send_method(self, method: str, streams: List[str]) -> None:
+        """
+        Kirim frame SUBSCRIBE/UNSUBSCRIBE di koneksi yang sedang terbuka.
+        Kalau belum/tidak terhubung, cukup update daftar: URL reconnect
+        berikutnya sudah memakai daftar stream terbaru.
+        """
+        for i in range(0, len(streams), SUBSCRIBE_BATCH_SIZE):
+            ws = self._ws
+            if ws is None:
+                return
+            self._req_id += 1
+            frame = {
+                "method": method,
+                "params": streams[i:i + SUBSCRIBE_BATCH_SIZE],
+                "id": self._req_id,
+            }
+            try:
+                await ws.send(json.dumps(frame))
+            except Exception as e:
+                # koneksi putus → _run akan reconnect dengan daftar stream terbaru
+                print(f"[WS shard {self.shard_id}] gagal kirim {method}:", e)
+                return
+            await asyncio.sleep(SUBSCRIBE_FRAME_INTERVAL)
+
+    async def _sync_subscriptions(self, url_streams: List[str]) -> None:
+        current = set(self.streams)
+        connected = set(url_streams)
+        to_sub = [s for s in self.streams if s not in connected]
+        to_unsub = [s for s in url_streams if s not in current]
+        if to_unsub:
+            await self._send_method("UNSUBSCRIBE", to_unsub)
+        if to_sub:
+            await self._send_method("SUBSCRIBE", to_sub)
+
+    async def subscribe(self, streams: List[str]) -> None:
+        new = [s for s in streams if s not in self.streams]
+        if not new:
+            return
+        self.streams.extend(new)
+        await self._send_method("SUBSCRIBE", new)
+
+    async def unsubscribe(self, streams: List[str]) -> None:
+        drop = set(streams)
+        gone = [s for s in self.streams if s in drop]
+        if not gone:
+            return
+        self.streams = [s for s in self.streams if s not in drop]
+        await self._send_method("UNSUBSCRIBE", gone)
+
+    def _handle_raw(self, msg, recv_ts: Optional[float] = None) -> None:
+        if recv_ts is None:
+            recv_ts = time.time()
+
+        if self._on_raw is not None:
+            self._on_raw(msg, recv_ts)
+
+        if self._skip_raw is not None and self._skip_raw(msg):
+            self.skipped += 1
+            self._record_metrics(None, recv_ts)
+            return
+
+        try:
+            data = self._decode(msg)
+        except DecodeError:
+            if state.debug:
+                print(f"[WS shard {self.shard_id}] Gagal decode JSON dari WebSocket.")
+            return
+
+        # balasan SUBSCRIBE/UNSUBSCRIBE: {"result": null, "id": n}
+        if "id" in data and "data" not in data:
+            if data.get("error"):
+                print(f"[WS shard {self.shard_id}] error subscribe:", data["error"])
+            return
+
+        self._record_metrics(data, recv_ts)
+
+        try:
+            self._on_message(data, recv_ts)
+        except Exception as e:
+            print(f"[WS shard {self.shard_id}] error handler:", e)
+
+    def _record_metrics(self, data: Optional[dict], recv_ts: float) -> None:
+        self.msg_count += 1
+        self.last_msg_ts = recv_ts
+
+        self._rate_count += 1
+        elapsed = recv_ts - self._rate_start
+        if elapsed >= RATE_WINDOW_SECONDS:
+            self.msg_rate = self._rate_count / elapsed
+            self._rate_count = 0
+            self._rate_start = recv_ts
+
+        if data is None:
+            return
+
+        payload = data.get("data")
+        event_ms = payload.get("E") if isinstance(payload, dict) else None
+        if event_ms:
+            lag = max(recv_ts * 1000.0 - float(event_ms), 0.0)
+            self.lag_ms += LAG_EWMA_ALPHA * (lag - self.lag_ms)
+            if lag > self.max_lag_ms:
+                self.max_lag_ms = lag
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "shard": self.shard_id,
+            "streams": len(self.streams),
+            "connected": self.connected,
+            "messages": self.msg_count,
+            "skipped": self.skipped,
+            "msg_rate": round(self.msg_rate, 2),
+            "lag_ms": round(self.lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "reconnects": self.reconnects,
+        }
+
+
+class WSConnectionPool:
+    """
+    Kumpulan WSShard. Stream dibagi rata per `streams_per_shard`.
+    """
+
+    def __init__(
+        self,
+        on_message: MessageHandler,
+        streams_per_shard: int = WS_STREAMS_PER_SHARD,
+        on_reconnect: Optional[ReconnectHandler] = None,
+        skip_raw: Optional[RawFilter] = None,
+        on_raw: Optional[RawHandler] = None,
+    ) -> None:
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+        self._skip_raw = skip_raw
+        self._on_raw = on_raw
+        self.streams_per_shard = max(int(streams_per_shard), 1)
+        self.shards: List[WSShard] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self.shards)
+
+    def start(self, streams: List[str]) -> None:
+        if self.shards:
+            raise RuntimeError("WSConnectionPool sudah berjalan, stop() dulu.")
+
+        size = self.streams_per_shard
+        for i in range(0, len(streams), size):
+            shard = WSShard(
+                len(self.shards),
+                streams[i:i + size],
+                self._on_message,
+                self._on_reconnect,
+                self._skip_raw,
+                self._on_raw,
+            )
+            self.shards.append(shard)
+            shard.start()
+
+        print(
+            f"WS pool start: {len(streams)} stream → {len(self.shards)} shard "
+            f"(maks {size} stream/shard)."
+        )
+
+    async def stop(self) -> None:
+        if not self.shards:
+            return
+        shards = self.shards
+        self.shards = []
+        await asyncio.gather(*(s.stop() for s in shards))
+        print(f"WS pool stop: {len(shards)} shard ditutup.")
+
+    @property
+    def streams(self) -> List[str]:
+        return [st for shard in self.shards for st in shard.streams]
+
+    async def update_streams(self, streams: List[str]) -> Dict[str, List[str]]:
+        """
+        Diff daftar stream lama vs baru, lalu kirim UNSUBSCRIBE/SUBSCRIBE
+        di koneksi yang sudah terbuka (tanpa reconnect).
+        Stream baru diisi ke shard yang masih punya slot, sisanya ke shard baru.
+        Return {"added": [...], "removed": [...]}.
+        """
+        wanted = set(streams)
+        current = set(self.streams)
+        added = [s for s in streams if s not in current]
+        removed = [s for s in self.streams if s not in wanted]
+
+        for shard in self.shards:
+            gone = [s for s in shard.streams if s not in wanted]
+            if gone:
+                await shard.unsubscribe(gone)
+
+        # shard yang kosong ditutup
+        empty = [sh for sh in self.shards if not sh.streams]
+        if empty:
+            self.shards = [sh for sh in self.shards if sh.streams]
+            await asyncio.gather(*(sh.stop() for sh in empty))
+
+        pending = list(added)
+        for shard in self.shards:
+            if not pending:
+                break
+            free = self.streams_per_shard - len(shard.streams)
+            if free <= 0:
+                continue
+            chunk, pending = pending[:free], pending[free:]
+            await shard.subscribe(chunk)
+
+        size = self.streams_per_shard
+        next_id = max((sh.shard_id for sh in self.shards), default=-1) + 1
+        for i in range(0, len(pending), size):
+            shard = WSShard(
+                next_id,
+                pending[i:i + size],
+                self._on_message,
+                self._on_reconnect,
+                self._skip_raw,
+                self._on_raw,
+            )
+            next_id += 1
+            self.shards.append(shard)
+            shard.start()
+
+        if added or removed:
+            print(
+                f"WS pool update: +{len(added)} / -{len(removed)} stream, "
+                f"{len(self.shards)} shard aktif."
+            )
+        return {"added": added, "removed": removed}
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [s.stats() for s in self.shards]
+
+
+# pool aktif (di-set oleh run_sniper_bot), dipakai /status
+active_pool: Optional[WSConnectionPool] = None
+
+
+def format_pool_stats() -> str:
+    if active_pool is None or not active_pool.shards:
+        return "WS Shards  : -\n"
+
+    lines = [f"WS Shards  : {len(active_pool.shards)}\n"]
+    for st in active_pool.stats():
+        lines.append(
+            f"  #{st['shard']} {'ON' if st['connected'] else 'OFF'} "
+            f"{st['streams']} stream, {st['msg_rate']} msg/s, "
+            f"lag {st['lag_ms']:.0f}ms (max {st['max_lag_ms']:.0f}ms), "
+            f"reconnect {st['reconnects']}\n"
+        )
+    return "".join(lines)
@@ -0,0 +1,122 @@
+# binance/feed_recorder.py
+# Rekam frame mentah WebSocket (combined stream) + timestamp terima ke log
+# gzip per chunk, untuk direplay offline (tools/replay_feed.py).
+# Format baris: "<recv_ts>\t<frame JSON mentah>\n"; satu sesi = satu folder,
+# chunk frames-000001.log.gz, frames-000002.log.gz, ...
+
+import gzip
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from binance.ws_decode import RawFrame
+
+# jumlah frame per file chunk (chunk yang sudah ditutup aman walau proses mati)
+FEED_CHUNK_FRAMES = 200_000
+
+CHUNK_PREFIX = "frames-"
+CHUNK_SUFFIX = ".log.gz"
+
+_STOP = object()
+
+
+class FeedRecorder:
+    """
+    record() dipanggil di event loop (hanya put ke antrian); kompresi & tulis
+    file dikerjakan thread writer terpisah supaya receive loop tidak tertahan.
+    """
+
+    def __init__(self, directory: str, chunk_frames: int = FEED_CHUNK_FRAMES) -> None:
+        self.session_dir = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S"))
+        self.chunk_frames = max(int(chunk_frames), 1)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+        # metrik
+        self.frames = 0
+        self.chunks = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(self.session_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="feed-recorder", daemon=True)
+        self._thread.start()
+        print(f"Feed recorder aktif → {self.session_dir}")
+
+    def record(self, raw: RawFrame, recv_ts: float) -> None:
+        self._queue.put((recv_ts, raw))
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=30)
+        self._thread = None
+        print(f"Feed recorder berhenti: {self.frames} frame, {self.chunks} chunk.")
+
+    def _open_chunk(self):
+        self.chunks += 1
+        path = os.path.join(self.session_dir, f"{CHUNK_PREFIX}{self.chunks:06d}{CHUNK_SUFFIX}")
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=5)
+
+    def _writer(self) -> None:
+        f = None
+        in_chunk = 0
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                recv_ts, raw = item
+                if isinstance(raw, bytes):
+                    raw = raw.decode("utf-8", errors="replace")
+                if f is None:
+                    f = self._open_chunk()
+                f.write(f"{recv_ts:.6f}\t{raw}\n")
+                self.frames += 1
+                in_chunk += 1
+                if in_chunk >= self.chunk_frames:
+                    f.close()
+                    f = None
+                    in_chunk = 0
+        except Exception as e:
+            print("Error di feed recorder:", e)
+        finally:
+            if f is not None:
+                f.close()
+
+
+def list_chunks(path: str) -> List[str]:
+    """
+    path = folder sesi (semua chunk, urut) atau satu file chunk.
+    """
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name)
+        for name in os.listdir(path)
+        if name.startswith(CHUNK_PREFIX) and name.endswith(CHUNK_SUFFIX)
+    )
+
+
+def iter_frames(path: str) -> Iterator[Tuple[float, str]]:
+    """
+    Baca ulang rekaman: (recv_ts, frame mentah) sesuai urutan terima.
+    Baris terakhir yang terpotong (proses mati saat menulis) dilewati.
+    """
+    for chunk in list_chunks(path):
+        try:
+            with gzip.open(chunk, "rt", encoding="utf-8") as f:
+                for line in f:
+                    ts, sep, raw = line.rstrip("\n").partition("\t")
+                    if not sep:
+                        continue
+                    try:
+                        yield float(ts), raw
+                    except ValueError:
+                        continue
+        except (EOFError, OSError) as e:
+            print(f"[REPLAY] chunk {chunk} terpotong: {e}")
@@ -0,0 +1,250 @@
+# binance/kline_store.py
+# Penyimpanan kline historis lokal: satu folder per symbol & timeframe,
+# satu file biner per kolom (append-only, bisa di-memmap langsung tanpa parse).
+#
+#   <root>/STORE.json                      (penanda format)
+#   <root>/BTCUSDT/5m/open_time.bin        int64
+#   <root>/BTCUSDT/5m/close_time.bin       int64
+#   <root>/BTCUSDT/5m/open.bin ... volume.bin   float64
+#
+# Hanya candle yang sudah close & open_time > bar terakhir yang ditambahkan.
+# open_time.bin ditulis paling akhir: jumlah baris valid = baris open_time;
+# sisa kolom lain dari append yang terputus dipotong di append berikutnya.
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from binance import binance_http
+from binance.binance_ratelimit import PRIORITY_BACKFILL
+from config import KLINE_STORE_DIR
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: tanpa lock antar proses
+    fcntl = None
+
+STORE_META = "STORE.json"
+STORE_VERSION = 1
+
+# kolom → dtype (little-endian, sesuai urutan penulisan; open_time terakhir)
+STORE_COLUMNS: Dict[str, str] = {
+    "close_time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<f8",
+    "open_time": "<i8",
+}
+
+INTERVAL_MS: Dict[str, int] = {
+    "1m": 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+
+# batas baris per request fapi/v1/klines
+STORE_FETCH_LIMIT = 1500
+
+Klines = Dict[str, np.ndarray]
+
+
+class KlineStore:
+    """
+    read() → kolom np.memmap read-only (zero-copy); append() → baris REST mentah.
+    Symbol disimpan uppercase.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    @staticmethod
+    def exists(root: str) -> bool:
+        return os.path.isfile(os.path.join(root, STORE_META))
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _ensure_meta(self) -> None:
+        path = os.path.join(self.root, STORE_META)
+        if os.path.isfile(path):
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "columns": STORE_COLUMNS}, f, indent=2)
+
+    def _rows(self, folder: str) -> int:
+        """
+        Jumlah baris valid = baris open_time (kolom lain minimal sepanjang itu).
+        """
+        try:
+            size = os.path.getsize(os.path.join(folder, "open_time.bin"))
+        except OSError:
+            return 0
+        return size // np.dtype(STORE_COLUMNS["open_time"]).itemsize
+
+    def symbols(self, interval: str = "5m") -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if self._rows(os.path.join(self.root, name, interval)) > 0
+        )
+
+    def count(self, symbol: str, interval: str) -> int:
+        return self._rows(self._dir(symbol, interval))
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        folder = self._dir(symbol, interval)
+        n = self._rows(folder)
+        if n == 0:
+            return None
+        dtype = np.dtype(STORE_COLUMNS["open_time"])
+        with open(os.path.join(folder, "open_time.bin"), "rb") as f:
+            f.seek((n - 1) * dtype.itemsize)
+            return int(np.frombuffer(f.read(dtype.itemsize), dtype=dtype)[0])
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        tail: Optional[int] = None,
+    ) -> Optional[Klines]:
+        """
+        Kolom memmap untuk open_time di [start, end) (ms), atau `tail` bar
+        terakhir. None kalau belum ada data.
+        """
+        folder = self._dir(symbol, interval)
+        n = self._rows(folder)
+        if n == 0:
+            return None
+
+        cols: Klines = {
+            name: np.memmap(os.path.join(folder, f"{name}.bin"), dtype=dtype, mode="r", shape=(n,))
+            for name, dtype in STORE_COLUMNS.items()
+        }
+        lo, hi = 0, n
+        if start is not None:
+            lo = int(np.searchsorted(cols["open_time"], start, side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(cols["open_time"], end, side="left"))
+        if tail is not None:
+            lo = max(lo, hi - tail)
+        if lo >= hi:
+            return None
+        return {name: arr[lo:hi] for name, arr in cols.items()}
+
+    def tail_rows(self, symbol: str, interval: str, n: int) -> List[list]:
+        """
+        n bar terakhir dalam format baris REST fapi/v1/klines (untuk preload).
+        """
+        k = self.read(symbol, interval, tail=n)
+        if k is None:
+            return []
+        return [
+            [int(ot), float(o), float(h), float(l), float(c), float(v), int(ct)]
+            for ot, o, h, l, c, v, ct in zip(
+                k["open_time"], k["open"], k["high"], k["low"], k["close"], k["volume"], k["close_time"]
+            )
+        ]
+
+    def append(self, symbol: str, interval: str, klines: List[list]) -> int:
+        """
+        Tambah baris REST mentah yang sudah close & lebih baru dari bar terakhir.
+        Return jumlah bar yang ditulis.
+        """
+        now_ms = int(time.time() * 1000)
+        rows: Dict[int, list] = {}
+        for row in klines:
+            try:
+                if int(row[6]) < now_ms:
+                    rows[int(row[0])] = row
+            except (ValueError, IndexError, TypeError):
+                continue
+        if not rows:
+            return 0
+
+        self._ensure_meta()
+        folder = self._dir(symbol, interval)
+        os.makedirs(folder, exist_ok=True)
+
+        with open(os.path.join(folder, ".lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            n = self._rows(folder)
+            last = self.last_open_time(symbol, interval)
+            times = sorted(t for t in rows if last is None or t > last)
+            if not times:
+                return 0
+
+            ordered = [rows[t] for t in times]
+            data = {
+                "open_time": np.asarray(times, dtype=STORE_COLUMNS["open_time"]),
+                "close_time": np.asarray([int(r[6]) for r in ordered], dtype=STORE_COLUMNS["close_time"]),
+            }
+            for i, name in enumerate(("open", "high", "low", "close", "volume"), start=1):
+                data[name] = np.asarray([float(r[i]) for r in ordered], dtype=STORE_COLUMNS[name])
+
+            for name, dtype in STORE_COLUMNS.items():
+                path = os.path.join(folder, f"{name}.bin")
+                with open(path, "ab") as f:
+                    # potong sisa append yang terputus (lebih panjang dari open_time)
+                    f.truncate(n * np.dtype(dtype).itemsize)
+                    f.write(data[name].tobytes())
+            return len(times)
+
+
+_store: Optional[KlineStore] = None
+
+
+def get_store() -> Optional[KlineStore]:
+    """
+    Store bersama dari KLINE_STORE_DIR (None kalau tidak dikonfigurasi).
+    """
+    global _store
+    if _store is None and KLINE_STORE_DIR:
+        _store = KlineStore(KLINE_STORE_DIR)
+    return _store
+
+
+async def warm_klines(
+    store: Optional[KlineStore],
+    symbol: str,
+    interval: str,
+    limit: int,
+    priority: int = PRIORITY_BACKFILL,
+) -> list:
+    """
+    `limit` bar terakhir (format REST, bar forming ikut di akhir): history dari
+    store, REST hanya untuk ekor sejak bar terakhir di store. Ekor yang sudah
+    close ikut disimpan supaya start berikutnya lebih murah.
+    Store kosong / ketinggalan lebih dari `limit` bar → REST penuh seperti biasa.
+    I/O file store dijalankan di thread (asyncio.to_thread), bukan di event loop.
+    """
+    ms = INTERVAL_MS.get(interval)
+    last = await asyncio.to_thread(store.last_open_time, symbol, interval) if store is not None and ms else None
+    now_ms = int(time.time() * 1000)
+
+    if last is None or (now_ms - last) // ms > limit:
+        return await binance_http.fetch_klines(symbol, interval, limit, priority=priority)
+
+    gap = int((now_ms - last) // ms)
+    tail = await binance_http.fetch_klines(symbol, interval, min(gap + 1, STORE_FETCH_LIMIT), last + ms, priority)
+    if tail:
+        await asyncio.to_thread(store.append, symbol, interval, tail)
+
+    history = await asyncio.to_thread(store.tail_rows, symbol, interval, limit)
+    stored_last = history[-1][0] if history else -1
+    merged = history + [row for row in tail or [] if int(row[0]) > stored_last]
+    return merged[-limit:]
@@ -0,0 +1,123 @@
+# binance/mtf_aggregator.py
+# Bangun candle 15m & 1h secara lokal dari candle 5m close (stream WebSocket).
+# History di-seed sekali dari REST saat preload, setelah itu tidak ada polling
+# REST HTF lagi & konteks HTF selalu konsisten dengan data 5m detector.
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from binance.ohlc_buffer import Candle, CandleWindow, OHLCBufferManager
+from core import clock
+
+# timeframe HTF yang dibangun → durasi bar (ms)
+MTF_TIMEFRAMES: Dict[str, int] = {
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+}
+
+# jumlah bar HTF yang disimpan per symbol & timeframe
+MTF_HISTORY_BARS = 150
+
+
+class MTFAggregator:
+    """
+    Satu OHLCBufferManager per timeframe (ring kolom, MTF_HISTORY_BARS bar).
+
+    Bar HTF yang belum lengkap ikut disimpan sebagai bar terakhir (setara
+    respon REST /klines yang juga menyertakan bar forming). Volume bar forming
+    hasil seed bisa sedikit dobel-hitung; tidak dipakai konteks HTF.
+    """
+
+    def __init__(self, history: int = MTF_HISTORY_BARS, require_seed: bool = True) -> None:
+        self._buffers: Dict[str, OHLCBufferManager] = {
+            tf: OHLCBufferManager(max_candles=history, interval_ms=ms)
+            for tf, ms in MTF_TIMEFRAMES.items()
+        }
+        self._seeded: Dict[str, set] = {tf: set() for tf in MTF_TIMEFRAMES}
+        # False → bar yang dibangun dari stream saja sudah dianggap valid
+        # (replay offline tanpa seed REST)
+        self.require_seed = require_seed
+        # open_time 5m terakhir yang sudah di-agregasi per symbol
+        self._last_5m: Dict[str, int] = {}
+        # (symbol, tf) → waktu update terakhir (detik), untuk umur konteks
+        self._updated_at: Dict[Tuple[str, str], float] = {}
+
+    def seed(self, symbol: str, interval: str, klines: list[list]) -> None:
+        """
+        Isi history HTF dari REST fapi/v1/klines (termasuk bar forming).
+        """
+        buf = self._buffers.get(interval)
+        if buf is None or not klines:
+            return
+        buf.preload_candles(symbol, klines)
+        self._seeded[interval].add(symbol)
+        self._touch(symbol, interval, clock.now())
+
+    def _touch(self, symbol: str, interval: str, now: float) -> None:
+        key = (symbol, interval)
+        self._updated_at[key] = now
+
+    def has(self, symbol: str) -> bool:
+        return all(symbol in seeded for seeded in self._seeded.values())
+
+    def on_5m_close(self, symbol: str, candle: Candle) -> None:
+        """
+        Dipanggil tiap candle 5m close → update bar 15m & 1h terkait.
+        """
+        open_time = candle["open_time"]
+        last = self._last_5m.get(symbol)
+        if last is not None and open_time <= last:
+            return
+        self._last_5m[symbol] = open_time
+
+        now = clock.now()
+        for tf, ms in MTF_TIMEFRAMES.items():
+            start = open_time - open_time % ms
+            htf_candle: Candle = {
+                "open_time": start,
+                "close_time": start + ms - 1,
+                "open": candle["open"],
+                "high": candle["high"],
+                "low": candle["low"],
+                "close": candle["close"],
+                "volume": candle["volume"],
+                "closed": candle["close_time"] >= start + ms - 1,
+            }
+            self._buffers[tf].aggregate_candle(symbol, htf_candle)
+            self._touch(symbol, tf, now)
+
+    def get_window(self, symbol: str, interval: str) -> Optional[CandleWindow]:
+        if interval not in self._buffers:
+            return None
+        if self.require_seed and symbol not in self._seeded[interval]:
+            return None
+        return self._buffers[interval].get_window(symbol)
+
+    def get_hlc(self, symbol: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        HLC (view read-only, tanpa copy) dalam format yang dipakai htf_context.
+        """
+        w = self.get_window(symbol, interval)
+        if w is None or len(w) == 0:
+            return None
+        return {
+            "open_time": w.open_time,
+            "high": w.high,
+            "low": w.low,
+            "close": w.close,
+        }
+
+    def age(self, symbol: str, interval: str) -> Optional[float]:
+        ts = self._updated_at.get((symbol, interval))
+        return None if ts is None else clock.now() - ts
+
+    def symbols_missing(self, symbols: List[str]) -> List[str]:
+        return [s for s in symbols if not self.has(s)]
+
+    def remove_symbol(self, symbol: str) -> None:
+        for tf, buf in self._buffers.items():
+            buf.remove_symbol(symbol)
+            self._seeded[tf].discard(symbol)
+            self._updated_at.pop((symbol, tf), None)
+        self._last_5m.pop(symbol, None)
@@ -1,8 +1,21 @@
 # binance/ohlc_buffer.py
 # Buffer OHLC 5m per symbol dari WebSocket futures.
+# Disimpan sebagai ring buffer kolom NumPy (float64/int64) yang sudah dialokasikan
+# di awal; detector menerima view read-only (zero-copy) lewat CandleWindow.
 
+import math
+import time
 from collections import deque
-from typing import Deque, Dict, List, TypedDict
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple, TypedDict, Union
+
+import numpy as np
+
+# durasi 1 candle 5m (ms)
+INTERVAL_MS_5M = 5 * 60 * 1000
+
+# slot cadangan di ring: window yang sedang dianalisa di thread lain tetap valid
+# sampai RING_SLACK candle baru masuk (±2.5 jam di 5m)
+RING_SLACK = 32
 
 
 class Candle(TypedDict):
@@ -16,18 +29,360 @@ class Candle(TypedDict):
     closed: bool
 
 
+_COLUMNS = ("open_time", "close_time", "open", "high", "low", "close", "volume", "closed")
+
+# running sum body di-resync dari nol tiap N candle (cegah drift floating point)
+_FEATURE_RESYNC_EVERY = 10_000
+
+
+class RollingFeatures(NamedTuple):
+    """
+    Agregat rolling atas candle SEBELUM candle terakhir window
+    (setara window[:-1]), diupdate O(1) tiap candle close.
+    """
+    seq: int                 # CandleWindow.seq yang cocok dengan snapshot ini
+    lookbacks: Tuple[int, int, int]  # (body, leg, sweep)
+    avg_body: float          # rata-rata |close-open| body_lookback candle
+    bull_count: int          # candle hijau dalam leg_lookback candle
+    bear_count: int          # candle merah dalam leg_lookback candle
+    min_low: float           # low minimum sweep_lookback candle
+    max_high: float          # high maksimum sweep_lookback candle
+
+
+class _RollingState:
+    """
+    Running body sum, counter bull/bear, dan deque monotonic untuk
+    rolling min(low) / max(high). Semua update amortized O(1).
+    """
+
+    def __init__(self, body_lookback: int, leg_lookback: int, sweep_lookback: int) -> None:
+        self.lookbacks = (body_lookback, leg_lookback, sweep_lookback)
+        self.body_lookback = body_lookback
+        self.leg_lookback = leg_lookback
+        self.sweep_lookback = sweep_lookback
+
+        self._bodies: Deque[float] = deque()
+        self._body_sum = 0.0
+        self._signs: Deque[int] = deque()   # +1 bull, -1 bear, 0 doji
+        self._bull = 0
+        self._bear = 0
+        self._min_low: Deque[Tuple[int, float]] = deque()
+        self._max_high: Deque[Tuple[int, float]] = deque()
+
+        self._idx = 0                  # jumlah candle yang sudah di-push
+        self.last_open_time: Optional[int] = None
+        self.snapshot: Optional[RollingFeatures] = None
+
+    def _current(self, seq: int) -> RollingFeatures:
+        n_body = len(self._bodies)
+        return RollingFeatures(
+            seq=seq,
+            lookbacks=self.lookbacks,
+            avg_body=self._body_sum / n_body if n_body else 0.0,
+            bull_count=self._bull,
+            bear_count=self._bear,
+            min_low=self._min_low[0][1] if self._min_low else math.nan,
+            max_high=self._max_high[0][1] if self._max_high else math.nan,
+        )
+
+    def push(self, open_time: int, o: float, h: float, l: float, c: float, seq: int) -> None:
+        """
+        Masukkan 1 candle close. `seq` = CandleWindow.seq saat candle ini
+        jadi candle terakhir window → snapshot (sebelum push) dicatat untuk seq itu.
+        """
+        if self.last_open_time is not None and open_time <= self.last_open_time:
+            return
+        self.last_open_time = open_time
+        self.snapshot = self._current(seq)
+
+        # body
+        body = abs(c - o)
+        self._bodies.append(body)
+        self._body_sum += body
+        if len(self._bodies) > self.body_lookback:
+            self._body_sum -= self._bodies.popleft()
+
+        # bull / bear
+        sign = 1 if c > o else (-1 if c < o else 0)
+        self._signs.append(sign)
+        if sign > 0:
+            self._bull += 1
+        elif sign < 0:
+            self._bear += 1
+        if len(self._signs) > self.leg_lookback:
+            old = self._signs.popleft()
+            if old > 0:
+                self._bull -= 1
+            elif old < 0:
+                self._bear -= 1
+
+        # rolling min low / max high (deque monotonic)
+        idx = self._idx
+        while self._min_low and self._min_low[-1][1] >= l:
+            self._min_low.pop()
+        self._min_low.append((idx, l))
+        while self._max_high and self._max_high[-1][1] <= h:
+            self._max_high.pop()
+        self._max_high.append((idx, h))
+        expire = idx - self.sweep_lookback
+        if self._min_low[0][0] <= expire:
+            self._min_low.popleft()
+        if self._max_high[0][0] <= expire:
+            self._max_high.popleft()
+
+        self._idx += 1
+        if self._idx % _FEATURE_RESYNC_EVERY == 0:
+            self._body_sum = math.fsum(self._bodies)
+
+
+def _candle_from_rest(row: list, now_ms: int) -> Optional[Candle]:
+    """
+    Convert 1 baris REST fapi/v1/klines (raw Binance array) → Candle.
+    Baris terakhir REST biasanya candle forming → closed hanya kalau
+    close_time sudah lewat.
+    """
+    try:
+        close_time = int(row[6])
+        return {
+            "open_time": int(row[0]),
+            "close_time": close_time,
+            "open": float(row[1]),
+            "high": float(row[2]),
+            "low": float(row[3]),
+            "close": float(row[4]),
+            "volume": float(row[5]),
+            "closed": close_time < now_ms,
+        }
+    except (ValueError, IndexError, TypeError):
+        return None
+
+
+class CandleWindow:
+    """
+    View read-only (zero-copy) ke N candle terakhir satu symbol.
+
+    Kolom NumPy: open_time, close_time, open, high, low, close, volume, closed.
+    `seq` = jumlah candle yang pernah masuk buffer sampai candle terakhir window
+    (naik terus, tidak terpotong max_candles).
+    `features` = RollingFeatures atas window[:-1] kalau buffer memeliharanya.
+
+    Akses gaya dict (window[-1]["close"], iterasi, slicing) tetap ada sebagai
+    shim kompatibilitas untuk kode lama yang memakai List[Candle].
+    """
+
+    __slots__ = _COLUMNS + ("seq", "features")
+
+    def __init__(
+        self,
+        open_time: np.ndarray,
+        close_time: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        closed: np.ndarray,
+        seq: int,
+        features: Optional[RollingFeatures] = None,
+    ) -> None:
+        self.open_time = open_time
+        self.close_time = close_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.closed = closed
+        self.seq = seq
+        # RollingFeatures untuk window[:-1] (None kalau tidak tersedia)
+        self.features = features
+
+    @classmethod
+    def from_candles(cls, candles: List[Candle]) -> "CandleWindow":
+        """
+        Bangun window dari list Candle biasa (copy, untuk caller lama / offline).
+        """
+        cols = {
+            "open_time": np.fromiter((c["open_time"] for c in candles), np.int64, len(candles)),
+            "close_time": np.fromiter((c["close_time"] for c in candles), np.int64, len(candles)),
+            "closed": np.fromiter((c["closed"] for c in candles), np.bool_, len(candles)),
+        }
+        for name in ("open", "high", "low", "close", "volume"):
+            cols[name] = np.fromiter((c[name] for c in candles), np.float64, len(candles))
+        for arr in cols.values():
+            arr.flags.writeable = False
+        return cls(seq=len(candles), **cols)
+
+    def __len__(self) -> int:
+        return self.close.shape[0]
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Candle, "CandleWindow"]:
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                raise ValueError("CandleWindow hanya mendukung slice step 1")
+            return CandleWindow(
+                self.open_time[start:stop],
+                self.close_time[start:stop],
+                self.open[start:stop],
+                self.high[start:stop],
+                self.low[start:stop],
+                self.close[start:stop],
+                self.volume[start:stop],
+                self.closed[start:stop],
+                seq=self.seq - (len(self) - stop),
+            )
+
+        return {
+            "open_time": int(self.open_time[idx]),
+            "close_time": int(self.close_time[idx]),
+            "open": float(self.open[idx]),
+            "high": float(self.high[idx]),
+            "low": float(self.low[idx]),
+            "close": float(self.close[idx]),
+            "volume": float(self.volume[idx]),
+            "closed": bool(self.closed[idx]),
+        }
+
+    def __iter__(self) -> Iterator[Candle]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self) -> List[Candle]:
+        return list(self)
+
+
+def as_window(candles: Union[CandleWindow, List[Candle]]) -> CandleWindow:
+    if isinstance(candles, CandleWindow):
+        return candles
+    return CandleWindow.from_candles(list(candles))
+
+
+class _SymbolRing:
+    """
+    Ring buffer kolom untuk 1 symbol.
+
+    Tiap candle ditulis dua kali (slot p dan p + capacity), sehingga window
+    N candle terakhir (N <= capacity) selalu berupa slice kontigu → bisa
+    diberikan sebagai view tanpa copy.
+    """
+
+    __slots__ = ("capacity", "end", "count") + _COLUMNS
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        size = 2 * capacity
+        self.open_time = np.zeros(size, dtype=np.int64)
+        self.close_time = np.zeros(size, dtype=np.int64)
+        self.open = np.zeros(size, dtype=np.float64)
+        self.high = np.zeros(size, dtype=np.float64)
+        self.low = np.zeros(size, dtype=np.float64)
+        self.close = np.zeros(size, dtype=np.float64)
+        self.volume = np.zeros(size, dtype=np.float64)
+        self.closed = np.zeros(size, dtype=np.bool_)
+        # end = index logis slot berikutnya (naik terus), count = jumlah candle valid
+        self.end = 0
+        self.count = 0
+
+    def last_open_time(self) -> Optional[int]:
+        if self.count == 0:
+            return None
+        return int(self.open_time[(self.end - 1) % self.capacity])
+
+    def write(
+        self,
+        logical: int,
+        open_time: int,
+        close_time: int,
+        o: float,
+        h: float,
+        l: float,
+        c: float,
+        v: float,
+        closed: bool,
+    ) -> None:
+        p = logical % self.capacity
+        q = p + self.capacity
+        self.open_time[p] = self.open_time[q] = open_time
+        self.close_time[p] = self.close_time[q] = close_time
+        self.open[p] = self.open[q] = o
+        self.high[p] = self.high[q] = h
+        self.low[p] = self.low[q] = l
+        self.close[p] = self.close[q] = c
+        self.volume[p] = self.volume[q] = v
+        self.closed[p] = self.closed[q] = closed
+
+    def append_candle(self, candle: Candle, max_count: int) -> None:
+        self.write(
+            self.end,
+            candle["open_time"],
+            candle["close_time"],
+            candle["open"],
+            candle["high"],
+            candle["low"],
+            candle["close"],
+            candle["volume"],
+            candle["closed"],
+        )
+        self.end += 1
+        self.count = min(self.count + 1, max_count)
+
+    def window(self, n: int) -> CandleWindow:
+        n = min(n, self.count)
+        s = (self.end - n) % self.capacity
+        e = s + n
+        views = []
+        for name in _COLUMNS:
+            v = getattr(self, name)[s:e]
+            v.flags.writeable = False
+            views.append(v)
+        return CandleWindow(*views, seq=self.end)
+
+
 class OHLCBufferManager:
-    def __init__(self, max_candles: int = 300) -> None:
+    def __init__(
+        self,
+        max_candles: int = 300,
+        interval_ms: int = INTERVAL_MS_5M,
+        feature_lookbacks: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        """
+        feature_lookbacks = (body, leg, sweep) → pelihara RollingFeatures per symbol.
+        Hanya aktif kalau semua lookback < max_candles (supaya setara dengan window).
+        """
         self.max_candles = max_candles
-        self._buffers: Dict[str, Deque[Candle]] = {}
+        self.interval_ms = interval_ms
+        self._buffers: Dict[str, _SymbolRing] = {}
+
+        if feature_lookbacks and max(feature_lookbacks) >= max_candles:
+            print(
+                f"RollingFeatures nonaktif: lookback {feature_lookbacks} "
+                f">= max_candles {max_candles}."
+            )
+            feature_lookbacks = None
+        self.feature_lookbacks = feature_lookbacks
+        self._features: Dict[str, _RollingState] = {}
+
+        # open_time candle close terakhir per symbol (untuk deteksi gap)
+        self._last_closed: Dict[str, int] = {}
+        # symbol → open_time close terakhir sebelum gap (menunggu backfill)
+        self._pending_gaps: Dict[str, int] = {}
+        # metrik gap
+        self.gaps_detected = 0
+        self.bars_backfilled = 0
+
+    def _new_ring(self) -> _SymbolRing:
+        return _SymbolRing(self.max_candles + RING_SLACK)
 
-    def _get_buffer(self, symbol: str) -> Deque[Candle]:
-        if symbol not in self._buffers:
-            self._buffers[symbol] = deque(maxlen=self.max_candles)
-        return self._buffers[symbol]
+    def _get_buffer(self, symbol: str) -> _SymbolRing:
+        ring = self._buffers.get(symbol)
+        if ring is None:
+            ring = self._new_ring()
+            self._buffers[symbol] = ring
+        return ring
 
     def update_from_kline(self, symbol: str, kline: dict) -> None:
-        buf = self._get_buffer(symbol)
+        ring = self._get_buffer(symbol)
 
         open_time = int(kline.get("t", 0))
         close_time = int(kline.get("T", 0))
@@ -42,53 +397,222 @@ class OHLCBufferManager:
 
         closed = bool(kline.get("x", False))
 
-        candle: Candle = {
-            "open_time": open_time,
-            "close_time": close_time,
-            "open": o,
-            "high": h,
-            "low": l,
-            "close": c,
-            "volume": v,
-            "closed": closed,
-        }
+        if closed:
+            self._track_closed(symbol, open_time)
+
+        # update candle forming di slot yang sama (tanpa alokasi)
+        if ring.count and ring.last_open_time() == open_time:
+            ring.write(ring.end - 1, open_time, close_time, o, h, l, c, v, closed)
+            if closed:
+                self._push_feature(symbol, ring, ring.end - 1)
+            return
+
+        # candle sebelumnya dianggap final saat candle baru muncul (kalau frame
+        # x=true-nya hilang); push yang dobel diabaikan oleh _RollingState
+        if ring.count:
+            self._push_feature(symbol, ring, ring.end - 1)
+
+        ring.write(ring.end, open_time, close_time, o, h, l, c, v, closed)
+        ring.end += 1
+        ring.count = min(ring.count + 1, self.max_candles)
+        if closed:
+            self._push_feature(symbol, ring, ring.end - 1)
+
+    def aggregate_candle(self, symbol: str, candle: Candle) -> None:
+        """
+        Gabungkan candle timeframe kecil ke bar terakhir buffer ini.
+        candle["open_time"] sudah di-floor ke awal bar timeframe buffer:
+        open_time sama → high/low/close/volume di-merge, lebih baru → bar baru.
+        """
+        ring = self._get_buffer(symbol)
+        open_time = candle["open_time"]
+        last_open = ring.last_open_time()
+
+        if last_open is not None and open_time < last_open:
+            return
+
+        if last_open == open_time:
+            p = (ring.end - 1) % ring.capacity
+            ring.write(
+                ring.end - 1,
+                open_time,
+                candle["close_time"],
+                float(ring.open[p]),
+                max(float(ring.high[p]), candle["high"]),
+                min(float(ring.low[p]), candle["low"]),
+                candle["close"],
+                float(ring.volume[p]) + candle["volume"],
+                candle["closed"],
+            )
+            return
+
+        ring.append_candle(candle, self.max_candles)
+
+    def _push_feature(self, symbol: str, ring: _SymbolRing, logical: int) -> None:
+        if self.feature_lookbacks is None:
+            return
+        st = self._features.get(symbol)
+        if st is None:
+            st = _RollingState(*self.feature_lookbacks)
+            self._features[symbol] = st
+        p = logical % ring.capacity
+        st.push(
+            int(ring.open_time[p]),
+            float(ring.open[p]),
+            float(ring.high[p]),
+            float(ring.low[p]),
+            float(ring.close[p]),
+            seq=logical + 1,
+        )
+
+    def _track_closed(self, symbol: str, open_time: int) -> None:
+        last = self._last_closed.get(symbol)
+        if last is not None and open_time > last + self.interval_ms:
+            missing = (open_time - last) // self.interval_ms - 1
+            self.gaps_detected += 1
+            self._pending_gaps.setdefault(symbol, last)
+            print(
+                f"[GAP] {symbol}: {missing} candle hilang sebelum "
+                f"{time.strftime('%H:%M', time.gmtime(open_time / 1000))} UTC "
+                f"(total gap terdeteksi: {self.gaps_detected})"
+            )
+        if last is None or open_time > last:
+            self._last_closed[symbol] = open_time
+
+    def last_closed_open_time(self, symbol: str) -> Optional[int]:
+        return self._last_closed.get(symbol)
 
-        if not buf:
-            buf.append(candle)
+    def pop_pending_gaps(self) -> Dict[str, int]:
+        """
+        Ambil & kosongkan daftar gap yang terdeteksi dari stream live.
+        Return {symbol: open_time close terakhir sebelum gap}.
+        """
+        gaps = self._pending_gaps
+        self._pending_gaps = {}
+        return gaps
+
+    def _rebuild(self, symbol: str, candles: List[Candle], end: int) -> None:
+        """
+        Tulis ulang buffer symbol ke ring BARU (window lama yang masih dipakai
+        thread analisa tetap menunjuk ke array lama, tidak ikut berubah).
+        """
+        ring = self._new_ring()
+        candles = candles[-self.max_candles:]
+        ring.end = max(end, len(candles)) - len(candles)
+        for candle in candles:
+            ring.append_candle(candle, self.max_candles)
+        self._buffers[symbol] = ring
+
+        # fitur rolling dihitung ulang dari candle final (rebuild jarang terjadi);
+        # candle terakhir ikut hanya kalau benar-benar sudah close
+        if self.feature_lookbacks is None:
             return
+        self._features.pop(symbol, None)
+        now_ms = int(time.time() * 1000)
+        first = ring.end - len(candles)
+        for i, candle in enumerate(candles):
+            is_last = i == len(candles) - 1
+            if is_last and not (candle["closed"] and candle["close_time"] < now_ms):
+                break
+            self._push_feature(symbol, ring, first + i)
+
+    def merge_closed_klines(self, symbol: str, klines: list[list]) -> int:
+        """
+        Gabungkan candle close dari REST (hasil backfill) ke buffer, urut
+        berdasarkan open_time: candle yang belum ada disisipkan, candle yang
+        sudah ada tapi parsial (forming / OHLCV beda, mis. bar saat koneksi
+        putus) ditimpa versi final REST. Candle yang masih forming diabaikan.
+        Return jumlah candle yang disisipkan / dikoreksi. Symbol yang sudah
+        di-remove (keluar universe selama backfill berjalan) dilewati.
+        """
+        ring = self._buffers.get(symbol)
+        if ring is None:
+            return 0
+        current = ring.window(self.max_candles)
+        now_ms = int(time.time() * 1000)
+        by_time = {c["open_time"]: c for c in current.to_list()}
+
+        inserted = 0
+        corrected = 0
+        last_closed: Optional[int] = None
+        for row in klines:
+            candle = _candle_from_rest(row, now_ms)
+            if candle is None or not candle["closed"]:
+                continue
+            t = candle["open_time"]
+            last_closed = t if last_closed is None else max(last_closed, t)
+            old = by_time.get(t)
+            if old is None:
+                inserted += 1
+            elif old["closed"] and all(
+                old[k] == candle[k] for k in ("open", "high", "low", "close", "volume")
+            ):
+                continue
+            else:
+                corrected += 1
+            by_time[t] = candle
 
-        last = buf[-1]
-        if last["open_time"] == open_time:
-            buf[-1] = candle
-        else:
-            buf.append(candle)
+        if inserted or corrected:
+            merged = [by_time[t] for t in sorted(by_time)]
+            # fitur rolling dihitung ulang dari seluruh candle hasil merge
+            self._rebuild(symbol, merged, ring.end + inserted)
 
-    def get_candles(self, symbol: str) -> List[Candle]:
-        return list(self._get_buffer(symbol))
+        last = self._last_closed.get(symbol)
+        if last_closed is not None and (last is None or last_closed > last):
+            self._last_closed[symbol] = last_closed
+
+        self.bars_backfilled += inserted + corrected
+        return inserted + corrected
+
+    def remove_symbol(self, symbol: str) -> None:
+        self._buffers.pop(symbol, None)
+        self._features.pop(symbol, None)
+        self._last_closed.pop(symbol, None)
+        self._pending_gaps.pop(symbol, None)
+
+    def symbols(self) -> List[str]:
+        return list(self._buffers)
+
+    def get_window(self, symbol: str, n: Optional[int] = None) -> CandleWindow:
+        """
+        View read-only ke n candle terakhir (default: semua, maks max_candles).
+        Window penuh (n=None) membawa RollingFeatures kalau snapshot-nya cocok.
+        """
+        ring = self._get_buffer(symbol)
+        if n is not None:
+            return ring.window(min(n, self.max_candles))
+
+        window = ring.window(self.max_candles)
+        st = self._features.get(symbol)
+        if st is not None and st.snapshot is not None and st.snapshot.seq == window.seq:
+            window.features = st.snapshot
+        return window
+
+    def get_candles(self, symbol: str) -> CandleWindow:
+        """
+        Shim kompatibilitas: dulu return List[Candle], sekarang CandleWindow
+        (tetap bisa di-len(), di-index → dict Candle, di-slice, di-iterasi).
+        """
+        return self.get_window(symbol)
 
     def preload_candles(self, symbol: str, klines: list[list]) -> None:
         """
         Preload dari REST fapi/v1/klines (list raw Binance array).
         """
-        buf = self._get_buffer(symbol)
-        buf.clear()
+        now_ms = int(time.time() * 1000)
+        candles: List[Candle] = []
         for row in klines:
-            try:
-                o = float(row[1])
-                h = float(row[2])
-                l = float(row[3])
-                c = float(row[4])
-                v = float(row[5])
-            except (ValueError, IndexError):
+            candle = _candle_from_rest(row, now_ms)
+            if candle is None:
                 continue
-            candle: Candle = {
-                "open_time": int(row[0]),
-                "close_time": int(row[6]),
-                "open": o,
-                "high": h,
-                "low": l,
-                "close": c,
-                "volume": v,
-                "closed": True,
-            }
-            buf.append(candle)
+            candles.append(candle)
+
+        prev = self._buffers.get(symbol)
+        self._rebuild(symbol, candles, (prev.end if prev else 0) + len(candles))
+
+        # candle terakhir dari REST biasanya masih forming → closed=False,
+        # tidak dihitung close (ditimpa stream / backfill saat close)
+        closed_times = [c["open_time"] for c in candles if c["closed"]]
+        self._pending_gaps.pop(symbol, None)
+        if closed_times:
+            self._last_closed[symbol] = closed_times[-1]
@@ -0,0 +1,138 @@
+# binance/universe_ranker.py
+# Ranking universe live dari stream !miniTicker@arr (quote volume 24h rolling).
+# Volume di-update per frame (hanya symbol yang berubah), universe dievaluasi
+# ulang tiap beberapa detik dengan hysteresis supaya pair di sekitar batas
+# tidak keluar-masuk terus.
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config import UNIVERSE_HYSTERESIS
+
+# stream ticker semua market (array, hanya symbol yang berubah tiap ~1 detik)
+MINI_TICKER_STREAM = "!miniTicker@arr"
+
+
+class UniverseRanker:
+    """
+    quote volume per symbol (uppercase) untuk USDT perpetual yang TRADING.
+    select() → daftar symbol lowercase (urut volume) untuk discan.
+
+    Hysteresis (h = UNIVERSE_HYSTERESIS):
+    - masuk : rank < N * (1 - h) dan volume >= min_volume
+    - keluar: rank >= N * (1 + h) atau volume < min_volume * (1 - h)
+    Slot kosong (mis. saat start) diisi dari rank teratas.
+    """
+
+    def __init__(self, hysteresis: float = UNIVERSE_HYSTERESIS) -> None:
+        self.hysteresis = max(float(hysteresis), 0.0)
+        self.perpetuals: set = set()
+        self._quote_volume: Dict[str, float] = {}
+
+        # metrik
+        self.updates = 0
+        self.last_update_ts = 0.0
+        self.selections = 0
+        self.changes = 0
+        self.last_change_ts = 0.0
+
+    def set_perpetuals(self, symbols: Iterable[str]) -> None:
+        self.perpetuals = {s.upper() for s in symbols}
+        # symbol yang delisting / tidak TRADING lagi dibuang dari ranking
+        for sym in [s for s in self._quote_volume if s not in self.perpetuals]:
+            del self._quote_volume[sym]
+
+    def seed_volumes(self, volumes: Dict[str, float]) -> None:
+        """
+        Isi awal dari REST ticker/24hr (sebelum frame stream pertama datang).
+        """
+        for sym, qv in volumes.items():
+            if sym in self.perpetuals:
+                self._quote_volume[sym] = qv
+
+    @property
+    def has_volumes(self) -> bool:
+        return bool(self._quote_volume)
+
+    def on_mini_tickers(self, payload) -> None:
+        """
+        Handler frame !miniTicker@arr: [{"s": "BTCUSDT", "q": "123.4", ...}, ...]
+        """
+        if not isinstance(payload, list):
+            return
+        perps = self.perpetuals
+        qvol = self._quote_volume
+        for t in payload:
+            sym = t.get("s")
+            if sym not in perps:
+                continue
+            try:
+                qvol[sym] = float(t.get("q", 0.0))
+            except (TypeError, ValueError):
+                continue
+        self.updates += 1
+        self.last_update_ts = time.time()
+
+    def select(self, current: List[str], max_pairs: int, min_volume_usdt: float) -> List[str]:
+        h = self.hysteresis
+        min_vol = float(min_volume_usdt)
+
+        ranked = sorted(
+            (s for s, qv in self._quote_volume.items() if qv >= min_vol * (1.0 - h)),
+            key=self._quote_volume.__getitem__,
+            reverse=True,
+        )
+        n = max_pairs if max_pairs > 0 else len(ranked)
+        rank = {s: i for i, s in enumerate(ranked)}
+        enter_n = max(int(n * (1.0 - h)), 1)
+        exit_n = int(n * (1.0 + h)) if max_pairs > 0 else len(ranked)
+
+        selected = {
+            s for s in (c.upper() for c in current)
+            if rank.get(s, exit_n) < exit_n
+        }
+        for s in ranked[:enter_n]:
+            if self._quote_volume[s] >= min_vol:
+                selected.add(s)
+        # isi slot kosong dari rank teratas (volume harus lolos batas penuh)
+        for s in ranked:
+            if len(selected) >= n:
+                break
+            if self._quote_volume[s] >= min_vol:
+                selected.add(s)
+
+        result = sorted(selected, key=rank.__getitem__)[:n]
+        new_list = [s.lower() for s in result]
+
+        self.selections += 1
+        if set(new_list) != set(current):
+            self.changes += 1
+            self.last_change_ts = time.time()
+        return new_list
+
+    def stats(self) -> Dict[str, object]:
+        age: Optional[float] = None
+        if self.last_update_ts:
+            age = round(time.time() - self.last_update_ts, 1)
+        return {
+            "tracked": len(self._quote_volume),
+            "perpetuals": len(self.perpetuals),
+            "ticker_age": age,
+            "selections": self.selections,
+            "changes": self.changes,
+        }
+
+
+# ranker aktif (di-set oleh run_sniper_bot), dipakai /status
+active_ranker: Optional[UniverseRanker] = None
+
+
+def format_universe_stats() -> str:
+    if active_ranker is None:
+        return "Universe   : -\n"
+    st = active_ranker.stats()
+    age = "-" if st["ticker_age"] is None else f"{st['ticker_age']:.0f}s"
+    return (
+        f"Universe   : {st['tracked']}/{st['perpetuals']} perp dirank, "
+        f"ticker {age} lalu, {st['changes']} perubahan\n"
+    )
@@ -0,0 +1,47 @@
+# binance/ws_decode.py
+# Decoder frame WebSocket: orjson / msgspec kalau terpasang (opsional),
+# fallback ke json standar. Plus prefilter murah untuk frame kline intrabar
+# (x=false) supaya bisa dibuang sebelum di-decode sama sekali.
+
+import json
+from typing import Any, Callable, Tuple, Type, Union
+
+RawFrame = Union[str, bytes]
+
+try:
+    import orjson
+
+    def decode(raw: RawFrame) -> Any:
+        return orjson.loads(raw)
+
+    DECODER_NAME = "orjson"
+    DecodeError: Tuple[Type[Exception], ...] = (ValueError,)
+except ImportError:
+    try:
+        import msgspec
+
+        _msgspec_decoder = msgspec.json.Decoder()
+
+        def decode(raw: RawFrame) -> Any:
+            return _msgspec_decoder.decode(raw)
+
+        DECODER_NAME = "msgspec"
+        DecodeError = (ValueError, msgspec.DecodeError)
+    except ImportError:
+        decode: Callable[[RawFrame], Any] = json.loads
+        DECODER_NAME = "json"
+        DecodeError = (ValueError,)
+
+# penanda kline belum close di payload Binance (JSON compact, tanpa spasi)
+_INTRABAR_MARK_STR = '"x":false'
+_INTRABAR_MARK_BYTES = b'"x":false'
+
+
+def is_intrabar_kline(raw: RawFrame) -> bool:
+    """
+    True kalau frame adalah update kline yang belum close (x=false).
+    Cuma substring search, tanpa decode / float().
+    """
+    if isinstance(raw, bytes):
+        return _INTRABAR_MARK_BYTES in raw
+    return _INTRABAR_MARK_STR in raw
@@ -0,0 +1,189 @@
+# common/htf_cache.py
+# Cache HTF (REST) thread-safe untuk common/htf_context.py:
+# - single-flight: fetch paralel untuk (symbol, interval) yang sama digabung,
+#   hanya 1 thread yang benar-benar hit REST, sisanya menunggu hasilnya
+# - eviksi: symbol di luar universe aktif dibuang, symbol yang lama tidak
+#   dibaca (idle TTL) dibuang, dan jumlah symbol dibatasi (LRU)
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# jumlah symbol maksimum di cache (LRU)
+HTF_CACHE_MAX_SYMBOLS = 600
+
+# symbol yang tidak dibaca / di-refresh selama ini (detik) → dibuang
+HTF_CACHE_IDLE_TTL = 2 * 3600
+
+# batas tunggu thread follower single-flight (detik)
+HTF_CACHE_FLIGHT_TIMEOUT = 30.0
+
+# entry = {"ts": waktu fetch, "hlc": {"open_time", "high", "low", "close"}}
+HTFEntry = Dict[str, object]
+
+
+class _Flight:
+    __slots__ = ("event", "result")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, np.ndarray]] = None
+
+
+class HTFCache:
+    """
+    symbol → {interval → entry}, urutan OrderedDict = LRU (akses terakhir
+    di belakang). Semua operasi dilindungi satu lock (data kecil, operasi
+    hanya dict lookup); fetch REST selalu dijalankan di luar lock.
+    """
+
+    def __init__(
+        self,
+        max_symbols: int = HTF_CACHE_MAX_SYMBOLS,
+        idle_ttl: float = HTF_CACHE_IDLE_TTL,
+    ) -> None:
+        self.max_symbols = max(int(max_symbols), 1)
+        self.idle_ttl = float(idle_ttl)
+
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Dict[str, HTFEntry]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._inflight: Dict[Tuple[str, str], _Flight] = {}
+        self._universe: Optional[set] = None
+
+        # metrik
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evicted = 0
+
+    # ------------------------------------------------------------------
+    # baca / tulis
+    # ------------------------------------------------------------------
+    def peek(self, symbol: str, interval: str) -> Optional[HTFEntry]:
+        """
+        Baca entry tanpa update LRU / metrik.
+        """
+        with self._lock:
+            return self._data.get(symbol, {}).get(interval)
+
+    def get(self, symbol: str, interval: str, ttl: float) -> Tuple[Optional[HTFEntry], bool]:
+        """
+        Return (entry, fresh). Entry kadaluarsa tetap dikembalikan (fresh=False)
+        supaya caller bisa memakai data lama kalau fetch gagal / dilarang.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(symbol, {}).get(interval)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._data.move_to_end(symbol)
+            self._last_access[symbol] = now
+            fresh = (now - float(entry.get("ts", 0.0))) < ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry, fresh
+
+    def put(self, symbol: str, interval: str, hlc: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        with self._lock:
+            if self._universe is not None and symbol not in self._universe:
+                # symbol sudah keluar universe selama fetch berjalan
+                return
+            sym_cache = self._data.get(symbol)
+            if sym_cache is None:
+                sym_cache = {}
+                self._data[symbol] = sym_cache
+            sym_cache[interval] = {"ts": now, "hlc": hlc}
+            self._data.move_to_end(symbol)
+            self._last_access[symbol] = now
+            self._evict_locked(now)
+
+    # ------------------------------------------------------------------
+    # single-flight
+    # ------------------------------------------------------------------
+    def load(
+        self,
+        symbol: str,
+        interval: str,
+        loader: Callable[[], Optional[Dict[str, np.ndarray]]],
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Jalankan loader() sekali untuk (symbol, interval) walau dipanggil
+        bersamaan dari banyak thread; follower menerima hasil yang sama.
+        """
+        key = (symbol, interval)
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait(HTF_CACHE_FLIGHT_TIMEOUT)
+            return flight.result
+
+        try:
+            flight.result = loader()
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    # ------------------------------------------------------------------
+    # eviksi
+    # ------------------------------------------------------------------
+    def set_universe(self, symbols: Iterable[str]) -> List[str]:
+        """
+        Set universe aktif (uppercase) → buang symbol di luar universe.
+        Return daftar symbol yang dibuang.
+        """
+        universe = set(symbols)
+        with self._lock:
+            self._universe = universe
+            removed = [s for s in self._data if s not in universe]
+            for s in removed:
+                self._drop_locked(s)
+            self._evict_locked(time.time())
+        return removed
+
+    def _drop_locked(self, symbol: str) -> None:
+        self._data.pop(symbol, None)
+        self._last_access.pop(symbol, None)
+        self.evicted += 1
+
+    def _evict_locked(self, now: float) -> None:
+        # LRU: kepala OrderedDict = akses paling lama
+        while self._data:
+            oldest = next(iter(self._data))
+            idle = now - self._last_access.get(oldest, 0.0)
+            if len(self._data) > self.max_symbols or idle > self.idle_ttl:
+                self._drop_locked(oldest)
+            else:
+                break
+
+    # ------------------------------------------------------------------
+    # metrik
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            size = len(self._data)
+            inflight = len(self._inflight)
+        return {
+            "symbols": size,
+            "inflight": inflight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evicted": self.evicted,
+        }
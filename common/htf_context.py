@@ -2,62 +2,123 @@
 # Ambil konteks HTF (15m & 1h) sederhana tanpa indikator:
 # - trend UP / DOWN / RANGE di 1h
 # - posisi harga di dalam range (DISCOUNT / PREMIUM / MID) untuk 1h & 15m
+#
+# Sumber data utama: agregator lokal (15m/1h dibangun dari stream 5m, lihat
+# binance/mtf_aggregator.py). Cache REST di bawah hanya fallback untuk symbol
+# yang belum ter-seed.
 
 from typing import Dict, List, Literal, Optional
 import time
 
 import numpy as np
-import requests
 
-from config import BINANCE_REST_URL
+from binance import binance_http
+from binance.binance_ratelimit import PRIORITY_HTF
+from common.htf_cache import HTFCache
 
 
 # TTL per timeframe
 HTF_TTL_1H = 3600      # 1 jam
 HTF_TTL_15M = 900      # 15 menit
 
-# Struktur cache:
-# _htf_cache = {
-#   "BTCUSDT": {
-#       "1h":  {"ts":..., "hlc": {...}},
-#       "15m": {"ts":..., "hlc": {...}},
-#   },
-# }
-_htf_cache: Dict[str, Dict[str, Dict[str, object]]] = {}
+# jumlah bar HTF yang disimpan per symbol & timeframe
+HTF_HISTORY_BARS = 150
 
+# durasi 1 bar per timeframe (ms), untuk refresh incremental
+HTF_INTERVAL_MS = {
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+}
 
-def _fetch_klines(symbol: str, interval: str, limit: int = 150) -> Optional[List[dict]]:
-    url = f"{BINANCE_REST_URL}/fapi/v1/klines"
-    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+# Cache REST (thread-safe, single-flight, eviksi LRU/idle/universe):
+#   "BTCUSDT" → {"1h": {"ts":..., "hlc": {"open_time", "high", "low", "close"}},
+#                "15m": {...}}
+_htf_cache = HTFCache()
+
+# sumber HTF lokal (MTFAggregator), di-set oleh run_sniper_bot
+_local_source = None
+
+
+def set_local_source(source) -> None:
+    """
+    Daftarkan agregator HTF lokal. Harus punya get_hlc(symbol, interval)
+    dan age(symbol, interval); symbol lowercase (sama dengan buffer 5m).
+    """
+    global _local_source
+    _local_source = source
+
+
+def _local_hlc(symbol_u: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+    if _local_source is None:
+        return None
+    return _local_source.get_hlc(symbol_u.lower(), interval)
+
+
+def _fetch_klines(
+    symbol: str,
+    interval: str,
+    limit: int = 150,
+    start_time: Optional[int] = None,
+) -> Optional[List[dict]]:
+    """
+    Sync wrapper (dipanggil dari thread) → lewat HTTP client shared di event loop.
+    """
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        return r.json()
+        return binance_http.run_sync(
+            binance_http.fetch_klines, symbol, interval, limit, start_time, PRIORITY_HTF
+        )
     except Exception as e:
         print(f"[{symbol}] ERROR fetch HTF klines ({interval}):", e)
         return None
 
 
 def _parse_ohlc(data: List[dict]) -> Dict[str, np.ndarray]:
+    open_times = []
     highs = []
     lows = []
     closes = []
 
     for row in data:
         try:
-            highs.append(float(row[2]))
-            lows.append(float(row[3]))
-            closes.append(float(row[4]))
+            ot = int(row[0])
+            h = float(row[2])
+            l = float(row[3])
+            c = float(row[4])
         except Exception:
             continue
+        open_times.append(ot)
+        highs.append(h)
+        lows.append(l)
+        closes.append(c)
 
     return {
+        "open_time": np.asarray(open_times, dtype=np.int64),
         "high": np.asarray(highs, dtype=float),
         "low": np.asarray(lows, dtype=float),
         "close": np.asarray(closes, dtype=float),
     }
 
 
+def _shift_in(
+    old: Dict[str, np.ndarray],
+    new: Dict[str, np.ndarray],
+    size: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Gabungkan bar baru ke array rolling lama: bar dengan open_time >= bar
+    pertama `new` diganti (bar forming terakhir ikut ter-update), sisanya
+    digeser keluar supaya panjang tetap maksimal `size`.
+    Array baru dibuat (copy-on-write) → pembaca di thread lain aman.
+    """
+    if new["open_time"].size == 0:
+        return old
+    keep = int(np.searchsorted(old["open_time"], new["open_time"][0], side="left"))
+    return {
+        key: np.concatenate((old[key][:keep], new[key]))[-size:]
+        for key in ("open_time", "high", "low", "close")
+    }
+
+
 def _detect_trend_1h(hlc: Dict[str, np.ndarray]) -> Literal["UP", "DOWN", "RANGE"]:
     highs = hlc["high"]
     lows = hlc["low"]
@@ -139,72 +200,106 @@ def _discount_premium(
     }
 
 
+def _cache_age(symbol_u: str, interval: str) -> Optional[float]:
+    """
+    Umur data HTF (detik sejak update terakhir), None kalau belum ada.
+    """
+    if _local_hlc(symbol_u, interval) is not None:
+        return _local_source.age(symbol_u.lower(), interval)
+    tf_cache = _htf_cache.peek(symbol_u, interval)
+    if not tf_cache or tf_cache.get("hlc") is None:
+        return None
+    return time.time() - float(tf_cache.get("ts", 0.0))
+
+
 def _get_hlc_cached(
     symbol_u: str,
     interval: str,
     limit: int,
     ttl: int,
+    allow_fetch: bool = True,
 ) -> Optional[Dict[str, np.ndarray]]:
     """
     Ambil HLC (high/low/close) dari cache jika belum kadaluarsa,
     kalau sudah expired → fetch dari REST + update cache.
+    allow_fetch=False → hanya baca memori (data lama tetap dipakai).
+    Data agregator lokal selalu diutamakan (tanpa REST).
     """
-    now = time.time()
-    sym_cache = _htf_cache.get(symbol_u)
-    tf_cache = sym_cache.get(interval) if sym_cache else None
+    local = _local_hlc(symbol_u, interval)
+    if local is not None:
+        return local
 
-    if tf_cache:
-        ts = float(tf_cache.get("ts", 0.0))
-        hlc = tf_cache.get("hlc")
-        if hlc is not None and (now - ts) < ttl:
-            return hlc  # pakai data cached
+    tf_cache, fresh = _htf_cache.get(symbol_u, interval, ttl)
+    hlc = tf_cache.get("hlc") if tf_cache else None
 
-    # butuh fetch baru
-    data = _fetch_klines(symbol_u, interval, limit)
-    if not data:
-        # gagal fetch → jangan overwrite cache hlc lama,
-        # supaya masih bisa pakai data sebelumnya (kalau ada)
-        if tf_cache and "hlc" in tf_cache:
-            return tf_cache["hlc"]
-        return None
+    if hlc is not None and (fresh or not allow_fetch):
+        return hlc  # pakai data cached
 
-    hlc = _parse_ohlc(data)
-
-    if sym_cache is None:
-        sym_cache = {}
-        _htf_cache[symbol_u] = sym_cache
-
-    sym_cache[interval] = {
-        "ts": now,
-        "hlc": hlc,
-    }
+    if not allow_fetch:
+        return None
 
-    return hlc
+    return refresh_htf(symbol_u, interval, limit)
 
 
-def get_htf_context(symbol: str) -> Dict[str, object]:
+def refresh_htf(
+    symbol: str,
+    interval: str,
+    limit: int = HTF_HISTORY_BARS,
+) -> Optional[Dict[str, np.ndarray]]:
     """
-    Ambil konteks 1h & 15m untuk symbol (tanpa indikator klasik),
-    dengan caching terpisah:
-    - 1h: refresh setiap HTF_TTL_1H
-    - 15m: refresh setiap HTF_TTL_15M
+    Fetch HTF dari REST & simpan ke cache (dipakai prefetcher background).
+    Kalau cache sudah ada, hanya bar setelah open_time terakhir yang diambil
+    lalu digeser masuk ke array rolling (maks `limit` bar).
+    Gagal fetch → cache lama tidak ditimpa.
+    Panggilan bersamaan untuk (symbol, interval) yang sama → 1 request REST.
     """
     symbol_u = symbol.upper()
+    return _htf_cache.load(
+        symbol_u, interval, lambda: _refresh_htf_uncached(symbol_u, interval, limit)
+    )
 
-    ctx_default = {
-        "trend_1h": "RANGE",
-        "pos_1h": "MID",
-        "pos_15m": "MID",
-        "htf_ok_long": True,
-        "htf_ok_short": True,
-    }
 
-    hlc_1h = _get_hlc_cached(symbol_u, "1h", 150, HTF_TTL_1H)
-    hlc_15m = _get_hlc_cached(symbol_u, "15m", 150, HTF_TTL_15M)
+def _refresh_htf_uncached(
+    symbol_u: str,
+    interval: str,
+    limit: int,
+) -> Optional[Dict[str, np.ndarray]]:
+    now = time.time()
+    tf_cache = _htf_cache.peek(symbol_u, interval)
+    old_hlc = tf_cache.get("hlc") if tf_cache else None
+
+    # incremental: cukup ambil bar mulai open_time terakhir di cache
+    # (bar terakhir biasanya masih forming → ikut di-update)
+    start_time: Optional[int] = None
+    fetch_limit = limit
+    interval_ms = HTF_INTERVAL_MS.get(interval)
+    if old_hlc is not None and interval_ms and old_hlc.get("open_time", np.empty(0)).size:
+        last_open = int(old_hlc["open_time"][-1])
+        missing = (int(now * 1000) - last_open) // interval_ms + 1
+        if missing < limit:
+            start_time = last_open
+            fetch_limit = int(missing) + 1
+
+    data = _fetch_klines(symbol_u, interval, fetch_limit, start_time)
+    if not data:
+        # gagal fetch → jangan overwrite cache hlc lama,
+        # supaya masih bisa pakai data sebelumnya (kalau ada)
+        if old_hlc is not None:
+            return old_hlc
+        return None
+
+    hlc = _parse_ohlc(data)
+    if start_time is not None:
+        hlc = _shift_in(old_hlc, hlc, limit)
+
+    _htf_cache.put(symbol_u, interval, hlc)
+    return hlc
 
-    if hlc_1h is None or hlc_15m is None:
-        return ctx_default
 
+def compute_htf_context(
+    hlc_1h: Dict[str, np.ndarray],
+    hlc_15m: Dict[str, np.ndarray],
+) -> Dict[str, object]:
     trend_1h = _detect_trend_1h(hlc_1h)
     pos1 = _discount_premium(hlc_1h)
     pos15 = _discount_premium(hlc_15m)
@@ -230,3 +325,53 @@ def get_htf_context(symbol: str) -> Dict[str, object]:
         "htf_ok_long": htf_ok_long,
         "htf_ok_short": htf_ok_short,
     }
+
+
+def get_htf_context(symbol: str, allow_fetch: bool = True) -> Dict[str, object]:
+    """
+    Ambil konteks 1h & 15m untuk symbol (tanpa indikator klasik).
+    Sumber utama agregator lokal; fallback cache REST dengan TTL terpisah:
+    - 1h: refresh setiap HTF_TTL_1H
+    - 15m: refresh setiap HTF_TTL_15M
+
+    allow_fetch=False → hanya baca memori, tidak ada REST di jalur sinyal.
+    age_1h / age_15m = umur data HTF (detik).
+    """
+    symbol_u = symbol.upper()
+
+    hlc_1h = _get_hlc_cached(symbol_u, "1h", HTF_HISTORY_BARS, HTF_TTL_1H, allow_fetch)
+    hlc_15m = _get_hlc_cached(symbol_u, "15m", HTF_HISTORY_BARS, HTF_TTL_15M, allow_fetch)
+
+    ages = {
+        "age_1h": _cache_age(symbol_u, "1h"),
+        "age_15m": _cache_age(symbol_u, "15m"),
+    }
+
+    if hlc_1h is None or hlc_15m is None:
+        return {
+            "trend_1h": "RANGE",
+            "pos_1h": "MID",
+            "pos_15m": "MID",
+            "htf_ok_long": True,
+            "htf_ok_short": True,
+            **ages,
+        }
+
+    ctx = compute_htf_context(hlc_1h, hlc_15m)
+    return {**ctx, **ages}
+
+
+def set_active_universe(symbols: List[str]) -> None:
+    """
+    Universe volume aktif berubah → buang cache REST symbol yang keluar
+    (memori tetap terbatas walau universe berganti-ganti berhari-hari).
+    """
+    _htf_cache.set_universe({s.upper() for s in symbols})
+
+
+def format_htf_stats() -> str:
+    cs = _htf_cache.stats()
+    return (
+        f"HTF cache  : {cs['symbols']} symbol, hit {cs['hits']} / miss {cs['misses']}, "
+        f"coalesce {cs['coalesced']}, evict {cs['evicted']}\n"
+    )
@@ -0,0 +1,102 @@
+# common/htf_prefetch.py
+# Seed / prefetch konteks HTF (1h & 15m).
+# Dengan agregator lokal (binance/mtf_aggregator.py) REST hanya dipakai sekali
+# per symbol untuk seed history; loop background cukup me-retry symbol yang
+# belum ter-seed, sejajar dengan boundary 15m/1h. Tanpa agregator → refresh
+# cache REST seluruh universe seperti sebelumnya.
+
+import asyncio
+import time
+from typing import Callable, Iterable, List
+
+from binance import binance_http
+from binance.binance_ratelimit import PRIORITY_HTF
+from binance.kline_store import get_store, warm_klines
+from common.htf_context import HTF_HISTORY_BARS, refresh_htf
+from core.bot_state import state
+
+# batas request REST HTF paralel
+HTF_PREFETCH_CONCURRENCY = 10
+
+# jeda setelah boundary (detik) supaya candle baru sudah tersedia di REST
+HTF_PREFETCH_DELAY_SECONDS = 3.0
+
+_PERIOD_15M = 15 * 60
+_PERIOD_1H = 60 * 60
+
+
+async def prefetch_htf(
+    symbols: Iterable[str],
+    intervals: Iterable[str] = ("1h", "15m"),
+    concurrency: int = HTF_PREFETCH_CONCURRENCY,
+    aggregator=None,
+) -> int:
+    """
+    Refresh cache HTF untuk banyak symbol (paralel, dibatasi semaphore).
+    aggregator diisi → history dipakai untuk seed agregator lokal (dari store
+    kline lokal + ekor REST kalau store dikonfigurasi).
+    Return jumlah (symbol, interval) yang berhasil.
+    """
+    symbols = list(symbols)
+    intervals = list(intervals)
+    if not symbols or not intervals:
+        return 0
+
+    sem = asyncio.Semaphore(concurrency)
+    # pastikan client shared terikat ke loop ini sebelum refresh_htf
+    # (thread) meminjamnya lewat run_sync
+    binance_http.get_client()
+    store = get_store()
+
+    async def _one(sym: str, interval: str) -> bool:
+        async with sem:
+            try:
+                if aggregator is not None:
+                    kl = await warm_klines(
+                        store, sym, interval, HTF_HISTORY_BARS, priority=PRIORITY_HTF
+                    )
+                    if not kl:
+                        return False
+                    aggregator.seed(sym, interval, kl)
+                    return True
+                hlc = await asyncio.to_thread(refresh_htf, sym, interval)
+                return hlc is not None
+            except Exception as e:
+                print(f"[HTF PREFETCH ERROR] {sym} {interval}: {e}")
+                return False
+
+    t0 = time.time()
+    results = await asyncio.gather(*(_one(s, iv) for s in symbols for iv in intervals))
+    ok = sum(1 for r in results if r)
+    print(
+        f"[HTF PREFETCH] {'/'.join(intervals)} untuk {len(symbols)} symbol: "
+        f"{ok}/{len(results)} OK ({time.time() - t0:.1f}s)."
+    )
+    return ok
+
+
+async def run_htf_prefetcher(get_symbols: Callable[[], List[str]], aggregator=None) -> None:
+    """
+    Loop background: tidur sampai boundary 15m berikutnya (+ jeda kecil),
+    lalu refresh 15m untuk seluruh universe; di boundary jam juga 1h.
+    Dengan aggregator: hanya seed ulang symbol yang belum punya data lokal
+    (steady state = tanpa request REST).
+    """
+    while state.running:
+        now = time.time()
+        boundary = (int(now) // _PERIOD_15M + 1) * _PERIOD_15M
+        await asyncio.sleep(boundary + HTF_PREFETCH_DELAY_SECONDS - now)
+
+        try:
+            if aggregator is not None:
+                missing = aggregator.symbols_missing(get_symbols())
+                if missing:
+                    await prefetch_htf(missing, aggregator=aggregator)
+                continue
+
+            intervals = ["15m"]
+            if boundary % _PERIOD_1H == 0:
+                intervals.insert(0, "1h")
+            await prefetch_htf(get_symbols(), intervals)
+        except Exception as e:
+            print("Error di run_htf_prefetcher:", e)
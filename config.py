@@ -8,6 +8,25 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_ADMIN_ID = os.getenv("TELEGRAM_ADMIN_ID", "")
 TELEGRAM_ADMIN_USERNAME = os.getenv("TELEGRAM_ADMIN_USERNAME", "")
 
+# Fan-out sinyal: batas global (pesan/detik, limit bot Telegram ±30/s), per
+# chat (pesan/detik), request paralel maks & jumlah retry (429 / jaringan)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "30"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+
+# Outbox persisten (SQLite) untuk pengiriman sinyal: file DB, percobaan maks
+# per penerima & umur maks sinyal (detik) sebelum delivery pending dibuang
+TELEGRAM_OUTBOX_DB = os.getenv("TELEGRAM_OUTBOX_DB", "telegram_outbox.db")
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "8"))
+TELEGRAM_OUTBOX_MAX_AGE = int(os.getenv("TELEGRAM_OUTBOX_MAX_AGE", "1800"))
+
+# Digest sinyal per close 5m: sinyal dalam window (ms sejak sinyal pertama)
+# digabung jadi satu pesan, maks SIGNAL_DIGEST_MAX sinyal (ranking tier/score);
+# window 0 = tiap sinyal dikirim sendiri
+SIGNAL_DIGEST_WINDOW_MS = int(os.getenv("SIGNAL_DIGEST_WINDOW_MS", "3000"))
+SIGNAL_DIGEST_MAX = int(os.getenv("SIGNAL_DIGEST_MAX", "5"))
+
 # === BINANCE FUTURES (USDT PERP) ===
 BINANCE_REST_URL = "https://fapi.binance.com"
 BINANCE_STREAM_URL = "wss://fstream.binance.com/stream"
@@ -24,5 +43,50 @@ MIN_TIER_TO_SEND = os.getenv("MIN_TIER_TO_SEND", "A")
 # Cooldown default antar sinyal per pair (detik)
 SIGNAL_COOLDOWN_SECONDS = int(os.getenv("SIGNAL_COOLDOWN_SECONDS", "600"))
 
-# Refresh interval untuk daftar pair (jam)
+# Refresh interval daftar USDT perpetual dari exchangeInfo (jam);
+# ranking volume sendiri live dari stream !miniTicker@arr
 REFRESH_PAIR_INTERVAL_HOURS = int(os.getenv("REFRESH_PAIR_INTERVAL_HOURS", "24"))
+
+# Maksimum stream per koneksi WebSocket (shard); pair dibagi ke beberapa koneksi
+WS_STREAMS_PER_SHARD = int(os.getenv("WS_STREAMS_PER_SHARD", "100"))
+
+# Mode batch detector: candle close dikumpulkan selama window singkat setelah
+# boundary 5m lalu dievaluasi sekaligus (vectorized)
+SNIPER_BATCH_MODE = os.getenv("SNIPER_BATCH_MODE", "1") == "1"
+SNIPER_BATCH_WINDOW_MS = int(os.getenv("SNIPER_BATCH_WINDOW_MS", "300"))
+
+# Pipeline analisa: jumlah worker, kapasitas antrian, umur maksimum close (detik)
+# sebelum dianggap basi, dan ukuran thread pool CPU (analisa) & I/O (broadcast)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "500"))
+ANALYSIS_MAX_WAIT_SECONDS = float(os.getenv("ANALYSIS_MAX_WAIT_SECONDS", "120"))
+ANALYSIS_CPU_THREADS = int(os.getenv("ANALYSIS_CPU_THREADS", "2"))
+ANALYSIS_IO_THREADS = int(os.getenv("ANALYSIS_IO_THREADS", "8"))
+
+# HTTP client REST Binance (shared, keep-alive): jumlah koneksi maksimum ke
+# fapi & HTTP/2 (butuh paket h2; tanpa h2 otomatis HTTP/1.1)
+BINANCE_HTTP_MAX_CONNECTIONS = int(os.getenv("BINANCE_HTTP_MAX_CONNECTIONS", "20"))
+BINANCE_HTTP2 = os.getenv("BINANCE_HTTP2", "1") == "1"
+
+# Limit request weight REST Binance Futures per menit (per IP) & budget yang
+# boleh dipakai bot (sisakan ruang untuk proses lain / lonjakan)
+BINANCE_WEIGHT_LIMIT_1M = int(os.getenv("BINANCE_WEIGHT_LIMIT_1M", "2400"))
+BINANCE_WEIGHT_BUDGET_1M = int(os.getenv("BINANCE_WEIGHT_BUDGET_1M", "1800"))
+
+# Universe live dari stream !miniTicker@arr: hysteresis rank/volume (0.1 = 10%)
+# & interval evaluasi ulang universe (detik)
+UNIVERSE_HYSTERESIS = float(os.getenv("UNIVERSE_HYSTERESIS", "0.1"))
+UNIVERSE_EVAL_SECONDS = int(os.getenv("UNIVERSE_EVAL_SECONDS", "30"))
+
+# Buang frame kline intrabar (x=false) sebelum decode; detector hanya memakai
+# candle close. 0 = tetap update candle forming di buffer
+WS_KLINE_PREFILTER = os.getenv("WS_KLINE_PREFILTER", "1") == "1"
+
+# Rekam semua frame WebSocket mentah (gzip per chunk) ke folder ini untuk
+# replay offline (python -m tools.replay_feed); kosong = tidak merekam
+WS_RECORD_DIR = os.getenv("WS_RECORD_DIR", "")
+
+# Store kline historis lokal (kolom biner per symbol/timeframe, diisi
+# python -m tools.sync_klines): preload 5m & seed HTF cukup ambil ekor dari
+# REST, tools offline membaca dari sini; kosong = tidak dipakai
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", "")
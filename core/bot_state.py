@@ -103,17 +103,6 @@ def is_vip(user_id: int) -> bool:
     return bool(exp and exp > now)
 
 
-def cleanup_expired_vip() -> None:
-    now = time.time()
-    expired_ids = [uid for uid, exp in state.vip_users.items() if exp <= now]
-    if not expired_ids:
-        return
-    for uid in expired_ids:
-        del state.vip_users[uid]
-    save_vip_users()
-    print("VIP expired dihapus otomatis:", expired_ids)
-
-
 def load_bot_state() -> None:
     if not os.path.exists(STATE_FILE):
         return
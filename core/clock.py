@@ -0,0 +1,42 @@
+# core/clock.py
+# Sumber waktu jalur sinyal. Default = jam dinding (time.time); replay feed
+# memasang SimClock supaya cooldown, umur antrian & umur HTF mengikuti
+# timestamp frame rekaman, bukan waktu eksekusi.
+
+import time
+from typing import Callable
+
+
+class SimClock:
+    """
+    Jam simulasi: waktu hanya maju lewat set() (dipanggil driver replay).
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+
+    def set(self, ts: float) -> None:
+        if ts > self._now:
+            self._now = float(ts)
+
+    def __call__(self) -> float:
+        return self._now
+
+
+_now_fn: Callable[[], float] = time.time
+
+
+def now() -> float:
+    """
+    Waktu sekarang (detik epoch) menurut clock aktif.
+    """
+    return _now_fn()
+
+
+def use_clock(fn: Callable[[], float]) -> None:
+    global _now_fn
+    _now_fn = fn
+
+
+def use_wall_clock() -> None:
+    use_clock(time.time)
@@ -0,0 +1,200 @@
+# core/recipient_index.py
+# Index penerima sinyal yang di-update incremental: subscriber dipisah jadi
+# set VIP & set FREE yang kuotanya masih ada. Daftar penerima satu sinyal =
+# snapshot kedua set (tanpa cek is_vip / time.time() per user).
+# Reset kuota harian & VIP expired dijalankan scheduler, bukan di jalur broadcast.
+#
+# Dipakai dari dua thread (command loop Telegram & event loop sniper) → lock.
+
+import asyncio
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import TELEGRAM_ADMIN_ID
+from core.bot_state import state, save_vip_users
+
+# kuota sinyal harian user FREE
+FREE_DAILY_LIMIT = 2
+
+# interval maks scheduler (detik); tidur lebih pendek kalau ada VIP / hari
+# baru yang jatuh tempo lebih dulu
+RECIPIENT_SCHEDULER_MAX_SLEEP = 60.0
+
+
+def _is_admin_id(chat_id: int) -> bool:
+    return bool(TELEGRAM_ADMIN_ID) and str(chat_id) == str(TELEGRAM_ADMIN_ID)
+
+
+class RecipientIndex:
+    """
+    Pemilik perubahan state.subscribers & state.vip_users (save JSON di
+    pemanggil, kecuali VIP expired dari scheduler). Admin tidak masuk index (selalu ditambahkan broadcast).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.vip: Set[int] = set()
+        self.free: Set[int] = set()
+        # (expiry, user_id); entry basi (VIP diperpanjang / dihapus) dilewati
+        self._expiry: List[Tuple[float, int]] = []
+
+    # ------------------------------------------------------------------
+    # build
+    # ------------------------------------------------------------------
+    def rebuild(self, now: Optional[float] = None) -> None:
+        """
+        Bangun ulang dari state (setelah load subscribers / VIP).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expiry = [(exp, uid) for uid, exp in state.vip_users.items()]
+            heapq.heapify(self._expiry)
+            self.vip = set()
+            self.free = set()
+            for cid in state.subscribers:
+                self._place(cid, now)
+
+    def _place(self, cid: int, now: float) -> None:
+        self.vip.discard(cid)
+        self.free.discard(cid)
+        if cid not in state.subscribers or _is_admin_id(cid):
+            return
+        exp = state.vip_users.get(cid)
+        if exp and exp > now:
+            self.vip.add(cid)
+        elif state.daily_counts.get(cid, 0) < FREE_DAILY_LIMIT:
+            self.free.add(cid)
+
+    # ------------------------------------------------------------------
+    # perubahan dari command
+    # ------------------------------------------------------------------
+    def subscribe(self, cid: int) -> bool:
+        with self._lock:
+            if cid in state.subscribers:
+                return False
+            state.subscribers.add(cid)
+            self._place(cid, time.time())
+            return True
+
+    def unsubscribe(self, cid: int) -> bool:
+        with self._lock:
+            if cid not in state.subscribers:
+                return False
+            state.subscribers.discard(cid)
+            self._place(cid, time.time())
+            return True
+
+    def set_vip(self, uid: int, expiry: float) -> None:
+        with self._lock:
+            state.vip_users[uid] = expiry
+            heapq.heappush(self._expiry, (expiry, uid))
+            self._place(uid, time.time())
+
+    def remove_vip(self, uid: int) -> bool:
+        with self._lock:
+            if uid not in state.vip_users:
+                return False
+            del state.vip_users[uid]
+            self._place(uid, time.time())
+            return True
+
+    # ------------------------------------------------------------------
+    # broadcast
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Tuple[List[int], Dict[int, int]]:
+        """
+        (semua VIP, FREE → sisa kuota hari ini) untuk satu broadcast.
+        """
+        with self._lock:
+            return list(self.vip), {
+                cid: FREE_DAILY_LIMIT - state.daily_counts.get(cid, 0) for cid in self.free
+            }
+
+    def charge(self, used: Dict[int, int]) -> None:
+        """
+        Potong kuota FREE sejumlah sinyal yang benar-benar dikirim;
+        habis → keluar dari set FREE.
+        """
+        with self._lock:
+            for cid, n in used.items():
+                count = state.daily_counts.get(cid, 0) + n
+                state.daily_counts[cid] = count
+                if count >= FREE_DAILY_LIMIT:
+                    self.free.discard(cid)
+
+    # ------------------------------------------------------------------
+    # scheduler
+    # ------------------------------------------------------------------
+    def roll_day(self, today: str) -> bool:
+        """
+        Hari baru → reset kuota FREE. Return True kalau terjadi reset.
+        """
+        with self._lock:
+            if state.daily_date == today:
+                return False
+            state.daily_date = today
+            state.daily_counts = {}
+            now = time.time()
+            for cid in state.subscribers:
+                self._place(cid, now)
+            return True
+
+    def expire_vip(self, now: Optional[float] = None) -> List[int]:
+        """
+        Hapus VIP yang expired (pindah ke FREE kalau masih subscribe).
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                exp, uid = heapq.heappop(self._expiry)
+                if state.vip_users.get(uid) != exp:
+                    continue
+                del state.vip_users[uid]
+                self._place(uid, now)
+                expired.append(uid)
+            if expired:
+                save_vip_users()
+        if expired:
+            print("VIP expired dihapus otomatis:", expired)
+        return expired
+
+    def next_expiry(self) -> float:
+        with self._lock:
+            while self._expiry and state.vip_users.get(self._expiry[0][1]) != self._expiry[0][0]:
+                heapq.heappop(self._expiry)
+            return self._expiry[0][0] if self._expiry else float("inf")
+
+
+recipient_index = RecipientIndex()
+
+
+def _seconds_to_midnight(now: float) -> float:
+    lt = time.localtime(now)
+    return 86400 - (lt.tm_hour * 3600 + lt.tm_min * 60 + lt.tm_sec)
+
+
+async def run_recipient_scheduler() -> None:
+    """
+    Task background: reset kuota harian saat ganti hari & VIP expired,
+    tidur sampai kejadian berikutnya (maks RECIPIENT_SCHEDULER_MAX_SLEEP).
+    """
+    while state.running:
+        try:
+            today = time.strftime("%Y-%m-%d")
+            if recipient_index.roll_day(today):
+                print("Reset daily_counts untuk hari baru:", today)
+            recipient_index.expire_vip()
+
+            now = time.time()
+            wait = min(
+                RECIPIENT_SCHEDULER_MAX_SLEEP,
+                _seconds_to_midnight(now),
+                recipient_index.next_expiry() - now,
+            )
+        except Exception as e:
+            print("Error recipient scheduler:", e)
+            wait = RECIPIENT_SCHEDULER_MAX_SLEEP
+        await asyncio.sleep(max(wait, 0.5))
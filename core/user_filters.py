@@ -0,0 +1,289 @@
+# core/user_filters.py
+# Filter sinyal per user (whitelist / blacklist symbol, side, min tier, SL%
+# maks) + inverted index untuk fan-out: user yang TIDAK cocok dengan satu
+# sinyal diambil dari index per symbol / side / tier / SL, jadi biaya cek
+# sebanding dengan user yang punya filter relevan, bukan seluruh subscriber.
+# Min tier pribadi menggantikan min tier global (boleh lebih longgar / ketat);
+# user tanpa filter tier ikut min tier global (/mode).
+#
+# Disimpan ringkas di user_filters.json, hanya field yang di-set:
+#   {"123": {"w": ["BTCUSDT", "ETHUSDT"], "s": "long", "t": "A", "sl": 2.5}}
+
+import bisect
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sniper.sniper_tiers import TIER_ORDER, default_min_tier, should_send_tier
+
+USER_FILTERS_FILE = "user_filters.json"
+
+# batas symbol per whitelist / blacklist
+FILTER_MAX_SYMBOLS = 50
+
+FILTER_SIDES = ("long", "short")
+FILTER_TIERS = ("B", "A", "A+")
+
+
+@dataclass(frozen=True)
+class UserFilter:
+    only: FrozenSet[str] = field(default_factory=frozenset)    # kosong = semua symbol
+    block: FrozenSet[str] = field(default_factory=frozenset)
+    side: str = ""           # "" = long & short
+    min_tier: str = ""       # "" = ikut min tier global
+    max_sl: float = 0.0      # 0 = tanpa batas SL%
+
+    def is_empty(self) -> bool:
+        return not (self.only or self.block or self.side or self.min_tier or self.max_sl > 0)
+
+    def to_json(self) -> dict:
+        data: dict = {}
+        if self.only:
+            data["w"] = sorted(self.only)
+        if self.block:
+            data["b"] = sorted(self.block)
+        if self.side:
+            data["s"] = self.side
+        if self.min_tier:
+            data["t"] = self.min_tier
+        if self.max_sl > 0:
+            data["sl"] = self.max_sl
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "UserFilter":
+        side = data.get("s", "")
+        tier = data.get("t", "")
+        return cls(
+            only=frozenset(data.get("w", [])),
+            block=frozenset(data.get("b", [])),
+            side=side if side in FILTER_SIDES else "",
+            min_tier=tier if tier in FILTER_TIERS else "",
+            max_sl=float(data.get("sl", 0.0)),
+        )
+
+    def describe(self) -> str:
+        return (
+            f"Symbol   : {', '.join(sorted(self.only)) if self.only else 'semua'}\n"
+            f"Blokir   : {', '.join(sorted(self.block)) if self.block else '-'}\n"
+            f"Arah     : {self.side.upper() if self.side else 'LONG & SHORT'}\n"
+            f"Min Tier : {self.min_tier or 'ikut bot'}\n"
+            f"SL maks  : {f'{self.max_sl:g}%' if self.max_sl > 0 else 'tanpa batas'}\n"
+        )
+
+
+@dataclass(frozen=True)
+class Exclusion:
+    """
+    User yang menolak satu sinyal: `users`, ditambah semua user di luar
+    `allowed` kalau allowed di-set (tier sinyal di bawah min tier global →
+    hanya user dengan filter tier cukup longgar yang menerima).
+    """
+    users: Set[int] = field(default_factory=set)
+    allowed: Optional[Set[int]] = None
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self.users or (self.allowed is not None and uid not in self.allowed)
+
+
+def normalize_symbol(sym: str) -> str:
+    sym = sym.strip().upper()
+    return sym if sym.endswith("USDT") else sym + "USDT"
+
+
+class FilterIndex:
+    """
+    filters: user_id → UserFilter (hanya user dengan filter non-kosong).
+    Dipakai dari command loop (set/clear) & event loop (excluded) → lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.filters: Dict[int, UserFilter] = {}
+        self._only: Dict[str, Set[int]] = {}       # symbol → user yang whitelist-nya memuat symbol
+        self._only_users: Set[int] = set()         # user yang punya whitelist
+        self._block: Dict[str, Set[int]] = {}      # symbol → user yang memblokir
+        self._side: Dict[str, Set[int]] = {}       # side → user yang HANYA mau side itu
+        self._tier: Dict[str, Set[int]] = {}       # min tier → user
+        self._sl: List[Tuple[float, int]] = []     # (SL% maks, user) urut
+
+    def load(self, filters: Dict[int, UserFilter]) -> None:
+        with self._lock:
+            self.filters = {}
+            self._only, self._only_users, self._block = {}, set(), {}
+            self._side, self._tier, self._sl = {}, {}, []
+            for uid, flt in filters.items():
+                self._add(uid, flt)
+
+    def get(self, uid: int) -> UserFilter:
+        return self.filters.get(uid) or UserFilter()
+
+    def set(self, uid: int, flt: UserFilter) -> None:
+        with self._lock:
+            self._remove(uid)
+            self._add(uid, flt)
+
+    def _add(self, uid: int, flt: UserFilter) -> None:
+        if flt.is_empty():
+            return
+        self.filters[uid] = flt
+        for sym in flt.only:
+            self._only.setdefault(sym, set()).add(uid)
+        if flt.only:
+            self._only_users.add(uid)
+        for sym in flt.block:
+            self._block.setdefault(sym, set()).add(uid)
+        if flt.side:
+            self._side.setdefault(flt.side, set()).add(uid)
+        if flt.min_tier:
+            self._tier.setdefault(flt.min_tier, set()).add(uid)
+        if flt.max_sl > 0:
+            bisect.insort(self._sl, (flt.max_sl, uid))
+
+    def _remove(self, uid: int) -> None:
+        flt = self.filters.pop(uid, None)
+        if flt is None:
+            return
+        for sym in flt.only:
+            _discard(self._only, sym, uid)
+        self._only_users.discard(uid)
+        for sym in flt.block:
+            _discard(self._block, sym, uid)
+        if flt.side:
+            _discard(self._side, flt.side, uid)
+        if flt.min_tier:
+            _discard(self._tier, flt.min_tier, uid)
+        if flt.max_sl > 0:
+            i = bisect.bisect_left(self._sl, (flt.max_sl, uid))
+            if i < len(self._sl) and self._sl[i] == (flt.max_sl, uid):
+                del self._sl[i]
+
+    def lowest_tier(self) -> str:
+        """
+        Tier terendah yang diminta siapa pun (min tier global atau filter
+        pribadi) → batas tier deteksi sinyal.
+        """
+        with self._lock:
+            tiers = [default_min_tier(), *self._tier]
+        return min(tiers, key=lambda t: TIER_ORDER.get(t, 0))
+
+    def excluded(self, symbol: str, side: str, tier: str, sl_pct: float) -> Exclusion:
+        """
+        User yang filternya menolak sinyal ini (`uid in hasil`).
+        """
+        rank = TIER_ORDER.get(tier, 0)
+        with self._lock:
+            allowed: Optional[Set[int]] = None
+            if not should_send_tier(tier):
+                # user tanpa filter tier ikut min tier global → ditolak
+                allowed = set().union(
+                    *(users for t, users in self._tier.items() if TIER_ORDER[t] <= rank)
+                )
+            if not self.filters:
+                return Exclusion(allowed=allowed)
+            out: Set[int] = set()
+            if self._only_users:
+                out |= self._only_users - self._only.get(symbol, set())
+            out |= self._block.get(symbol, set())
+            for s, users in self._side.items():
+                if s != side:
+                    out |= users
+            for t, users in self._tier.items():
+                if TIER_ORDER[t] > rank:
+                    out |= users
+            # SL% maks < SL sinyal
+            cut = bisect.bisect_left(self._sl, (sl_pct, float("-inf")))
+            out.update(uid for _, uid in self._sl[:cut])
+            return Exclusion(out, allowed)
+
+
+def _discard(index: Dict[str, Set[int]], key: str, uid: int) -> None:
+    users = index.get(key)
+    if users is None:
+        return
+    users.discard(uid)
+    if not users:
+        del index[key]
+
+
+filter_index = FilterIndex()
+
+
+def load_user_filters() -> Dict[int, UserFilter]:
+    if not os.path.exists(USER_FILTERS_FILE):
+        return {}
+    try:
+        with open(USER_FILTERS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {int(k): UserFilter.from_json(v) for k, v in data.items()}
+    except Exception as e:
+        print("Gagal load user filters:", e)
+        return {}
+
+
+def save_user_filters() -> None:
+    try:
+        data = {str(uid): flt.to_json() for uid, flt in list(filter_index.filters.items())}
+        with open(USER_FILTERS_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+    except Exception as e:
+        print("Gagal simpan user filters:", e)
+
+
+def parse_filter_args(flt: UserFilter, args: List[str]) -> Tuple[Optional[UserFilter], str]:
+    """
+    /filter <sub> ... → (filter baru, pesan error). Sub-command:
+    only / block <SYMBOL...|off>, side long|short|all, tier B|A|A+|off,
+    maxsl <persen|off>, reset.
+    """
+    if not args:
+        return None, "Sub-command kosong."
+    sub = args[0].lower()
+    rest = args[1:]
+    off = len(rest) == 1 and rest[0].lower() in ("off", "all", "semua", "0")
+
+    if sub == "reset":
+        return UserFilter(), ""
+
+    if sub in ("only", "block"):
+        if not rest:
+            return None, f"Gunakan: /filter {sub} BTCUSDT ETHUSDT | off"
+        symbols = frozenset() if off else frozenset(normalize_symbol(s) for s in rest)
+        if len(symbols) > FILTER_MAX_SYMBOLS:
+            return None, f"Maksimal {FILTER_MAX_SYMBOLS} symbol."
+        if sub == "only":
+            return UserFilter(symbols, flt.block - symbols, flt.side, flt.min_tier, flt.max_sl), ""
+        return UserFilter(flt.only - symbols, symbols, flt.side, flt.min_tier, flt.max_sl), ""
+
+    if sub == "side":
+        side = rest[0].lower() if rest else ""
+        if off:
+            side = ""
+        elif side not in FILTER_SIDES:
+            return None, "Gunakan: /filter side long | short | all"
+        return UserFilter(flt.only, flt.block, side, flt.min_tier, flt.max_sl), ""
+
+    if sub == "tier":
+        tier = rest[0].upper() if rest else ""
+        if tier == "APLUS":
+            tier = "A+"
+        if off:
+            tier = ""
+        elif tier not in FILTER_TIERS:
+            return None, "Gunakan: /filter tier B | A | A+ | off"
+        return UserFilter(flt.only, flt.block, flt.side, tier, flt.max_sl), ""
+
+    if sub == "maxsl":
+        if off:
+            return UserFilter(flt.only, flt.block, flt.side, flt.min_tier, 0.0), ""
+        try:
+            max_sl = float(rest[0].rstrip("%"))
+        except (IndexError, ValueError):
+            return None, "Gunakan: /filter maxsl 2.5 | off"
+        if max_sl <= 0:
+            return None, "SL% maks harus > 0 (atau off)."
+        return UserFilter(flt.only, flt.block, flt.side, flt.min_tier, max_sl), ""
+
+    return None, f"Sub-command `{sub}` tidak dikenali."
@@ -1,18 +1,27 @@
 # sniper/sniper_analyzer.py
 # Ubah hasil deteksi Spike-Reversal menjadi sinyal lengkap Entry/SL/TP/Leverage.
 
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Union
 
-from binance.ohlc_buffer import Candle
+from binance.ohlc_buffer import Candle, CandleWindow
 from sniper.sniper_detector import detect_spike_reversal
-from sniper.sniper_settings import sniper_settings
+from sniper.sniper_settings import SniperSettings, sniper_settings
 from sniper.sniper_tiers import evaluate_signal_quality
 from common.htf_context import get_htf_context
+from core.user_filters import filter_index
 
-# cooldown per symbol (berdasarkan jumlah candle yang sudah close)
+# cooldown per symbol (berdasarkan urutan candle / CandleWindow.seq saat sinyal)
 _last_signal_len: Dict[str, int] = {}
 
 
+def release_cooldown(symbol: str, seq: int) -> None:
+    """
+    Batalkan cooldown sinyal di seq ini (sinyal tidak jadi dikirim).
+    """
+    if _last_signal_len.get(symbol) == seq:
+        del _last_signal_len[symbol]
+
+
 def _build_levels(side: str, last: Candle) -> Dict[str, float]:
     """
     Entry dekat bawah/atas tubuh candle spike,
@@ -78,58 +87,45 @@ def _build_levels(side: str, last: Candle) -> Dict[str, float]:
     }
 
 
-def analyze_symbol_sniper(symbol: str, candles_5m: List[Candle]) -> Optional[Dict]:
+def evaluate_setup(
+    det: Dict,
+    get_htf_ctx: Callable[[], Dict],
+    settings: Optional[SniperSettings] = None,
+    min_tier: Optional[str] = None,
+) -> Optional[Dict]:
     """
-    Analisa 5m untuk strategi Sniper Reversal.
-    Dipanggil sekali setiap candle 5m close per symbol.
+    Level + cek RR / SL% + HTF + tier untuk satu hasil deteksi (tanpa state).
+    get_htf_ctx dipanggil hanya kalau level lolos (live: cache HTF,
+    backtest: context point-in-time).
+    Return levels + tier/score/htf_context, atau None kalau tidak dikirim.
     """
-    n = len(candles_5m)
-    if n < 25:
-        return None
-
-    # cooldown per pair
-    last_len = _last_signal_len.get(symbol)
-    if last_len is not None:
-        if n - last_len < sniper_settings.cooldown_candles:
-            return None
-
-    det = detect_spike_reversal(candles_5m)
-    if not det:
-        return None
-
+    s = settings or sniper_settings
     side = det["side"]
-    last = det["last"]
 
-    levels = _build_levels(side, last)
+    levels = _build_levels(side, det["last"])
     entry = levels["entry"]
     sl = levels["sl"]
-    tp1 = levels["tp1"]
-    tp2 = levels["tp2"]
-    tp3 = levels["tp3"]
     sl_pct = levels["sl_pct"]
-    lev_min = levels["lev_min"]
-    lev_max = levels["lev_max"]
 
     # cek RR TP2
     risk = abs(entry - sl)
     if risk <= 0:
         return None
-    rr_tp2 = abs(tp2 - entry) / risk
-    good_rr = rr_tp2 >= sniper_settings.min_rr_tp2
+    rr_tp2 = abs(levels["tp2"] - entry) / risk
+    good_rr = rr_tp2 >= s.min_rr_tp2
 
-    if sl_pct <= 0 or sl_pct > sniper_settings.max_sl_pct:
+    if sl_pct <= 0 or sl_pct > s.max_sl_pct:
         return None
 
-    # HTF context (reuse dari IMB)
-    htf_ctx = get_htf_context(symbol)
+    htf_ctx = get_htf_ctx()
     if side == "long":
         htf_ok = bool(htf_ctx.get("htf_ok_long", True))
     else:
         htf_ok = bool(htf_ctx.get("htf_ok_short", True))
 
     has_leg = (
-        det["bear_leg_cnt"] >= sniper_settings.min_bear_candles
-        or det["bull_leg_cnt"] >= sniper_settings.min_bull_candles
+        det["bear_leg_cnt"] >= s.min_bear_candles
+        or det["bull_leg_cnt"] >= s.min_bull_candles
     )
     spike_ok = True
     sweep_ok = bool(det["sweep_ok"])
@@ -143,12 +139,69 @@ def analyze_symbol_sniper(symbol: str, candles_5m: List[Candle]) -> Optional[Dic
         "sl_pct": sl_pct,
     }
 
-    q = evaluate_signal_quality(meta)
+    q = evaluate_signal_quality(meta, s, min_tier)
     if not q["should_send"]:
         return None
 
-    tier = q["tier"]
-    score = q["score"]
+    return {
+        **levels,
+        "side": side,
+        "tier": q["tier"],
+        "score": q["score"],
+        "htf_context": htf_ctx,
+    }
+
+
+def analyze_symbol_sniper(
+    symbol: str,
+    candles_5m: Union[CandleWindow, List[Candle]],
+    det: Optional[Dict] = None,
+) -> Optional[Dict]:
+    """
+    Analisa 5m untuk strategi Sniper Reversal.
+    Dipanggil sekali setiap candle 5m close per symbol.
+    det: hasil deteksi yang sudah dihitung (mode batch) → deteksi tidak diulang.
+    """
+    n = len(candles_5m)
+    if n < 25:
+        return None
+
+    # cooldown per pair: pakai seq (naik terus) karena panjang window
+    # dibatasi max_candles buffer
+    seq = getattr(candles_5m, "seq", n)
+    last_len = _last_signal_len.get(symbol)
+    if last_len is not None:
+        if 0 <= seq - last_len < sniper_settings.cooldown_candles:
+            return None
+
+    if det is None:
+        det = detect_spike_reversal(candles_5m)
+    if not det:
+        return None
+
+    # HTF context (reuse dari IMB) — hanya baca cache yang diisi prefetcher.
+    # Batas tier = tier terendah yang diminta user (filter pribadi / global);
+    # penyaringan per user di tahap broadcast
+    setup = evaluate_setup(
+        det,
+        lambda: get_htf_context(symbol, allow_fetch=False),
+        min_tier=filter_index.lowest_tier(),
+    )
+    if setup is None:
+        return None
+
+    side = setup["side"]
+    entry = setup["entry"]
+    sl = setup["sl"]
+    tp1 = setup["tp1"]
+    tp2 = setup["tp2"]
+    tp3 = setup["tp3"]
+    sl_pct = setup["sl_pct"]
+    lev_min = setup["lev_min"]
+    lev_max = setup["lev_max"]
+    tier = setup["tier"]
+    score = setup["score"]
+    htf_ctx = setup["htf_context"]
 
     direction_label = "LONG" if side == "long" else "SHORT"
     emoji = "🟢" if side == "long" else "🔴"
@@ -188,7 +241,7 @@ def analyze_symbol_sniper(symbol: str, candles_5m: List[Candle]) -> Optional[Dic
         f"{risk_calc}"
     )
 
-    _last_signal_len[symbol] = n
+    _last_signal_len[symbol] = seq
 
     return {
         "symbol": symbol.upper(),
@@ -204,5 +257,7 @@ def analyze_symbol_sniper(symbol: str, candles_5m: List[Candle]) -> Optional[Dic
         "tier": tier,
         "score": score,
         "htf_context": htf_ctx,
+        "htf_age": {"1h": htf_ctx.get("age_1h"), "15m": htf_ctx.get("age_15m")},
         "message": text,
+        "seq": seq,
     }
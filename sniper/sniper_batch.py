@@ -0,0 +1,209 @@
+# sniper/sniper_batch.py
+# Mode batch Spike-Reversal: semua candle 5m USDT-perp close di detik yang sama,
+# jadi close dikumpulkan sebentar lalu dievaluasi sekaligus sebagai matriks
+# symbols × bars (NumPy). Hanya survivor yang lanjut ke _build_levels & tier.
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from binance.ohlc_buffer import CandleWindow
+from sniper.sniper_detector import detect_spike_reversal
+from sniper.sniper_settings import SniperSettings, sniper_settings
+
+# (symbol, window, close_ts)
+CloseEvent = Tuple[str, CandleWindow, float]
+
+
+def detect_width(s: SniperSettings) -> int:
+    """
+    Jumlah bar (termasuk bar terakhir) yang dibutuhkan detect_matrix.
+    """
+    return max(s.avg_body_lookback, s.leg_lookback, s.sweep_lookback) + 1
+
+
+def detect_matrix(
+    o: np.ndarray,
+    h: np.ndarray,
+    l: np.ndarray,
+    c: np.ndarray,
+    s: SniperSettings,
+) -> Dict[str, np.ndarray]:
+    """
+    Inti vectorized detect_spike_reversal: matriks R × width (tiap baris satu
+    window, bar yang dievaluasi = kolom -1). Baris bisa symbol berbeda (batch
+    live) atau posisi waktu berbeda dari satu symbol (backtest, lewat
+    sliding_window_view).
+    Return array per baris: is_long, is_short, body, range, bear_cnt, bull_cnt.
+    """
+    hist_o, hist_c = o[:, :-1], c[:, :-1]
+    avg_body = np.abs(hist_c - hist_o)[:, -s.avg_body_lookback:].mean(axis=1)
+    bear_cnt = (hist_c < hist_o)[:, -s.leg_lookback:].sum(axis=1)
+    bull_cnt = (hist_c > hist_o)[:, -s.leg_lookback:].sum(axis=1)
+    prev_min_low = l[:, :-1][:, -s.sweep_lookback:].min(axis=1)
+    prev_max_high = h[:, :-1][:, -s.sweep_lookback:].max(axis=1)
+
+    lo, lh, ll, lc = o[:, -1], h[:, -1], l[:, -1], c[:, -1]
+    body = np.abs(lc - lo)
+    rng = lh - ll
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_rng = np.where(rng > 0, rng, 1.0)
+        body_ratio = body / safe_rng
+        upper_wick_ratio = (lh - np.maximum(lo, lc)) / safe_rng
+        lower_wick_ratio = (np.minimum(lo, lc) - ll) / safe_rng
+
+    base = (
+        (avg_body > 0)
+        & (rng > 0)
+        & (body >= s.min_body_factor * avg_body)
+        & (body_ratio >= s.min_body_vs_range)
+    )
+    is_long = (
+        base
+        & (lc > lo)
+        & (bear_cnt >= s.min_bear_candles)
+        & (ll < prev_min_low)
+        & (upper_wick_ratio <= 0.25)
+    )
+    is_short = (
+        base
+        & ~is_long
+        & (lc < lo)
+        & (bull_cnt >= s.min_bull_candles)
+        & (lh > prev_max_high)
+        & (lower_wick_ratio <= 0.25)
+    )
+
+    return {
+        "is_long": is_long,
+        "is_short": is_short,
+        "body": body,
+        "range": rng,
+        "bear_cnt": bear_cnt,
+        "bull_cnt": bull_cnt,
+    }
+
+
+def detect_spike_reversal_batch(
+    windows: Dict[str, CandleWindow],
+    settings: Optional[SniperSettings] = None,
+) -> Dict[str, Dict]:
+    """
+    Versi vectorized dari detect_spike_reversal untuk banyak symbol sekaligus.
+    Return {symbol: det} hanya untuk symbol yang lolos (format det sama persis).
+
+    Window yang lebih pendek dari lookback penuh dievaluasi lewat jalur scalar,
+    supaya hasilnya identik dengan detect_spike_reversal.
+    """
+    s = settings or sniper_settings
+    width = detect_width(s)
+    min_len = max(25, width)
+
+    results: Dict[str, Dict] = {}
+    symbols: List[str] = []
+    for sym, w in windows.items():
+        if len(w) >= min_len:
+            symbols.append(sym)
+        elif len(w) >= 25:
+            det = detect_spike_reversal(w, s)
+            if det:
+                results[sym] = det
+
+    if not symbols:
+        return results
+
+    # matriks S × width (bar terakhir = kolom -1)
+    o = np.stack([windows[sym].open[-width:] for sym in symbols])
+    h = np.stack([windows[sym].high[-width:] for sym in symbols])
+    l = np.stack([windows[sym].low[-width:] for sym in symbols])
+    c = np.stack([windows[sym].close[-width:] for sym in symbols])
+
+    m = detect_matrix(o, h, l, c, s)
+    is_long = m["is_long"]
+
+    for i in np.flatnonzero(is_long | m["is_short"]):
+        sym = symbols[i]
+        results[sym] = {
+            "side": "long" if is_long[i] else "short",
+            "sweep_ok": True,
+            "body": float(m["body"][i]),
+            "range": float(m["range"][i]),
+            "bear_leg_cnt": int(m["bear_cnt"][i]),
+            "bull_leg_cnt": int(m["bull_cnt"][i]),
+            "last": windows[sym][-1],
+        }
+
+    return results
+
+
+class CloseBatcher:
+    """
+    Kumpulkan event candle close dalam `window_seconds` setelah close pertama
+    sebuah boundary, lalu panggil on_flush(events) sekali untuk seluruh batch.
+    Close untuk symbol yang sama dalam satu batch → yang terbaru dipakai.
+
+    auto_flush=False → tidak pakai timer event loop; pemanggil (replay dengan
+    jam simulasi) memanggil flush_due(now) sendiri.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        on_flush: Callable[[List[CloseEvent]], Awaitable[None]],
+        auto_flush: bool = True,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self._on_flush = on_flush
+        self.auto_flush = auto_flush
+        self._pending: Dict[str, CloseEvent] = {}
+        self._first_ts: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        # metrik
+        self.batches = 0
+        self.last_batch_size = 0
+
+    def add(self, symbol: str, window: CandleWindow, close_ts: float) -> None:
+        self._pending[symbol] = (symbol, window, close_ts)
+        if self._first_ts is None:
+            self._first_ts = close_ts
+        if self.auto_flush and self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+    def flush_due(self, now: float) -> bool:
+        """
+        Flush kalau window batch sudah lewat menurut `now`. Return True kalau flush.
+        """
+        if self._first_ts is None or now < self._first_ts + self.window_seconds:
+            return False
+        self._flush()
+        return True
+
+    async def drain(self) -> None:
+        """
+        Flush sisa batch & tunggu semua task on_flush selesai.
+        """
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._first_ts = None
+        events = list(self._pending.values())
+        self._pending = {}
+        if not events:
+            return
+
+        self.batches += 1
+        self.last_batch_size = len(events)
+
+        task = asyncio.create_task(self._on_flush(events))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -1,38 +1,65 @@
 # sniper/sniper_detector.py
 # Deteksi pola Spike-Reversal (flush + rejection) tanpa indikator.
 
-from typing import List, Dict, Optional, Literal
+import math
+from typing import List, Dict, Optional, Literal, Tuple, Union
 
-from binance.ohlc_buffer import Candle  # type alias dari project lama
-from sniper.sniper_settings import sniper_settings
+import numpy as np
 
+from binance.ohlc_buffer import Candle, CandleWindow, as_window
+from sniper.sniper_settings import SniperSettings, sniper_settings
 
-def _avg_body(candles: List[Candle], lookback: int = 20) -> float:
-    sub = candles[-lookback:] if len(candles) > lookback else candles
-    if not sub:
+
+def _avg_body(candles: CandleWindow, lookback: int = 20) -> float:
+    start = max(len(candles) - lookback, 0)
+    if start >= len(candles):
         return 0.0
-    total = 0.0
-    for c in sub:
-        total += abs(c["close"] - c["open"])
-    return total / len(sub)
+    body = np.abs(candles.close[start:] - candles.open[start:])
+    return float(body.mean())
 
 
 def _count_side_candles(
-    candles: List[Candle],
+    candles: CandleWindow,
     side: Literal["bull", "bear"],
     lookback: int,
 ) -> int:
-    sub = candles[-lookback:] if len(candles) > lookback else candles
-    cnt = 0
-    for c in sub:
-        if side == "bull" and c["close"] > c["open"]:
-            cnt += 1
-        if side == "bear" and c["close"] < c["open"]:
-            cnt += 1
-    return cnt
+    start = max(len(candles) - lookback, 0)
+    opens = candles.open[start:]
+    closes = candles.close[start:]
+    if side == "bull":
+        return int(np.count_nonzero(closes > opens))
+    return int(np.count_nonzero(closes < opens))
+
+
+def _history_features(
+    candles: CandleWindow,
+    s: SniperSettings,
+) -> Tuple[float, int, int, float, float]:
+    """
+    (avg_body, bear_cnt, bull_cnt, min_low, max_high) atas candles[:-1].
+    Pakai RollingFeatures dari buffer (O(1)) kalau cocok dengan window & settings,
+    kalau tidak → hitung ulang dari kolom.
+    """
+    lookbacks = (s.avg_body_lookback, s.leg_lookback, s.sweep_lookback)
+    f = candles.features
+    if f is not None and f.seq == candles.seq and f.lookbacks == lookbacks:
+        return f.avg_body, f.bear_count, f.bull_count, f.min_low, f.max_high
+
+    history = candles[:-1]
+    prev_segment = history[-s.sweep_lookback:]
+    return (
+        _avg_body(history, lookback=s.avg_body_lookback),
+        _count_side_candles(history, "bear", s.leg_lookback),
+        _count_side_candles(history, "bull", s.leg_lookback),
+        float(prev_segment.low.min()) if len(prev_segment) else math.nan,
+        float(prev_segment.high.max()) if len(prev_segment) else math.nan,
+    )
 
 
-def detect_spike_reversal(candles: List[Candle]) -> Optional[Dict]:
+def detect_spike_reversal(
+    candles: Union[CandleWindow, List[Candle]],
+    settings: Optional[SniperSettings] = None,
+) -> Optional[Dict]:
     """
     Deteksi 1 candle terakhir sebagai Spike-Reversal:
 
@@ -44,15 +71,21 @@ def detect_spike_reversal(candles: List[Candle]) -> Optional[Dict]:
 
     SHORT:
       - kebalikan.
+
+    settings: default sniper_settings global (backtest / optimizer bisa kirim
+    SniperSettings lain).
     """
+    s = settings or sniper_settings
+    candles = as_window(candles)
     n = len(candles)
     if n < 25:
         return None
 
     last = candles[-1]
-    prev = candles[-2]
 
-    avg_body = _avg_body(candles[:-1], lookback=20)
+    avg_body, bear_leg_cnt, bull_leg_cnt, prev_min_low, prev_max_high = (
+        _history_features(candles, s)
+    )
     if avg_body <= 0:
         return None
 
@@ -64,35 +97,23 @@ def detect_spike_reversal(candles: List[Candle]) -> Optional[Dict]:
     body_ratio = body_last / total_range
 
     # apakah candle terakhir cukup "impulsif"
-    if body_last < sniper_settings.min_body_factor * avg_body:
+    if body_last < s.min_body_factor * avg_body:
         return None
-    if body_ratio < sniper_settings.min_body_vs_range:
+    if body_ratio < s.min_body_vs_range:
         return None
 
-    # cek leg sebelumnya
-    bear_leg_cnt = _count_side_candles(
-        candles[:-1], "bear", sniper_settings.leg_lookback
-    )
-    bull_leg_cnt = _count_side_candles(
-        candles[:-1], "bull", sniper_settings.leg_lookback
-    )
-
-    # sweep / flush: bandingkan high/low dengan window sebelumnya
-    lookback_sweep = 15
-    prev_segment = candles[-(lookback_sweep + 1):-1]
-    if not prev_segment:
+    # leg sebelumnya (bear/bull count) & sweep / flush (high/low window
+    # sebelumnya) sudah diambil dari _history_features
+    if math.isnan(prev_min_low) or math.isnan(prev_max_high):
         return None
 
-    prev_min_low = min(c["low"] for c in prev_segment)
-    prev_max_high = max(c["high"] for c in prev_segment)
-
     side: Optional[str] = None
     sweep_ok = False
 
     # --- kandidat LONG ---
     if (
         last["close"] > last["open"]          # bullish
-        and bear_leg_cnt >= sniper_settings.min_bear_candles
+        and bear_leg_cnt >= s.min_bear_candles
         and last["low"] < prev_min_low       # flush low lebih dalam
     ):
         # close dekat high → rejection kuat
@@ -106,7 +127,7 @@ def detect_spike_reversal(candles: List[Candle]) -> Optional[Dict]:
     # --- kandidat SHORT ---
     if side is None and (
         last["close"] < last["open"]          # bearish
-        and bull_leg_cnt >= sniper_settings.min_bull_candles
+        and bull_leg_cnt >= s.min_bull_candles
         and last["high"] > prev_max_high
     ):
         lower_wick = min(last["open"], last["close"]) - last["low"]
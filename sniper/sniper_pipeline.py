@@ -0,0 +1,273 @@
+# sniper/sniper_pipeline.py
+# Pipeline analisa SNIPER dengan antrian terbatas, worker tetap, dan executor
+# terpisah untuk kerja CPU (deteksi/analisa) & I/O blocking (broadcast sync).
+# Sinyal diteruskan utuh (dict hasil analyzer: message, tier, score, ...) ke
+# broadcast_fn; produksi = tahap digest per boundary 5m.
+# Burst close di boundary 5m tidak lagi menumpuk task tanpa batas di event loop.
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from config import (
+    ANALYSIS_WORKERS,
+    ANALYSIS_QUEUE_SIZE,
+    ANALYSIS_MAX_WAIT_SECONDS,
+    ANALYSIS_CPU_THREADS,
+    ANALYSIS_IO_THREADS,
+)
+from core import clock
+from core.bot_state import state
+from sniper.sniper_analyzer import analyze_symbol_sniper, release_cooldown
+
+
+def _fmt_age(age: Optional[float]) -> str:
+    return "-" if age is None else f"{age:.0f}s"
+
+
+@dataclass
+class AnalysisJob:
+    symbol: str
+    candles: object          # CandleWindow / List[Candle]
+    close_ts: float          # waktu candle close diterima
+    enqueue_ts: float
+    det: Optional[Dict] = None
+
+
+class AnalysisPipeline:
+    """
+    Antrian per-symbol (OrderedDict) + N worker.
+
+    Kebijakan overload:
+    - close baru untuk symbol yang masih antre → job lama diganti (coalesce)
+    - antrian penuh → job paling lama dibuang (drop oldest)
+    - job yang menunggu > max_wait_seconds → dibuang saat diambil (stale)
+    """
+
+    def __init__(
+        self,
+        broadcast_fn: Callable[[Dict], Union[None, Awaitable[None]]],
+        workers: int = ANALYSIS_WORKERS,
+        queue_size: int = ANALYSIS_QUEUE_SIZE,
+        max_wait_seconds: float = ANALYSIS_MAX_WAIT_SECONDS,
+        cpu_threads: int = ANALYSIS_CPU_THREADS,
+        io_threads: int = ANALYSIS_IO_THREADS,
+    ) -> None:
+        self._broadcast_fn = broadcast_fn
+        self.workers = max(int(workers), 1)
+        self.queue_size = max(int(queue_size), 1)
+        self.max_wait_seconds = float(max_wait_seconds)
+
+        self._cpu = ThreadPoolExecutor(max_workers=max(cpu_threads, 1), thread_name_prefix="sniper-cpu")
+        self._io = ThreadPoolExecutor(max_workers=max(io_threads, 1), thread_name_prefix="sniper-io")
+
+        self._queue: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self._not_empty = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        # job yang sedang diproses worker & event "antrian kosong + idle"
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # metrik
+        self.submitted = 0
+        self.processed = 0
+        self.signals = 0
+        self.coalesced = 0
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._wait_sum_ms = 0.0
+        self._wait_count = 0
+
+    # ------------------------------------------------------------------
+    # lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._tasks:
+            return
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"sniper-worker-{i}"))
+        print(f"Analysis pipeline start: {self.workers} worker, antrian maks {self.queue_size}.")
+
+    async def stop(self) -> None:
+        tasks = self._tasks
+        self._tasks = []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._cpu.shutdown(wait=False)
+        self._io.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # executor
+    # ------------------------------------------------------------------
+    async def run_cpu(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._cpu, fn, *args)
+
+    async def run_io(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    # ------------------------------------------------------------------
+    # antrian
+    # ------------------------------------------------------------------
+    def submit(self, symbol: str, candles, close_ts: float, det: Optional[Dict] = None) -> None:
+        """
+        Non-blocking (dipanggil dari receive loop / flush batch).
+        """
+        self.submitted += 1
+        now = clock.now()
+
+        if symbol in self._queue:
+            # close lebih baru untuk symbol yang sama → ganti job lama
+            del self._queue[symbol]
+            self.coalesced += 1
+        elif len(self._queue) >= self.queue_size:
+            old_sym, _ = self._queue.popitem(last=False)
+            self.dropped_full += 1
+            if state.debug:
+                print(f"[PIPELINE] antrian penuh → drop close lama {old_sym}")
+
+        self._queue[symbol] = AnalysisJob(symbol, candles, close_ts, now, det)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._idle.clear()
+        self._not_empty.set()
+
+    async def _get(self) -> AnalysisJob:
+        while not self._queue:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        _, job = self._queue.popitem(last=False)
+        self._active += 1
+        return job
+
+    def _done(self) -> None:
+        self._active -= 1
+        if not self._queue and self._active == 0:
+            self._idle.set()
+
+    async def drain(self) -> None:
+        """
+        Tunggu sampai antrian kosong & semua job selesai (dipakai replay).
+        """
+        await self._idle.wait()
+
+    # ------------------------------------------------------------------
+    # worker
+    # ------------------------------------------------------------------
+    async def _worker(self) -> None:
+        while True:
+            job = await self._get()
+
+            wait_ms = (clock.now() - job.enqueue_ts) * 1000.0
+            self.last_wait_ms = wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._wait_sum_ms += wait_ms
+            self._wait_count += 1
+
+            if clock.now() - job.close_ts > self.max_wait_seconds:
+                self.dropped_stale += 1
+                if state.debug:
+                    print(f"[PIPELINE] {job.symbol} stale ({wait_ms:.0f} ms) → drop")
+                self._done()
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[{job.symbol}] ERROR pipeline:", e)
+            finally:
+                self.processed += 1
+                self._done()
+
+    async def _process(self, job: AnalysisJob) -> None:
+        symbol = job.symbol
+        try:
+            # analisa SNIPER di executor CPU
+            result = await self.run_cpu(analyze_symbol_sniper, symbol, job.candles, job.det)
+        except Exception as e:
+            print(f"[{symbol}] ERROR analyze_symbol_sniper:", e)
+            return
+
+        if not result:
+            return
+
+        # update cooldown timestamp (dicatat di result supaya tahap broadcast
+        # bisa membatalkannya kalau sinyal tidak jadi dikirim)
+        state.last_signal_time[symbol] = job.close_ts
+        result["cooldown"] = (symbol, job.close_ts)
+
+        try:
+            # broadcast async (fan-out Telegram) langsung di loop,
+            # fungsi sync (mis. penampung replay) di executor I/O
+            if asyncio.iscoroutinefunction(self._broadcast_fn):
+                await self._broadcast_fn(result)
+            else:
+                await self.run_io(self._broadcast_fn, result)
+        except Exception as e:
+            print(f"[{symbol}] ERROR broadcast_signal:", e)
+
+        # terkirim / dipotong diputuskan tahap digest (log TERKIRIM di sana)
+        self.signals += 1
+
+        print(
+            f"[{symbol}] SNIPER SIGNAL diantrekan ke digest — "
+            f"Tier {result['tier']} (Score {result['score']}) "
+            f"Entry {result['entry']:.6f} SL {result['sl']:.6f} "
+            f"HTF age {_fmt_age(result.get('htf_age', {}).get('1h'))}/"
+            f"{_fmt_age(result.get('htf_age', {}).get('15m'))} (1h/15m)"
+        )
+
+    # ------------------------------------------------------------------
+    # metrik
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        avg_wait = self._wait_sum_ms / self._wait_count if self._wait_count else 0.0
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "signals": self.signals,
+            "coalesced": self.coalesced,
+            "dropped_full": self.dropped_full,
+            "dropped_stale": self.dropped_stale,
+            "errors": self.errors,
+            "avg_wait_ms": round(avg_wait, 1),
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+def release_signal_cooldown(result: Dict) -> None:
+    """
+    Sinyal dibuang sebelum terkirim (mis. dipotong digest) → cooldown
+    symbol-nya dibatalkan, setup valid berikutnya tidak ikut tertahan.
+    """
+    symbol, close_ts = result["cooldown"]
+    if state.last_signal_time.get(symbol) == close_ts:
+        del state.last_signal_time[symbol]
+    release_cooldown(symbol, result["seq"])
+
+
+# pipeline aktif (di-set oleh run_sniper_bot), dipakai /status
+active_pipeline: Optional[AnalysisPipeline] = None
+
+
+def format_pipeline_stats() -> str:
+    if active_pipeline is None:
+        return "Pipeline   : -\n"
+    st = active_pipeline.stats()
+    return (
+        f"Pipeline   : antre {st['depth']} (maks {st['max_depth']}), "
+        f"wait avg {st['avg_wait_ms']:.0f}ms / maks {st['max_wait_ms']:.0f}ms, "
+        f"drop {st['dropped_full']} penuh + {st['dropped_stale']} basi, "
+        f"coalesce {st['coalesced']}\n"
+    )
@@ -16,6 +16,8 @@ class SniperSettings:
     min_bull_candles: int = 6            # min candle hijau di leg naik (untuk short)
 
     # --- Spike strength ---
+    avg_body_lookback: int = 20          # jumlah candle untuk rata-rata body
+    sweep_lookback: int = 15             # window high/low untuk cek flush / sweep
     min_body_factor: float = 2.0         # body spike >= 2x rata-rata body
     min_body_vs_range: float = 0.55      # body / (high-low) min 55%
 
@@ -1,12 +1,14 @@
 # sniper/sniper_tiers.py
 # Skoring kualitas sinyal & penentuan Tier (A+, A, B, NONE).
 
-from typing import Dict
+from typing import Dict, Optional
 from core.bot_state import state
-from sniper.sniper_settings import sniper_settings
+from sniper.sniper_settings import SniperSettings, sniper_settings
 
+TIER_ORDER = {"NONE": 0, "B": 1, "A": 2, "A+": 3}
 
-def score_signal(meta: Dict) -> int:
+
+def score_signal(meta: Dict, settings: Optional[SniperSettings] = None) -> int:
     """
     meta:
     {
@@ -31,8 +33,9 @@ def score_signal(meta: Dict) -> int:
     if meta.get("good_rr"):
         score += 10
 
+    s = settings or sniper_settings
     sl_pct = float(meta.get("sl_pct", 0.0))
-    if 0.10 <= sl_pct <= sniper_settings.max_sl_pct:
+    if 0.10 <= sl_pct <= s.max_sl_pct:
         score += 10
 
     return int(min(score, 150))
@@ -49,17 +52,29 @@ def tier_from_score(score: int) -> str:
         return "NONE"
 
 
-def should_send_tier(tier: str) -> bool:
+def default_min_tier() -> str:
+    """
+    Min tier global (bot_state / default sniper_settings): berlaku untuk user
+    tanpa filter tier pribadi.
+    """
+    return state.min_tier or sniper_settings.default_min_tier
+
+
+def should_send_tier(tier: str, min_tier: Optional[str] = None) -> bool:
     """
-    Bandingkan tier dengan minimal tier (dari bot_state atau default sniper_settings).
+    Bandingkan tier dengan minimal tier (argumen, atau min tier global).
     """
-    order = {"NONE": 0, "B": 1, "A": 2, "A+": 3}
-    min_tier = state.min_tier or sniper_settings.default_min_tier
-    return order.get(tier, 0) >= order.get(min_tier, 2)
+    min_tier = min_tier or default_min_tier()
+    return TIER_ORDER.get(tier, 0) >= TIER_ORDER.get(min_tier, 2)
 
 
-def evaluate_signal_quality(meta: Dict) -> Dict:
-    score = score_signal(meta)
+def evaluate_signal_quality(
+    meta: Dict,
+    settings: Optional[SniperSettings] = None,
+    min_tier: Optional[str] = None,
+) -> Dict:
+    s = settings or sniper_settings
+    score = score_signal(meta, s)
     tier = tier_from_score(score)
 
     sl_pct = float(meta.get("sl_pct", 0.0))
@@ -75,10 +90,10 @@ def evaluate_signal_quality(meta: Dict) -> Dict:
         hard_ok = False
     if not good_rr:
         hard_ok = False
-    if not (0.10 <= sl_pct <= sniper_settings.max_sl_pct):
+    if not (0.10 <= sl_pct <= s.max_sl_pct):
         hard_ok = False
 
-    should_send = should_send_tier(tier) and hard_ok
+    should_send = should_send_tier(tier, min_tier) and hard_ok
 
     return {
         "score": score,
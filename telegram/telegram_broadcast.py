@@ -1,46 +1,116 @@
 # telegram/telegram_broadcast.py
 # broadcast_signal: kirim teks sinyal ke admin + subscribers
+# (dicatat ke outbox persisten lalu dikirim dispatcher, tidak menahan worker analisa)
+# broadcast_ranked: beberapa sinyal satu close 5m (urut ranking) sebagai digest,
+# disaring filter pribadi tiap user (core/user_filters)
 
-import time
+from typing import Dict, List, Tuple
 
 from config import TELEGRAM_ADMIN_ID
-from core.bot_state import state, is_vip, cleanup_expired_vip
-from telegram.telegram_common import send_telegram
+from core.bot_state import state
+from core.recipient_index import recipient_index
+from core.user_filters import filter_index
+from sniper.sniper_pipeline import release_signal_cooldown
+from telegram.telegram_outbox import get_dispatcher, make_signal_id
 
+# batas panjang satu pesan Telegram (karakter)
+TELEGRAM_MESSAGE_LIMIT = 4096
 
-def broadcast_signal(text: str) -> None:
-    today = time.strftime("%Y-%m-%d")
-    if state.daily_date != today:
-        state.daily_date = today
-        state.daily_counts = {}
-        cleanup_expired_vip()
-        print("Reset daily_counts & cleanup VIP untuk hari baru:", today)
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━━━━━\n\n"
+
+
+def format_digest(texts: List[str], label: str = "") -> str:
+    """
+    Satu sinyal → teks aslinya; beberapa → satu pesan digest (dipotong
+    supaya muat satu pesan Telegram).
+    """
+    if len(texts) == 1:
+        return texts[0]
+
+    header = f"📦 *SNIPER DIGEST* — {len(texts)} sinyal{f' (close {label})' if label else ''}\n\n"
+    parts: List[str] = []
+    size = len(header)
+    for i, text in enumerate(texts):
+        more = f"\n\n… +{len(texts) - i} sinyal lain"
+        add = len(text) + (len(DIGEST_SEPARATOR) if parts else 0)
+        if parts and size + add + len(more) > TELEGRAM_MESSAGE_LIMIT:
+            parts.append(more.strip())
+            break
+        parts.append(text)
+        size += add
+    return header + DIGEST_SEPARATOR.join(parts)
+
+
+async def broadcast_signal(signal: Dict) -> None:
+    await broadcast_ranked([signal])
+
+
+async def broadcast_ranked(signals: List[Dict], label: str = "") -> None:
+    """
+    signals (dict hasil analyzer) sudah urut ranking (terbaik dulu).
+    Tiap penerima mendapat satu digest berisi sinyal yang lolos filter
+    pribadinya; user FREE dibatasi top-N sesuai sisa kuota harian (kuota
+    hanya dipotong untuk sinyal yang benar-benar dikirim).
+    """
+    if not signals:
+        return
+
+    dispatcher = get_dispatcher()
+    texts = [sig["message"] for sig in signals]
+    full = format_digest(texts, label)
+    signal_id = make_signal_id(full)
+    if await dispatcher.has_signal(signal_id):
+        # sinyal sama sudah pernah diantrekan (mis. terdeteksi ulang setelah restart)
+        print(f"[BROADCAST] {signal_id} sudah ada di outbox, dilewati.")
+        return
+
+    recipients: List[int] = []
 
     # admin
     if TELEGRAM_ADMIN_ID:
-        try:
-            send_telegram(text, chat_id=int(TELEGRAM_ADMIN_ID))
-        except Exception as e:
-            print("Gagal kirim ke admin:", e)
+        recipients.append(int(TELEGRAM_ADMIN_ID))
     else:
         print("⚠️ TELEGRAM_ADMIN_ID belum di-set. Admin tidak menerima sinyal.")
 
-    # user
+    # user: VIP + FREE yang kuotanya masih ada (index di-update incremental)
     if not state.subscribers:
         print("Belum ada subscriber. Hanya admin yang menerima sinyal.")
-        return
+    vip, free = recipient_index.snapshot()
+
+    # filter per user: himpunan user yang menolak tiap sinyal (inverted index)
+    excluded = [
+        filter_index.excluded(sig["symbol"], sig["side"], sig["tier"], sig["sl_pct"])
+        for sig in signals
+    ]
+    everything = tuple(range(len(signals)))
 
-    for cid in list(state.subscribers):
-        if TELEGRAM_ADMIN_ID and str(cid) == str(TELEGRAM_ADMIN_ID):
-            continue
+    def _pick(cid: int, limit: int) -> Tuple[int, ...]:
+        if not any(cid in ex for ex in excluded):
+            return everything[:limit]
+        return tuple(i for i, ex in enumerate(excluded) if cid not in ex)[:limit]
 
-        if is_vip(cid):
-            send_telegram(text, chat_id=cid)
-            continue
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for cid in recipients + vip:
+        groups.setdefault(_pick(cid, len(signals)), []).append(cid)
+    used: Dict[int, int] = {}
+    for cid, left in free.items():
+        picked = _pick(cid, left)
+        if picked:
+            used[cid] = len(picked)
+            groups.setdefault(picked, []).append(cid)
+    recipient_index.charge(used)
 
-        count = state.daily_counts.get(cid, 0)
-        if count >= 2:
-            continue
+    # sinyal yang ditolak filter semua penerima (mis. tier di bawah min tier
+    # global, hanya diminta user yang symbol-nya tidak cocok) tidak terkirim
+    # → cooldown-nya dibatalkan
+    if recipients or vip or free:
+        picked_any = set().union(*groups)
+        for i, sig in enumerate(signals):
+            if i not in picked_any:
+                release_signal_cooldown(sig)
 
-        send_telegram(text, chat_id=cid)
-        state.daily_counts[cid] = count + 1
+    # digest lengkap selalu dicatat (dedupe) walau tidak ada penerimanya
+    await dispatcher.enqueue(full, groups.pop(everything, []), signal_id)
+    for picked, chat_ids in groups.items():
+        if picked:
+            await dispatcher.enqueue(format_digest([texts[i] for i in picked], label), chat_ids)
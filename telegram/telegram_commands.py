@@ -3,6 +3,14 @@
 import time
 
 from config import TELEGRAM_ADMIN_USERNAME
+from binance.binance_ratelimit import format_weight_stats
+from binance.binance_ws_pool import format_pool_stats
+from binance.universe_ranker import format_universe_stats
+from common.htf_context import format_htf_stats
+from sniper.sniper_pipeline import format_pipeline_stats
+from telegram.telegram_digest import format_digest_stats
+from telegram.telegram_outbox import format_outbox_stats
+from telegram.telegram_sender import format_sender_stats
 from core.bot_state import (
     state,
     is_admin,
@@ -11,13 +19,15 @@ from core.bot_state import (
     save_subscribers,
     save_vip_users,
 )
+from core.recipient_index import FREE_DAILY_LIMIT, recipient_index
+from core.user_filters import filter_index, parse_filter_args, save_user_filters
 from telegram.telegram_common import send_telegram, hard_restart
 from telegram.telegram_keyboards import get_user_reply_keyboard, get_admin_reply_keyboard
 
 
 def handle_user_start(chat_id: int) -> None:
     pkg = "VIP" if is_vip(chat_id) else "FREE"
-    limit = "Unlimited" if is_vip(chat_id) else "2 sinyal per hari"
+    limit = "Unlimited" if is_vip(chat_id) else f"{FREE_DAILY_LIMIT} sinyal per hari"
     active = "AKTIF" if chat_id in state.subscribers else "Tidak aktif"
 
     send_telegram(
@@ -41,6 +51,53 @@ def handle_admin_start(chat_id: int) -> None:
     )
 
 
+def get_filter_inline_keyboard() -> dict:
+    return {
+        "inline_keyboard": [
+            [
+                {"text": "🟢 Long saja", "callback_data": "filter_side_long"},
+                {"text": "🔴 Short saja", "callback_data": "filter_side_short"},
+                {"text": "↕️ Semua", "callback_data": "filter_side_all"},
+            ],
+            [
+                {"text": "Tier B+", "callback_data": "filter_tier_B"},
+                {"text": "Tier A+", "callback_data": "filter_tier_A"},
+                {"text": "Hanya A+", "callback_data": "filter_tier_A+"},
+                {"text": "Tier bot", "callback_data": "filter_tier_off"},
+            ],
+            [
+                {"text": "♻ Reset filter", "callback_data": "filter_reset"},
+            ],
+        ]
+    }
+
+
+def send_filter_status(chat_id: int, note: str = "") -> None:
+    send_telegram(
+        f"{note}🎯 *FILTER SINYAL KAMU*\n\n"
+        f"{filter_index.get(chat_id).describe()}\n"
+        "Atur lewat tombol di bawah atau command:\n"
+        "`/filter only BTC ETH` — hanya symbol ini (`off` = semua)\n"
+        "`/filter block DOGE` — blokir symbol (`off` = hapus)\n"
+        "`/filter side long|short|all`\n"
+        "`/filter tier B|A|A+|off` — min tier pribadi, boleh di bawah min tier bot (`off` = ikut bot)\n"
+        "`/filter maxsl 2.5` — SL% maksimal (`off` = tanpa batas)\n"
+        "`/filter reset`",
+        chat_id,
+        reply_markup=get_filter_inline_keyboard(),
+    )
+
+
+def apply_filter(chat_id: int, args: list) -> None:
+    flt, err = parse_filter_args(filter_index.get(chat_id), args)
+    if flt is None:
+        send_filter_status(chat_id, f"⚠️ {err}\n\n")
+        return
+    filter_index.set(chat_id, flt)
+    save_user_filters()
+    send_filter_status(chat_id, "✅ Filter disimpan.\n\n")
+
+
 def handle_command(cmd: str, args: list, chat_id: int) -> None:
     cmd = cmd.lower()
 
@@ -66,20 +123,26 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
             )
         return
 
+    # filter sinyal pribadi (user & admin)
+    if cmd == "/filter":
+        if args:
+            apply_filter(chat_id, args)
+        else:
+            send_filter_status(chat_id)
+        return
+
     # USER
     if not is_admin(chat_id):
         if cmd == "/activate":
-            if chat_id in state.subscribers:
+            if not recipient_index.subscribe(chat_id):
                 send_telegram("ℹ️ Pencarian sinyal sudah *AKTIF*.", chat_id)
             else:
-                state.subscribers.add(chat_id)
                 save_subscribers()
                 send_telegram("🔔 Pencarian sinyal *diaktifkan!*", chat_id)
             return
 
         if cmd == "/deactivate":
-            if chat_id in state.subscribers:
-                state.subscribers.remove(chat_id)
+            if recipient_index.unsubscribe(chat_id):
                 save_subscribers()
                 send_telegram("🔕 Pencarian sinyal *dinonaktifkan.*", chat_id)
             else:
@@ -95,7 +158,7 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
                 limit = "Unlimited"
             else:
                 pkg = "FREE"
-                limit = "2 sinyal per hari"
+                limit = f"{FREE_DAILY_LIMIT} sinyal per hari"
 
             active = "AKTIF ✅" if chat_id in state.subscribers else "TIDAK AKTIF ❌"
             send_telegram(
@@ -153,7 +216,16 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
             f"Min Volume : {state.min_volume_usdt:,.0f} USDT\n"
             f"Max Pairs  : {state.max_pairs} pair\n"
             f"Subscribers: {len(state.subscribers)} user\n"
-            f"VIP Users  : {len(state.vip_users)} user\n",
+            f"VIP Users  : {len(state.vip_users)} user\n"
+            f"Filter User: {len(filter_index.filters)} user\n"
+            f"{format_pool_stats()}"
+            f"{format_universe_stats()}"
+            f"{format_pipeline_stats()}"
+            f"{format_htf_stats()}"
+            f"{format_weight_stats()}"
+            f"{format_digest_stats()}"
+            f"{format_sender_stats()}"
+            f"{format_outbox_stats()}",
             chat_id,
         )
         return
@@ -162,7 +234,7 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
         if not args:
             send_telegram(
                 "Mode sekarang:\n"
-                f"- Min Tier: {state.min_tier}\n"
+                f"- Min Tier: {state.min_tier} (default user tanpa filter tier)\n"
                 "Gunakan: /mode aplus | a | b",
                 chat_id,
             )
@@ -178,7 +250,10 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
             send_telegram("Mode tidak dikenali. Gunakan: aplus | a | b", chat_id)
             return
         save_bot_state()
-        send_telegram(f"⚙️ Mode tier di-set ke: *{state.min_tier}*.", chat_id)
+        send_telegram(
+            f"⚙️ Mode tier di-set ke: *{state.min_tier}* (user dengan /filter tier tetap pakai tier pribadinya).",
+            chat_id,
+        )
         return
 
     if cmd == "/cooldown":
@@ -266,7 +341,7 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
             return
         now = time.time()
         new_exp = now + days * 86400
-        state.vip_users[target_id] = new_exp
+        recipient_index.set_vip(target_id, new_exp)
         save_vip_users()
         send_telegram(f"⭐ VIP aktif untuk `{target_id}` selama {days} hari.", chat_id)
         send_telegram(
@@ -285,8 +360,7 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
         except ValueError:
             send_telegram("Format salah. Contoh: `/removevip 123456789`", chat_id)
             return
-        if target_id in state.vip_users:
-            del state.vip_users[target_id]
+        if recipient_index.remove_vip(target_id):
             save_vip_users()
             send_telegram(f"VIP user `{target_id}` dihapus.", chat_id)
             send_telegram("VIP kamu telah dinonaktifkan. Kembali ke paket FREE.", target_id)
@@ -313,7 +387,7 @@ def handle_command(cmd: str, args: list, chat_id: int) -> None:
         state.request_soft_restart = True
         state.force_pairs_refresh = True
         state.last_signal_time.clear()
-        send_telegram("♻ Soft restart diminta. Bot akan refresh koneksi & engine.", chat_id)
+        send_telegram("♻ Soft restart diminta. Bot akan refresh pair & engine.", chat_id)
         return
 
     if cmd == "/hardrestart":
@@ -335,6 +409,11 @@ def handle_callback(data_cb: str, from_id: int, chat_id_cq: int) -> None:
 
     from core.bot_state import is_admin as _is_admin
 
+    # tombol filter pribadi (semua user)
+    if data_cb.startswith("filter_"):
+        apply_filter(from_id, data_cb.split("_", 2)[1:])
+        return
+
     if data_cb in ("admin_soft_restart", "admin_hard_restart", "admin_restart_cancel"):
         if not _is_admin(from_id):
             send_telegram("Tombol ini hanya untuk admin.", chat_id_cq)
@@ -344,7 +423,7 @@ def handle_callback(data_cb: str, from_id: int, chat_id_cq: int) -> None:
             state.request_soft_restart = True
             state.force_pairs_refresh = True
             state.last_signal_time.clear()
-            send_telegram("♻ Soft restart dimulai. Bot akan refresh koneksi & engine.", chat_id_cq)
+            send_telegram("♻ Soft restart dimulai. Bot akan refresh pair & engine.", chat_id_cq)
             return
 
         if data_cb == "admin_hard_restart":
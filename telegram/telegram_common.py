@@ -8,6 +8,10 @@ import requests
 from config import TELEGRAM_TOKEN, TELEGRAM_ADMIN_ID
 from core.bot_state import state
 
+# session keep-alive untuk pesan command / menu (thread command loop);
+# fan-out sinyal lewat telegram_sender (async)
+_session = requests.Session()
+
 
 def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | None = None) -> None:
     if not TELEGRAM_TOKEN:
@@ -30,7 +34,7 @@ def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | No
         data["reply_markup"] = json.dumps(reply_markup)
 
     try:
-        r = requests.post(url, data=data, timeout=10)
+        r = _session.post(url, data=data, timeout=10)
         if not r.ok:
             print("Gagal kirim Telegram:", r.text)
     except Exception as e:
@@ -69,6 +69,9 @@ def telegram_command_loop():
                     if text == "📊 Status Saya":
                         handle_command("/mystatus", [], chat_id)
                         continue
+                    if text == "🎯 Filter Sinyal":
+                        handle_command("/filter", [], chat_id)
+                        continue
                     if text == "⭐ Upgrade VIP" and not is_admin(chat_id):
                         send_telegram(
                             "⭐ *UPGRADE KE VIP*\n\n"
@@ -86,6 +89,7 @@ def telegram_command_loop():
                             "🔔 Aktifkan Sinyal — hidupkan sinyal.\n"
                             "🔕 Nonaktifkan Sinyal — matikan sinyal.\n"
                             "📊 Status Saya — lihat paket & limit.\n"
+                            "🎯 Filter Sinyal — pilih symbol, arah, tier & SL% maks.\n"
                             "⭐ Upgrade VIP — info upgrade.\n",
                             chat_id,
                         )
@@ -0,0 +1,146 @@
+# telegram/telegram_digest.py
+# Tahap digest sebelum broadcast: sinyal dari boundary 5m yang sama ditampung
+# selama SIGNAL_DIGEST_WINDOW_MS sejak sinyal pertama, diurutkan (tier lalu
+# score), dipotong SIGNAL_DIGEST_MAX (cooldown sinyal yang dipotong dibatalkan),
+# lalu dikirim sebagai satu digest per penerima. Close 5m yang ramai (N sinyal) → 1 pesan per user, bukan N.
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from config import SIGNAL_DIGEST_WINDOW_MS, SIGNAL_DIGEST_MAX
+from core import clock
+from sniper.sniper_pipeline import release_signal_cooldown
+from sniper.sniper_tiers import TIER_ORDER
+from telegram.telegram_broadcast import broadcast_ranked
+
+BOUNDARY_SECONDS = 300
+
+
+def rank_signals(signals: List[Dict]) -> List[Dict]:
+    """
+    Tier tertinggi dulu, lalu score tertinggi.
+    """
+    return sorted(signals, key=lambda r: (-TIER_ORDER.get(r.get("tier"), 0), -r.get("score", 0)))
+
+
+class SignalDigest:
+    """
+    add() dipanggil pipeline per sinyal; flush otomatis setelah window, atau
+    langsung saat sinyal boundary berikutnya masuk. window 0 = tanpa digest.
+    """
+
+    def __init__(self, window_ms: int = SIGNAL_DIGEST_WINDOW_MS, max_signals: int = SIGNAL_DIGEST_MAX) -> None:
+        self.window = max(window_ms, 0) / 1000.0
+        self.max_signals = max(int(max_signals), 1)
+        self._boundary: Optional[int] = None
+        self._signals: List[Dict] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # metrik
+        self.signals_in = 0
+        self.digests = 0
+        self.sent = 0
+        self.dropped = 0
+        self.max_batch = 0
+
+    async def add(self, result: Dict) -> None:
+        self.signals_in += 1
+        if self.window <= 0:
+            await self._send([result], "")
+            return
+
+        boundary = int(clock.now() // BOUNDARY_SECONDS) * BOUNDARY_SECONDS
+        if self._boundary is not None and boundary != self._boundary:
+            await self.flush()
+
+        if self._boundary is None:
+            self._boundary = boundary
+            self._timer = asyncio.create_task(self._flush_later())
+        self._signals.append(result)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+            signals, boundary = self._signals, self._boundary
+            self._signals, self._boundary = [], None
+            if not signals:
+                return
+            label = time.strftime("%H:%M", time.localtime(boundary))
+            await self._send(signals, label)
+
+    async def _send(self, signals: List[Dict], label: str) -> None:
+        ranked = rank_signals(signals)
+        kept = ranked[: self.max_signals]
+        # sinyal yang dipotong tidak dikirim → cooldown-nya dibatalkan
+        for r in ranked[self.max_signals:]:
+            release_signal_cooldown(r)
+        self.dropped += len(ranked) - len(kept)
+        self.max_batch = max(self.max_batch, len(ranked))
+        self.digests += 1
+        if len(ranked) > 1:
+            print(
+                f"[DIGEST] {label}: {len(ranked)} sinyal → {len(kept)} dikirim "
+                f"({', '.join(r['symbol'] for r in kept)})"
+            )
+        await broadcast_ranked(kept, label)
+        self.sent += len(kept)
+        for r in kept:
+            print(
+                f"[{r['symbol']}] SNIPER SIGNAL TERKIRIM — "
+                f"Tier {r['tier']} (Score {r['score']}) "
+                f"Entry {r['entry']:.6f} SL {r['sl']:.6f}"
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "signals": self.signals_in,
+            "digests": self.digests,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "max_batch": self.max_batch,
+            "pending": len(self._signals),
+        }
+
+
+_digest: Optional[SignalDigest] = None
+
+
+def get_digest() -> SignalDigest:
+    global _digest
+    if _digest is None:
+        _digest = SignalDigest()
+    return _digest
+
+
+async def submit_signal(result: Dict) -> None:
+    """
+    broadcast_fn produksi untuk AnalysisPipeline.
+    """
+    await get_digest().add(result)
+
+
+async def stop_digest() -> None:
+    """
+    Kirim digest yang masih ditampung (masuk outbox) sebelum shutdown.
+    """
+    if _digest is not None:
+        await _digest.flush()
+
+
+def format_digest_stats() -> str:
+    if _digest is None:
+        return "Digest     : -\n"
+    st = _digest.stats()
+    return (
+        f"Digest     : {st['signals']} sinyal → {st['digests']} pesan, "
+        f"terkirim {st['sent']}, dipotong {st['dropped']}, batch maks {st['max_batch']}\n"
+    )
@@ -13,6 +13,9 @@ def get_user_reply_keyboard() -> dict:
                 {"text": "⭐ Upgrade VIP"},
                 {"text": "❓ Bantuan"},
             ],
+            [
+                {"text": "🎯 Filter Sinyal"},
+            ],
         ],
         "resize_keyboard": True,
         "one_time_keyboard": False,
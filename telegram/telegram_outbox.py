@@ -0,0 +1,446 @@
+# telegram/telegram_outbox.py
+# Outbox Telegram persisten (SQLite, WAL): setiap sinyal dicatat dulu per
+# penerima sebelum dikirim, lalu di-ack per (signal_id, chat_id). Gagal
+# sementara → retry dengan backoff eksponensial; proses mati di tengah
+# fan-out (hard_restart / crash) → sisa antrian dilanjutkan saat start.
+# Pengiriman at-least-once: pesan yang sudah terkirim tapi belum sempat di-ack
+# bisa terkirim ulang sekali.
+#
+# Tiap delivery jalan sebagai task sendiri dan meng-ack / menjadwal ulang
+# dirinya begitu selesai (chat yang tertahan rate limit tidak menahan chat
+# lain). Akses SQLite dari dispatcher lewat asyncio.to_thread.
+#
+#   signals(signal_id PK, text, created_at)
+#   deliveries(signal_id, chat_id, status, attempts, next_at, updated_at, last_error)
+#       PK (signal_id, chat_id) → enqueue ulang sinyal yang sama diabaikan
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import (
+    TELEGRAM_OUTBOX_DB,
+    TELEGRAM_OUTBOX_MAX_ATTEMPTS,
+    TELEGRAM_OUTBOX_MAX_AGE,
+)
+from telegram.telegram_sender import (
+    SEND_FAILED,
+    SEND_OK,
+    TelegramSender,
+    get_sender,
+)
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+# backoff retry outbox (detik): base × 2^(attempts-1), maks OUTBOX_RETRY_MAX
+OUTBOX_RETRY_BASE_SECONDS = 5.0
+OUTBOX_RETRY_MAX_SECONDS = 300.0
+
+# delivery jatuh tempo yang diambil per putaran dispatcher
+OUTBOX_BATCH = 60
+
+# maks task delivery yang berjalan bersamaan (menunggu rate limit / kirim);
+# HTTP paralel tetap dibatasi semaphore sender. Ack ditulis per delivery
+# (crash hanya mengulang delivery yang sedang in-flight)
+OUTBOX_MAX_INFLIGHT = 500
+
+# jeda cek antrian saat tidak ada yang jatuh tempo (detik)
+OUTBOX_POLL_SECONDS = 1.0
+
+# baris sent/dead lebih tua dari ini dihapus (detik)
+OUTBOX_RETENTION_SECONDS = 3 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    signal_id  TEXT PRIMARY KEY,
+    text       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    signal_id  TEXT NOT NULL,
+    chat_id    INTEGER NOT NULL,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    next_at    REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (signal_id, chat_id)
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries (status, next_at);
+"""
+
+# (signal_id, chat_id, text, attempts, created_at)
+Delivery = Tuple[str, int, str, int, float]
+
+
+def make_signal_id(text: str) -> str:
+    """
+    Id sinyal dari isi pesan: sinyal yang sama (mis. terdeteksi ulang setelah
+    restart) tidak dikirim dua kali ke chat yang sama.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def retry_delay(attempts: int, hint: float = 0.0) -> float:
+    delay = OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return max(min(delay, OUTBOX_RETRY_MAX_SECONDS), hint)
+
+
+class TelegramOutbox:
+    """
+    Penyimpanan antrian. Operasi SQLite kecil & singkat (WAL,
+    synchronous=NORMAL → commit tanpa fsync). Dipanggil dari thread pool
+    (asyncio.to_thread) & command loop → satu koneksi dijaga lock.
+    """
+
+    def __init__(self, path: str = TELEGRAM_OUTBOX_DB) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def has_signal(self, signal_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM signals WHERE signal_id = ?", (signal_id,)).fetchone()
+            return row is not None
+
+    def enqueue(self, signal_id: str, text: str, chat_ids: Iterable[int], now: Optional[float] = None) -> int:
+        """
+        Catat sinyal & penerimanya (satu transaksi). Return delivery baru
+        (pasangan signal_id/chat_id yang sudah ada diabaikan).
+        """
+        now = time.time() if now is None else now
+        rows = [(signal_id, int(cid), STATUS_PENDING, now, now) for cid in dict.fromkeys(chat_ids)]
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT OR IGNORE INTO signals (signal_id, text, created_at) VALUES (?, ?, ?)",
+                    (signal_id, text, now),
+                )
+                before = self._db.total_changes
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO deliveries (signal_id, chat_id, status, next_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                return self._db.total_changes - before
+
+    def due(self, limit: int, now: Optional[float] = None, exclude: Iterable[Tuple[str, int]] = ()) -> List[Delivery]:
+        """
+        Delivery pending yang jatuh tempo, sinyal paling lama dulu.
+        """
+        now = time.time() if now is None else now
+        skip = set(exclude)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.signal_id, d.chat_id, s.text, d.attempts, s.created_at "
+                "FROM deliveries d JOIN signals s ON s.signal_id = d.signal_id "
+                "WHERE d.status = ? AND d.next_at <= ? "
+                "ORDER BY s.created_at, d.next_at LIMIT ?",
+                (STATUS_PENDING, now, limit + len(skip)),
+            ).fetchall()
+            return [r for r in rows if (r[0], r[1]) not in skip][:limit]
+
+    def record(self, results: List[Tuple[str, int, str, int, float, str]], now: Optional[float] = None) -> None:
+        """
+        Tulis hasil satu batch: (signal_id, chat_id, status, attempts, next_at, error).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "UPDATE deliveries SET status = ?, attempts = ?, next_at = ?, updated_at = ?, last_error = ? "
+                    "WHERE signal_id = ? AND chat_id = ?",
+                    [(st, att, nxt, now, err, sid, cid) for sid, cid, st, att, nxt, err in results],
+                )
+
+    def expire(self, max_age: float, now: Optional[float] = None) -> int:
+        """
+        Pending dari sinyal lebih tua dari max_age → dead (sinyal sudah basi).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            with self._db:
+                cur = self._db.execute(
+                    "UPDATE deliveries SET status = ?, updated_at = ?, last_error = 'expired' "
+                    "WHERE status = ? AND signal_id IN (SELECT signal_id FROM signals WHERE created_at < ?)",
+                    (STATUS_DEAD, now, STATUS_PENDING, now - max_age),
+                )
+                return cur.rowcount
+
+    def prune(self, retention: float = OUTBOX_RETENTION_SECONDS, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        cutoff = now - retention
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "DELETE FROM deliveries WHERE status != ? AND updated_at < ?", (STATUS_PENDING, cutoff)
+                )
+                self._db.execute(
+                    "DELETE FROM signals WHERE created_at < ? AND signal_id NOT IN "
+                    "(SELECT DISTINCT signal_id FROM deliveries)",
+                    (cutoff,),
+                )
+
+    def pending_by_signal(self) -> Dict[str, Tuple[int, float]]:
+        """
+        signal_id → (delivery pending, created_at).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.signal_id, COUNT(*), s.created_at FROM deliveries d "
+                "JOIN signals s ON s.signal_id = d.signal_id WHERE d.status = ? GROUP BY d.signal_id",
+                (STATUS_PENDING,),
+            ).fetchall()
+            return {sid: (n, created) for sid, n, created in rows}
+
+    def backlog(self, now: Optional[float] = None) -> Tuple[int, float]:
+        """
+        (jumlah delivery pending, umur sinyal pending tertua detik).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            n, oldest = self._db.execute(
+                "SELECT COUNT(*), MIN(s.created_at) FROM deliveries d "
+                "JOIN signals s ON s.signal_id = d.signal_id WHERE d.status = ?",
+                (STATUS_PENDING,),
+            ).fetchone()
+            return int(n), (now - oldest if oldest is not None else 0.0)
+
+
+class OutboxDispatcher:
+    """
+    Satu loop: ambil delivery jatuh tempo (selain yang sedang in-flight) →
+    satu task per delivery: deliver() lewat sender (rate limit global & per
+    chat + semaphore tetap berlaku) → ack/backoff delivery itu sendiri.
+    """
+
+    def __init__(
+        self,
+        outbox: TelegramOutbox,
+        sender: Optional[TelegramSender] = None,
+        max_attempts: int = TELEGRAM_OUTBOX_MAX_ATTEMPTS,
+        max_age: float = TELEGRAM_OUTBOX_MAX_AGE,
+        batch: int = OUTBOX_BATCH,
+        max_inflight: int = OUTBOX_MAX_INFLIGHT,
+    ) -> None:
+        self.outbox = outbox
+        self._sender = sender
+        self.max_attempts = max(int(max_attempts), 1)
+        self.max_age = float(max_age)
+        self.batch = max(int(batch), 1)
+        self.max_inflight = max(int(max_inflight), 1)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # (signal_id, chat_id) → task delivery yang belum selesai
+        self._inflight: Dict[Tuple[str, int], asyncio.Task] = {}
+        # signal_id → [created_at, sisa pending, terkirim] untuk log fan-out
+        self._open: Dict[str, List[float]] = {}
+
+        # metrik
+        self.acked = 0
+        self.dead = 0
+        self.retried = 0
+        self.resumed = 0
+        self.deduped = 0
+        self.last_fanout_recipients = 0
+        self.last_fanout_seconds = 0.0
+        self.max_fanout_seconds = 0.0
+
+    @property
+    def sender(self) -> TelegramSender:
+        return self._sender if self._sender is not None else get_sender()
+
+    # ------------------------------------------------------------------
+    # lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        expired = self.outbox.expire(self.max_age)
+        pending = self.outbox.pending_by_signal()
+        for sid, (n, created) in pending.items():
+            self._open[sid] = [created, n, 0]
+        self.resumed = sum(n for n, _ in pending.values())
+        if self.resumed or expired:
+            print(
+                f"[OUTBOX] lanjut {self.resumed} delivery pending dari {len(pending)} sinyal"
+                f"{f', {expired} basi dibuang' if expired else ''}."
+            )
+        self._task = asyncio.create_task(self._run(), name="telegram-outbox")
+
+    async def stop(self) -> None:
+        """
+        Berhenti tanpa menunggu antrian: delivery in-flight dibatalkan, sisa
+        pending tetap di outbox dan dilanjutkan saat start berikutnya.
+        """
+        task, self._task = self._task, None
+        tasks = list(self._inflight.values())
+        if task is not None:
+            tasks.append(task)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
+
+    # ------------------------------------------------------------------
+    # enqueue
+    # ------------------------------------------------------------------
+    async def has_signal(self, signal_id: str) -> bool:
+        return await asyncio.to_thread(self.outbox.has_signal, signal_id)
+
+    async def enqueue(self, text: str, chat_ids: List[int], signal_id: Optional[str] = None) -> int:
+        signal_id = signal_id or make_signal_id(text)
+        now = time.time()
+        added = await asyncio.to_thread(self.outbox.enqueue, signal_id, text, chat_ids, now)
+        self.deduped += len(set(chat_ids)) - added
+        if added:
+            entry = self._open.setdefault(signal_id, [now, 0, 0])
+            entry[1] += added
+            self._wake.set()
+        return added
+
+    # ------------------------------------------------------------------
+    # loop
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        last_prune = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now - last_prune > 3600:
+                    last_prune = now
+                    await asyncio.to_thread(self.outbox.expire, self.max_age, now)
+                    await asyncio.to_thread(self.outbox.prune, now=now)
+
+                room = min(self.batch, self.max_inflight - len(self._inflight))
+                rows = []
+                if room > 0:
+                    rows = await asyncio.to_thread(self.outbox.due, room, now, list(self._inflight))
+                if not rows:
+                    # tidur sampai ada enqueue / delivery selesai / poll berikutnya
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), OUTBOX_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                for row in rows:
+                    key = (row[0], row[1])
+                    self._inflight[key] = asyncio.create_task(self._deliver(row))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("[OUTBOX] error dispatcher:", e)
+                await asyncio.sleep(5)
+
+    async def _deliver(self, row: Delivery) -> None:
+        sid, cid, text, attempts, created = row
+        try:
+            # retry antar putaran diatur outbox (backoff lebih panjang), bukan sender
+            status, hint = await self.sender.deliver(cid, text, max_retries=0)
+
+            now = time.time()
+            attempts += 1
+            if status == SEND_OK:
+                result = (sid, cid, STATUS_SENT, attempts, now, None)
+            elif status == SEND_FAILED or attempts >= self.max_attempts or now - created > self.max_age:
+                result = (sid, cid, STATUS_DEAD, attempts, now, status)
+            else:
+                result = (sid, cid, STATUS_PENDING, attempts, now + retry_delay(attempts, hint), status)
+            await asyncio.to_thread(self.outbox.record, [result], now)
+
+            if status == SEND_OK:
+                self.acked += 1
+                self._close_one(sid, now, sent=True)
+            elif result[2] == STATUS_DEAD:
+                self.dead += 1
+                self._close_one(sid, now, sent=False)
+            else:
+                self.retried += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # baris tetap pending di outbox → diambil lagi putaran berikutnya
+            print(f"[OUTBOX] error delivery {sid} → {cid}:", e)
+        finally:
+            self._inflight.pop((sid, cid), None)
+            self._wake.set()
+
+    def _close_one(self, signal_id: str, now: float, sent: bool) -> None:
+        entry = self._open.get(signal_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        entry[2] += int(sent)
+        if entry[1] > 0:
+            return
+        del self._open[signal_id]
+        elapsed = now - entry[0]
+        self.last_fanout_recipients = int(entry[2])
+        self.last_fanout_seconds = elapsed
+        self.max_fanout_seconds = max(self.max_fanout_seconds, elapsed)
+        print(f"[BROADCAST] {signal_id}: {int(entry[2])} chat terkirim, penerima terakhir {elapsed:.1f}s.")
+
+    # ------------------------------------------------------------------
+    # metrik
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        backlog, oldest = self.outbox.backlog()
+        return {
+            "backlog": backlog,
+            "oldest_seconds": round(oldest, 1),
+            "acked": self.acked,
+            "dead": self.dead,
+            "retried": self.retried,
+            "resumed": self.resumed,
+            "deduped": self.deduped,
+            "last_recipients": self.last_fanout_recipients,
+            "last_seconds": round(self.last_fanout_seconds, 2),
+            "max_seconds": round(self.max_fanout_seconds, 2),
+        }
+
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def get_dispatcher() -> OutboxDispatcher:
+    """
+    Dispatcher bersama (outbox di TELEGRAM_OUTBOX_DB); dijalankan run_sniper_bot.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboxDispatcher(TelegramOutbox())
+    return _dispatcher
+
+
+async def stop_dispatcher() -> None:
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+
+
+def format_outbox_stats() -> str:
+    if _dispatcher is None:
+        return "Outbox     : -\n"
+    st = _dispatcher.stats()
+    return (
+        f"Outbox     : backlog {st['backlog']} (tertua {st['oldest_seconds']:.0f}s), "
+        f"ack {st['acked']}, retry {st['retried']}, dead {st['dead']}, "
+        f"fan-out terakhir {st['last_recipients']} chat {st['last_seconds']:.1f}s "
+        f"(maks {st['max_seconds']:.1f}s)\n"
+    )
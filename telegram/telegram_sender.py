@@ -0,0 +1,242 @@
+# telegram/telegram_sender.py
+# Pengirim Telegram async untuk fan-out sinyal: satu httpx.AsyncClient
+# (koneksi keep-alive dipakai ulang), kirim paralel dibatasi semaphore,
+# token bucket global (~30 pesan/detik) & per chat (1 pesan/detik),
+# 429 → tunggu retry_after lalu coba lagi (atau serahkan ke outbox).
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from config import (
+    TELEGRAM_TOKEN,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_SEND_CONCURRENCY,
+    TELEGRAM_MAX_RETRIES,
+)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# timeout request sendMessage (detik)
+TELEGRAM_TIMEOUT_SECONDS = 10.0
+
+# jeda retry error jaringan / 5xx (detik, dikali 2 tiap percobaan)
+TELEGRAM_RETRY_BASE_SECONDS = 1.0
+
+# hasil deliver()
+SEND_OK = "ok"
+SEND_RETRY = "retry"
+SEND_FAILED = "failed"
+
+# bucket per chat yang idle lebih lama dari ini dibuang (detik)
+_CHAT_BUCKET_IDLE_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Token bucket versi reservasi (GCRA): reserve() langsung memesan slot kirim
+    berikutnya dan mengembalikan lama tunggu, jadi ribuan pengirim yang antre
+    tidak saling berebut bangun (tanpa thundering herd). Hanya dipakai dari
+    satu event loop, tidak perlu lock.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.interval = 1.0 / max(float(rate), 1e-9)
+        self.burst = max(float(burst if burst is not None else rate), 1.0)
+        # theoretical arrival time slot berikutnya
+        self._tat = 0.0
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        tat = max(self._tat, now)
+        send_at = max(now, tat - (self.burst - 1.0) * self.interval)
+        self._tat = tat + self.interval
+        return send_at - now
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Tidak ada slot sebelum `seconds` dari sekarang (retry_after).
+        """
+        until = time.monotonic() + seconds
+        self._tat = max(self._tat, until + (self.burst - 1.0) * self.interval)
+
+    def idle_since(self, now: float) -> float:
+        return now - self._tat
+
+
+class TelegramSender:
+    """
+    deliver()/send() = satu pesan (rate limit + retry). Fan-out sinyal lewat
+    outbox (telegram_outbox) yang memanggil deliver() per penerima. Harus dipakai dari event loop tempat client dibuat.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        concurrency: int = TELEGRAM_SEND_CONCURRENCY,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.max_retries = max(int(max_retries), 0)
+        self._global = TokenBucket(global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._sem = asyncio.Semaphore(max(int(concurrency), 1))
+        self._client = httpx.AsyncClient(
+            base_url=f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}",
+            limits=httpx.Limits(
+                max_connections=max(int(concurrency), 1),
+                max_keepalive_connections=max(int(concurrency), 1),
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(TELEGRAM_TIMEOUT_SECONDS, pool=60.0),
+        )
+        self._sends_since_prune = 0
+
+        # metrik
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, burst=1.0)
+            self._chats[chat_id] = bucket
+
+        self._sends_since_prune += 1
+        if self._sends_since_prune >= 1000:
+            self._sends_since_prune = 0
+            now = time.monotonic()
+            for cid in [c for c, b in self._chats.items() if b.idle_since(now) > _CHAT_BUCKET_IDLE_SECONDS]:
+                del self._chats[cid]
+        return bucket
+
+    async def deliver(
+        self,
+        chat_id: int,
+        text: str,
+        reply_markup: Optional[dict] = None,
+        max_retries: Optional[int] = None,
+    ) -> Tuple[str, float]:
+        """
+        sendMessage dengan rate limit per chat & global.
+        Return (SEND_OK | SEND_RETRY | SEND_FAILED, saran jeda retry detik):
+        SEND_RETRY = gagal sementara (jaringan / 5xx / 429) setelah retry habis,
+        SEND_FAILED = 400/403 (chat tidak ada / bot diblokir), tidak di-retry.
+        """
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+        if reply_markup is not None:
+            payload["reply_markup"] = reply_markup
+        chat_bucket = self._chat_bucket(chat_id)
+        max_retries = self.max_retries if max_retries is None else max(int(max_retries), 0)
+
+        retry_after = 0.0
+        for attempt in range(max_retries + 1):
+            # slot chat dulu baru slot global (slot global tidak terbuang
+            # selama menunggu jatah chat)
+            await chat_bucket.acquire()
+            await self._global.acquire()
+
+            try:
+                async with self._sem:
+                    resp = await self._client.post("/sendMessage", json=payload)
+            except httpx.HTTPError as e:
+                print(f"[TELEGRAM] error kirim ke {chat_id}: {e}")
+                retry_after = TELEGRAM_RETRY_BASE_SECONDS * (2 ** attempt)
+            else:
+                if resp.status_code == 200:
+                    self.sent += 1
+                    return SEND_OK, 0.0
+                if resp.status_code == 429:
+                    self.rate_limited += 1
+                    retry_after = _retry_after(resp)
+                    chat_bucket.pause(retry_after)
+                elif resp.status_code >= 500:
+                    retry_after = TELEGRAM_RETRY_BASE_SECONDS * (2 ** attempt)
+                else:
+                    print(f"[TELEGRAM] gagal kirim ke {chat_id}: {resp.status_code} {resp.text[:200]}")
+                    self.failed += 1
+                    return SEND_FAILED, 0.0
+
+            if attempt < max_retries:
+                self.retries += 1
+                await asyncio.sleep(retry_after)
+
+        self.failed += 1
+        return SEND_RETRY, retry_after
+
+    async def send(self, chat_id: int, text: str, reply_markup: Optional[dict] = None) -> bool:
+        """
+        deliver() dengan retry penuh; True kalau terkirim.
+        """
+        status, _ = await self.deliver(chat_id, text, reply_markup)
+        return status == SEND_OK
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def _retry_after(resp: httpx.Response) -> float:
+    try:
+        params = resp.json().get("parameters") or {}
+        if "retry_after" in params:
+            return float(params["retry_after"])
+    except ValueError:
+        pass
+    try:
+        return float(resp.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+_sender: Optional[TelegramSender] = None
+
+
+def get_sender() -> TelegramSender:
+    """
+    Sender bersama (dibuat saat pertama dipakai, di event loop aktif).
+    """
+    global _sender
+    if _sender is None or _sender.closed:
+        _sender = TelegramSender()
+    return _sender
+
+
+async def close_sender() -> None:
+    global _sender
+    sender = _sender
+    _sender = None
+    if sender is not None:
+        await sender.close()
+
+
+def format_sender_stats() -> str:
+    if _sender is None:
+        return "Telegram   : -\n"
+    st = _sender.stats()
+    return (
+        f"Telegram   : {st['sent']} terkirim, {st['failed']} gagal, "
+        f"{st['retries']} retry, {st['rate_limited']}× 429\n"
+    )
@@ -0,0 +1,551 @@
+# tools/backtest.py
+# Backtest offline strategi Spike-Reversal dari kline historis lokal.
+# Logika sinyal = logika live: detect_matrix (inti detect_spike_reversal_batch),
+# evaluate_setup (level, RR, SL%, tier), cooldown candle & detik, konteks HTF
+# point-in-time (bar 15m/1h yang sudah close + bar forming dari candle 5m
+# sampai bar sinyal, tanpa melihat ke depan). Outcome TP1/TP2/TP3/SL
+# diselesaikan dari bar-bar 5m sesudahnya. Satu proses per symbol.
+#
+# Data: store kline lokal (binance/kline_store.py, diisi tools/sync_klines.py,
+# dibaca via memmap) atau CSV format data.binance.vision (dengan / tanpa
+# header), dicari rekursif:
+#   <data_dir>/**/BTCUSDT-5m-*.csv, BTCUSDT-15m-*.csv, BTCUSDT-1h-*.csv
+# 15m / 1h yang tidak ada di-resample dari 5m.
+#
+#   python -m tools.backtest data/klines                      # semua symbol
+#   python -m tools.backtest data/klines -s BTCUSDT ETHUSDT --workers 8
+#   python -m tools.backtest data/klines --min-tier B --trades-out trades.csv
+
+import argparse
+import csv
+import glob
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from binance.kline_store import KlineStore
+from binance.mtf_aggregator import MTF_HISTORY_BARS, MTF_TIMEFRAMES
+from binance.ohlc_buffer import INTERVAL_MS_5M, CandleWindow
+from common.htf_context import compute_htf_context
+from config import SIGNAL_COOLDOWN_SECONDS
+from sniper.sniper_analyzer import evaluate_setup
+from sniper.sniper_batch import detect_matrix, detect_width
+from sniper.sniper_detector import detect_spike_reversal
+from sniper.sniper_settings import SniperSettings, sniper_settings
+
+# live baru menganalisa kalau buffer sudah >= 40 candle (_handle_kline_message)
+BT_WARMUP_BARS = 40
+
+# maksimal bar 5m setelah fill untuk menunggu TP/SL (288 = 1 hari)
+BT_HORIZON_BARS = 288
+
+# kolom kline yang dipakai (urutan kolom CSV data.binance.vision)
+_CSV_COLUMNS = ("open_time", "open", "high", "low", "close", "volume", "close_time")
+
+Klines = Dict[str, np.ndarray]
+
+
+# ---------------------------------------------------------------------------
+# data
+# ---------------------------------------------------------------------------
+
+def _read_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path, header=None, usecols=range(7), names=_CSV_COLUMNS, dtype=str)
+    # file baru punya baris header ("open_time,open,...") → buang baris non-angka
+    df = df[df["open_time"].str.isdigit()]
+    return df
+
+
+def load_klines(paths: Iterable[str]) -> Optional[Klines]:
+    """
+    Gabung beberapa file CSV kline → kolom NumPy urut open_time, tanpa duplikat.
+    """
+    frames = [_read_csv(p) for p in sorted(paths)]
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=True)
+    open_time = df["open_time"].to_numpy(np.int64)
+    open_time, idx = np.unique(open_time, return_index=True)
+    out: Klines = {
+        "open_time": open_time,
+        "close_time": df["close_time"].to_numpy(np.int64)[idx],
+    }
+    for name in ("open", "high", "low", "close", "volume"):
+        out[name] = df[name].to_numpy(np.float64)[idx]
+    return out
+
+
+def _symbol_files(data_dir: str, symbol: str, interval: str) -> List[str]:
+    pattern = os.path.join(data_dir, "**", f"{symbol}-{interval}-*.csv")
+    return glob.glob(pattern, recursive=True)
+
+
+def list_symbols(data_dir: str) -> List[str]:
+    if KlineStore.exists(data_dir):
+        return KlineStore(data_dir).symbols("5m")
+    pattern = os.path.join(data_dir, "**", "*-5m-*.csv")
+    names = (os.path.basename(p) for p in glob.glob(pattern, recursive=True))
+    return sorted({n.split("-5m-")[0] for n in names})
+
+
+def load_symbol(data_dir: str, symbol: str) -> Dict[str, Optional[Klines]]:
+    """
+    {"5m": klines, "15m": klines / None, "1h": klines / None}
+    data_dir = store kline lokal (kolom memmap, tanpa parse) atau folder CSV.
+    """
+    if KlineStore.exists(data_dir):
+        store = KlineStore(data_dir)
+        out: Dict[str, Optional[Klines]] = {}
+        for interval in ("5m", *MTF_TIMEFRAMES):
+            k = store.read(symbol, interval)
+            out[interval] = None if k is None else {name: np.asarray(arr) for name, arr in k.items()}
+        return out
+    return {
+        interval: load_klines(_symbol_files(data_dir, symbol, interval))
+        for interval in ("5m", *MTF_TIMEFRAMES)
+    }
+
+
+def resample(k5: Klines, interval_ms: int) -> Klines:
+    """
+    Bar HTF dari candle 5m (bar pertama / terakhir bisa tidak lengkap).
+    """
+    start = k5["open_time"] - k5["open_time"] % interval_ms
+    first = np.flatnonzero(np.r_[True, start[1:] != start[:-1]])
+    last = np.r_[first[1:] - 1, start.size - 1]
+    return {
+        "open_time": start[first],
+        "close_time": start[first] + interval_ms - 1,
+        "open": k5["open"][first],
+        "high": np.maximum.reduceat(k5["high"], first),
+        "low": np.minimum.reduceat(k5["low"], first),
+        "close": k5["close"][last],
+        "volume": np.add.reduceat(k5["volume"], first),
+    }
+
+
+# ---------------------------------------------------------------------------
+# HTF point-in-time
+# ---------------------------------------------------------------------------
+
+class HTFTimeline:
+    """
+    Konteks HTF seperti yang dilihat live saat candle 5m ke-i close:
+    MTF_HISTORY_BARS - 1 bar HTF yang sudah close sebelum bucket bar i,
+    ditambah bar forming (open bucket .. bar i). Hasil di-memo per index
+    (tidak tergantung SniperSettings, bisa dipakai ulang antar run).
+    """
+
+    def __init__(
+        self,
+        k5: Klines,
+        htf: Dict[str, Optional[Klines]],
+        history: int = MTF_HISTORY_BARS,
+    ) -> None:
+        self.history = history
+        self._tf: Dict[str, Tuple[Klines, np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._memo: Dict[int, Dict[str, object]] = {}
+
+        idx = np.arange(k5["open_time"].size)
+        for tf, ms in MTF_TIMEFRAMES.items():
+            closed = htf.get(tf) or resample(k5, ms)
+            start = k5["open_time"] - k5["open_time"] % ms
+            new_group = np.r_[True, start[1:] != start[:-1]]
+            group_first = np.maximum.accumulate(np.where(new_group, idx, 0))
+
+            # high / low bar forming s/d bar i (maks ms/5m langkah, tetap vectorized)
+            part_high = k5["high"].copy()
+            part_low = k5["low"].copy()
+            for k in range(1, ms // INTERVAL_MS_5M):
+                m = idx - k >= group_first
+                if not m.any():
+                    break
+                src = idx[m] - k
+                part_high[m] = np.maximum(part_high[m], k5["high"][src])
+                part_low[m] = np.minimum(part_low[m], k5["low"][src])
+
+            self._tf[tf] = (closed, start, part_high, part_low)
+        self._close = k5["close"]
+
+    def _hlc(self, tf: str, i: int) -> Dict[str, np.ndarray]:
+        closed, start, part_high, part_low = self._tf[tf]
+        bucket = start[i]
+        end = int(np.searchsorted(closed["open_time"], bucket, side="left"))
+        begin = max(end - (self.history - 1), 0)
+        return {
+            "open_time": np.r_[closed["open_time"][begin:end], bucket],
+            "high": np.r_[closed["high"][begin:end], part_high[i]],
+            "low": np.r_[closed["low"][begin:end], part_low[i]],
+            "close": np.r_[closed["close"][begin:end], self._close[i]],
+        }
+
+    def context_at(self, i: int) -> Dict[str, object]:
+        ctx = self._memo.get(i)
+        if ctx is None:
+            ctx = compute_htf_context(self._hlc("1h", i), self._hlc("15m", i))
+            self._memo[i] = ctx
+        return ctx
+
+
+# ---------------------------------------------------------------------------
+# sinyal & outcome
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Trade:
+    symbol: str
+    signal_time: int      # close time bar sinyal (ms)
+    side: str
+    tier: str
+    score: int
+    entry: float
+    sl: float
+    tp1: float
+    tp2: float
+    tp3: float
+    sl_pct: float
+    outcome: str          # SL / TP1 / TP2 / TP3 / OPEN / NOFILL
+    r: float              # hasil dalam kelipatan risk (entry - SL)
+    fill_bars: int        # bar sampai entry tersentuh (-1 kalau tidak fill)
+    bars_held: int        # bar dari fill sampai outcome
+
+
+def _window_at(k5: Klines, i: int) -> CandleWindow:
+    cols = {name: k5[name][: i + 1] for name in ("open_time", "close_time", "open", "high", "low", "close", "volume")}
+    return CandleWindow(closed=np.ones(i + 1, dtype=np.bool_), seq=i + 1, **cols)
+
+
+def detect_candidates(
+    k5: Klines,
+    s: SniperSettings,
+    bars: Optional[np.ndarray] = None,
+) -> Dict[int, Dict]:
+    """
+    Semua bar (index) yang lolos detector → det (format detect_spike_reversal).
+    Matriks sliding_window_view (zero-copy) lewat detect_matrix; bar awal yang
+    lebih pendek dari lookback penuh lewat jalur scalar seperti batch live.
+    bars: hanya evaluasi index ini (urut naik; optimizer → bar pra-filter).
+    """
+    n = k5["close"].size
+    width = detect_width(s)
+    offset = width - 1
+    out: Dict[int, Dict] = {}
+
+    if bars is None:
+        early: Iterable[int] = range(BT_WARMUP_BARS - 1, min(offset, n))
+    else:
+        early = bars[(bars >= BT_WARMUP_BARS - 1) & (bars < offset)]
+    for i in early:
+        det = detect_spike_reversal(_window_at(k5, int(i)), s)
+        if det:
+            out[int(i)] = det
+
+    if n < width:
+        return out
+
+    views = [sliding_window_view(k5[name], width) for name in ("open", "high", "low", "close")]
+    if bars is None:
+        index = np.arange(offset, n)
+    else:
+        index = bars[bars >= offset]
+        views = [v[index - offset] for v in views]
+    m = detect_matrix(*views, s)
+    is_long = m["is_long"]
+    for row in np.flatnonzero(is_long | m["is_short"]):
+        i = int(index[row])
+        if i < BT_WARMUP_BARS - 1:
+            continue
+        out[i] = {
+            "side": "long" if is_long[row] else "short",
+            "sweep_ok": True,
+            "body": float(m["body"][row]),
+            "range": float(m["range"][row]),
+            "bear_leg_cnt": int(m["bear_cnt"][row]),
+            "bull_leg_cnt": int(m["bull_cnt"][row]),
+            "last": {
+                "open_time": int(k5["open_time"][i]),
+                "close_time": int(k5["close_time"][i]),
+                "open": float(k5["open"][i]),
+                "high": float(k5["high"][i]),
+                "low": float(k5["low"][i]),
+                "close": float(k5["close"][i]),
+                "volume": float(k5["volume"][i]),
+                "closed": True,
+            },
+        }
+    return out
+
+
+def resolve_outcome(
+    k5: Klines,
+    i: int,
+    setup: Dict,
+    max_entry_age: int,
+    horizon: int = BT_HORIZON_BARS,
+) -> "Outcome":
+    """
+    (outcome, r, fill_bars, bars_held) untuk sinyal di bar i.
+    Entry limit berlaku max_entry_age bar setelah bar sinyal. Setelah fill,
+    TP tertinggi yang tersentuh sebelum SL = outcome; SL & TP di bar yang sama
+    dihitung SL (konservatif, urutan intrabar tidak diketahui).
+    """
+    long = setup["side"] == "long"
+    entry, sl = setup["entry"], setup["sl"]
+    risk = abs(entry - sl)
+    high, low = k5["high"], k5["low"]
+
+    fill_end = min(i + 1 + max_entry_age, high.size)
+    touch = low[i + 1:fill_end] <= entry if long else high[i + 1:fill_end] >= entry
+    hits = np.flatnonzero(touch)
+    if hits.size == 0:
+        return "NOFILL", 0.0, -1, 0
+    f = i + 1 + int(hits[0])
+
+    end = min(f + horizon, high.size)
+    if long:
+        sl_hit = low[f:end] <= sl
+        fav = high[f:end]
+    else:
+        sl_hit = high[f:end] >= sl
+        fav = -low[f:end]
+
+    first_sl = int(np.argmax(sl_hit)) if sl_hit.any() else end - f
+    outcome, r, held = "OPEN", 0.0, end - f - 1
+    for name in ("tp3", "tp2", "tp1"):
+        target = setup[name] if long else -setup[name]
+        tp_hit = np.flatnonzero(fav[:first_sl] >= target)
+        if tp_hit.size:
+            outcome = name.upper()
+            r = abs(setup[name] - entry) / risk
+            held = int(tp_hit[0])
+            break
+    else:
+        if first_sl < end - f:
+            outcome, r, held = "SL", -1.0, first_sl
+        else:
+            last = k5["close"][end - 1]
+            r = ((last - entry) if long else (entry - last)) / risk
+
+    return outcome, float(r), f - i, held
+
+
+Outcome = Tuple[str, float, int, int]
+
+
+def simulate(
+    symbol: str,
+    k5: Klines,
+    candidates: Dict[int, Dict],
+    s: SniperSettings,
+    min_tier: Optional[str],
+    cooldown_seconds: int,
+    context_at: Callable[[int], Dict[str, object]],
+    outcome_at: Callable[[int, Dict], Outcome],
+) -> List[Trade]:
+    """
+    Jalankan kandidat deteksi urut waktu lewat cooldown & evaluate_setup.
+    context_at(i) → konteks HTF bar i, outcome_at(i, setup) → hasil trade.
+    """
+    trades: List[Trade] = []
+    last_seq: Optional[int] = None
+    last_ts = 0.0
+
+    for i in sorted(candidates):
+        # cooldown detik (sebelum antrian) & cooldown candle (analyzer), sama
+        # dengan jalur live; seq = i + 1
+        close_ts = (int(k5["open_time"][i]) + INTERVAL_MS_5M) / 1000.0
+        if cooldown_seconds > 0 and last_ts and close_ts - last_ts < cooldown_seconds:
+            continue
+        if last_seq is not None and 0 <= (i + 1) - last_seq < s.cooldown_candles:
+            continue
+
+        setup = evaluate_setup(candidates[i], lambda: context_at(i), s, min_tier)
+        if setup is None:
+            continue
+
+        last_seq = i + 1
+        last_ts = close_ts
+
+        outcome, r, fill_bars, held = outcome_at(i, setup)
+        trades.append(
+            Trade(
+                symbol=symbol,
+                signal_time=int(close_ts * 1000),
+                side=setup["side"],
+                tier=setup["tier"],
+                score=int(setup["score"]),
+                entry=setup["entry"],
+                sl=setup["sl"],
+                tp1=setup["tp1"],
+                tp2=setup["tp2"],
+                tp3=setup["tp3"],
+                sl_pct=setup["sl_pct"],
+                outcome=outcome,
+                r=r,
+                fill_bars=fill_bars,
+                bars_held=held,
+            )
+        )
+    return trades
+
+
+def run_symbol(
+    symbol: str,
+    data: Dict[str, Optional[Klines]],
+    settings: Optional[SniperSettings] = None,
+    min_tier: Optional[str] = None,
+    cooldown_seconds: int = SIGNAL_COOLDOWN_SECONDS,
+    horizon: int = BT_HORIZON_BARS,
+) -> List[Trade]:
+    """
+    Backtest satu symbol.
+    """
+    s = settings or sniper_settings
+    k5 = data.get("5m")
+    if k5 is None or k5["close"].size < BT_WARMUP_BARS:
+        return []
+
+    candidates = detect_candidates(k5, s)
+    if not candidates:
+        return []
+    timeline = HTFTimeline(k5, data)
+
+    return simulate(
+        symbol,
+        k5,
+        candidates,
+        s,
+        min_tier,
+        cooldown_seconds,
+        timeline.context_at,
+        lambda i, setup: resolve_outcome(k5, i, setup, s.max_entry_age_candles, horizon),
+    )
+
+
+def _run_file_symbol(
+    job: Tuple[str, str, SniperSettings, Optional[str], int, int],
+) -> Tuple[str, int, List[Trade]]:
+    data_dir, symbol, settings, min_tier, cooldown_seconds, horizon = job
+    data = load_symbol(data_dir, symbol)
+    k5 = data.get("5m")
+    bars = 0 if k5 is None else int(k5["close"].size)
+    trades = run_symbol(symbol, data, settings, min_tier, cooldown_seconds, horizon)
+    return symbol, bars, trades
+
+
+def run_backtest(
+    data_dir: str,
+    symbols: List[str],
+    settings: Optional[SniperSettings] = None,
+    min_tier: Optional[str] = None,
+    cooldown_seconds: int = SIGNAL_COOLDOWN_SECONDS,
+    horizon: int = BT_HORIZON_BARS,
+    workers: Optional[int] = None,
+) -> Tuple[List[Trade], int]:
+    """
+    Satu job per symbol di ProcessPoolExecutor (load + deteksi + outcome di
+    worker, hanya list Trade yang dikirim balik). Return (trades, total bar).
+    """
+    s = settings or sniper_settings
+    jobs = [(data_dir, sym, s, min_tier, cooldown_seconds, horizon) for sym in symbols]
+    trades: List[Trade] = []
+    total_bars = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for symbol, bars, sym_trades in pool.map(_run_file_symbol, jobs, chunksize=1):
+            total_bars += bars
+            trades.extend(sym_trades)
+    trades.sort(key=lambda t: (t.signal_time, t.symbol))
+    return trades, total_bars
+
+
+# ---------------------------------------------------------------------------
+# ringkasan
+# ---------------------------------------------------------------------------
+
+def summarize(trades: List[Trade]) -> Dict[str, Dict[str, object]]:
+    """
+    Statistik per tier + total: jumlah sinyal, fill, win rate (>= TP1),
+    rata-rata & total R (hanya trade yang fill).
+    """
+    groups: Dict[str, List[Trade]] = {"ALL": trades}
+    for t in trades:
+        groups.setdefault(t.tier, []).append(t)
+
+    out: Dict[str, Dict[str, object]] = {}
+    for name, group in groups.items():
+        filled = [t for t in group if t.outcome != "NOFILL"]
+        wins = sum(1 for t in filled if t.outcome.startswith("TP"))
+        total_r = sum(t.r for t in filled)
+        out[name] = {
+            "signals": len(group),
+            "filled": len(filled),
+            "win_rate": round(wins / len(filled), 3) if filled else 0.0,
+            "avg_r": round(total_r / len(filled), 3) if filled else 0.0,
+            "total_r": round(total_r, 2),
+            "outcomes": dict(Counter(t.outcome for t in group)),
+        }
+    return out
+
+
+def _write_trades(path: str, trades: List[Trade]) -> None:
+    fields = list(Trade.__dataclass_fields__)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for t in trades:
+            writer.writerow(asdict(t))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Backtest offline Spike-Reversal dari kline lokal")
+    ap.add_argument("data_dir", help="store kline lokal atau folder CSV (format data.binance.vision)")
+    ap.add_argument("-s", "--symbols", nargs="*", help="default: semua symbol yang ada 5m-nya")
+    ap.add_argument("--min-tier", default=None, help="default: sniper_settings.default_min_tier")
+    ap.add_argument("--cooldown", type=int, default=SIGNAL_COOLDOWN_SECONDS, help="cooldown detik per symbol")
+    ap.add_argument("--horizon", type=int, default=BT_HORIZON_BARS, help="maks bar 5m setelah fill")
+    ap.add_argument("--workers", type=int, default=None, help="jumlah proses (default: semua core)")
+    ap.add_argument("--trades-out", help="simpan daftar trade (CSV)")
+    args = ap.parse_args()
+
+    symbols = [s.upper() for s in args.symbols] if args.symbols else list_symbols(args.data_dir)
+    if not symbols:
+        raise SystemExit(f"Tidak ada data 5m di {args.data_dir}")
+
+    min_tier = args.min_tier or sniper_settings.default_min_tier
+    print(f"Backtest {len(symbols)} symbol (min tier {min_tier}, cooldown {args.cooldown}s)...")
+    t0 = time.perf_counter()
+    trades, bars = run_backtest(
+        args.data_dir,
+        symbols,
+        min_tier=min_tier,
+        cooldown_seconds=args.cooldown,
+        horizon=args.horizon,
+        workers=args.workers,
+    )
+    elapsed = time.perf_counter() - t0
+    print(f"{bars} bar 5m, {len(trades)} sinyal dalam {elapsed:.1f}s")
+
+    for tier, st in summarize(trades).items():
+        print(
+            f"  {tier:<4}: {st['signals']:>6} sinyal, fill {st['filled']:>6}, "
+            f"win {st['win_rate'] * 100:5.1f}%, avg {st['avg_r']:+.3f}R, "
+            f"total {st['total_r']:+.1f}R  {st['outcomes']}"
+        )
+
+    if args.trades_out:
+        _write_trades(args.trades_out, trades)
+        print(f"{len(trades)} trade disimpan ke {args.trades_out}")
+
+
+if __name__ == "__main__":
+    main()
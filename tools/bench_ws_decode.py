@@ -0,0 +1,94 @@
+# tools/bench_ws_decode.py
+# Micro-benchmark jalur receive frame kline: decode JSON + update OHLCBuffer.
+# Bandingkan json standar vs decoder cepat (orjson/msgspec kalau ada) dan
+# prefilter intrabar. Jalankan dari root repo:
+#   python -m tools.bench_ws_decode [--frames 200000] [--symbols 300]
+
+import argparse
+import json
+import random
+import time
+from typing import Callable, List, Optional
+
+from binance.binance_ws_pool import WSShard
+from binance.ohlc_buffer import OHLCBufferManager
+from binance.ws_decode import DECODER_NAME, decode, is_intrabar_kline
+
+INTERVAL_MS = 5 * 60 * 1000
+
+
+def _make_frames(n_frames: int, n_symbols: int, close_every: int) -> List[str]:
+    """
+    Frame combined-stream sintetis (format sama dengan Binance): tiap symbol
+    dapat `close_every` update per candle, update terakhir x=true.
+    """
+    rnd = random.Random(7)
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    price = {s: 100.0 + rnd.random() * 10 for s in symbols}
+    frames: List[str] = []
+    t0 = 1_700_000_000_000 // INTERVAL_MS * INTERVAL_MS
+    tick = 0
+    while len(frames) < n_frames:
+        bar = tick // close_every
+        closed = tick % close_every == close_every - 1
+        open_time = t0 + bar * INTERVAL_MS
+        for s in symbols:
+            p = price[s] = price[s] * (1 + rnd.uniform(-0.001, 0.001))
+            k = {
+                "t": open_time, "T": open_time + INTERVAL_MS - 1, "s": s, "i": "5m",
+                "f": 1, "L": 2, "o": f"{p:.4f}", "c": f"{p * 1.0005:.4f}",
+                "h": f"{p * 1.002:.4f}", "l": f"{p * 0.998:.4f}", "v": "1234.5",
+                "n": 10, "x": closed, "q": "123456.7", "V": "600.1", "Q": "60000.2", "B": "0",
+            }
+            data = {"e": "kline", "E": open_time + 1000, "s": s, "k": k}
+            frames.append(
+                json.dumps({"stream": f"{s.lower()}@kline_5m", "data": data}, separators=(",", ":"))
+            )
+        tick += 1
+    return frames[:n_frames]
+
+
+def _run(
+    frames: List[str],
+    decoder: Callable,
+    skip_raw: Optional[Callable] = None,
+) -> float:
+    mgr = OHLCBufferManager(max_candles=120)
+
+    def on_message(data, recv_ts):
+        payload = data.get("data", {})
+        kline = payload.get("k")
+        if kline:
+            mgr.update_from_kline(payload.get("s", "").lower(), kline)
+
+    shard = WSShard("bench", [], on_message, skip_raw=skip_raw, decoder=decoder)
+    t = time.perf_counter()
+    for raw in frames:
+        shard._handle_raw(raw)
+    return len(frames) / (time.perf_counter() - t)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark decode frame kline WebSocket")
+    ap.add_argument("--frames", type=int, default=200_000)
+    ap.add_argument("--symbols", type=int, default=300)
+    ap.add_argument("--close-every", type=int, default=20, help="update per candle per symbol")
+    args = ap.parse_args()
+
+    frames = _make_frames(args.frames, args.symbols, args.close_every)
+    print(f"{len(frames)} frame, {args.symbols} symbol, 1 dari {args.close_every} frame x=true")
+
+    cases = [
+        ("json.loads (baseline)", json.loads, None),
+        (f"{DECODER_NAME}", decode, None),
+        (f"{DECODER_NAME} + prefilter", decode, is_intrabar_kline),
+    ]
+    base = None
+    for name, dec, flt in cases:
+        rate = _run(frames, dec, flt)
+        base = base or rate
+        print(f"  {name:<28} {rate:>12,.0f} frame/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
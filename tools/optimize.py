@@ -0,0 +1,495 @@
+# tools/optimize.py
+# Sweep parameter SniperSettings (grid / random) + evaluasi walk-forward,
+# di atas mesin backtest tools/backtest.py.
+#
+# Alur:
+# 1. prepare (paralel per symbol): load kline, pra-filter bar yang mungkin
+#    lolos detector untuk SEMUA kombinasi di ruang pencarian (syarat arah &
+#    wick tetap + body/range >= nilai terkecil di grid), lalu hitung sekali
+#    hal yang tidak tergantung parameter: konteks HTF point-in-time & outcome
+#    trade (level _build_levels hanya tergantung candle sinyal).
+# 2. kolom kline semua symbol disalin ke shared memory; worker attach sekali
+#    (initializer), task hanya berisi SniperSettings.
+# 3. tiap kombinasi dijalankan di seluruh history → (waktu sinyal, outcome, R);
+#    metrik tiap window walk-forward tinggal difilter per waktu.
+#
+#   python -m tools.optimize data/klines --samples 300
+#   python -m tools.optimize data/klines --grid --fields min_body_factor max_sl_pct
+#   python -m tools.optimize data/klines --train-days 56 --test-days 7 --out best.json
+
+import argparse
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import SIGNAL_COOLDOWN_SECONDS
+from sniper.sniper_analyzer import _build_levels
+from sniper.sniper_settings import SniperSettings, sniper_settings
+from tools.backtest import (
+    BT_HORIZON_BARS,
+    BT_WARMUP_BARS,
+    HTFTimeline,
+    Klines,
+    detect_candidates,
+    list_symbols,
+    load_symbol,
+    resolve_outcome,
+    simulate,
+)
+
+# nilai yang dicoba per field SniperSettings
+SEARCH_SPACE: Dict[str, List] = {
+    "min_body_factor": [1.5, 1.75, 2.0, 2.25, 2.5, 3.0],
+    "min_body_vs_range": [0.45, 0.5, 0.55, 0.6, 0.65, 0.7],
+    "leg_lookback": [12, 15, 18, 24],
+    "min_bear_candles": [4, 5, 6, 7, 8],
+    "min_bull_candles": [4, 5, 6, 7, 8],
+    "avg_body_lookback": [14, 20, 30],
+    "sweep_lookback": [10, 15, 20],
+    "max_sl_pct": [0.5, 0.6, 0.8, 1.0, 1.2],
+    "min_rr_tp2": [1.4, 1.6, 1.8, 2.0],
+    "cooldown_candles": [1, 3, 6, 12],
+}
+
+# grid penuh di atas ini → peringatan (pakai --samples / --fields)
+OPT_MAX_GRID = 5000
+
+OUTCOMES = ("NOFILL", "SL", "TP1", "TP2", "TP3", "OPEN")
+_OUTCOME_CODE = {name: i for i, name in enumerate(OUTCOMES)}
+
+_COLUMNS = ("open_time", "close_time", "open", "high", "low", "close", "volume")
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+Params = Dict[str, object]
+# (waktu sinyal ms, kode outcome, R) per kombinasi
+RunResult = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+# ---------------------------------------------------------------------------
+# ruang pencarian
+# ---------------------------------------------------------------------------
+
+def build_param_sets(
+    fields: List[str],
+    samples: int = 0,
+    seed: int = 0,
+) -> List[Params]:
+    """
+    samples 0 → grid penuh atas `fields`; > 0 → sampel acak unik dari grid.
+    Index 0 selalu setting saat ini (baseline).
+    """
+    values = [SEARCH_SPACE[f] for f in fields]
+    total = int(np.prod([len(v) for v in values])) if values else 1
+
+    if samples <= 0 or samples >= total:
+        if total > OPT_MAX_GRID:
+            print(f"Peringatan: grid penuh {total} kombinasi (pakai --samples / --fields).")
+        combos = list(itertools.product(*values))
+    else:
+        rng = random.Random(seed)
+        picked = set()
+        while len(picked) < samples:
+            picked.add(tuple(rng.choice(v) for v in values))
+        combos = sorted(picked)
+
+    baseline = {f: getattr(sniper_settings, f) for f in fields}
+    out: List[Params] = [baseline]
+    for combo in combos:
+        params = dict(zip(fields, combo))
+        if params != baseline:
+            out.append(params)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# prepare (cache yang tidak tergantung parameter)
+# ---------------------------------------------------------------------------
+
+def prefilter_bars(k5: Klines, min_body_vs_range: float) -> np.ndarray:
+    """
+    Index bar yang lolos syarat detector yang tidak di-sweep (range > 0, arah
+    body, wick berlawanan <= 25%) + body/range >= min_body_vs_range terkecil.
+    """
+    o, h, l, c = k5["open"], k5["high"], k5["low"], k5["close"]
+    body = np.abs(c - o)
+    rng = h - l
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_rng = np.where(rng > 0, rng, 1.0)
+        body_ratio = body / safe_rng
+        upper_wick_ratio = (h - np.maximum(o, c)) / safe_rng
+        lower_wick_ratio = (np.minimum(o, c) - l) / safe_rng
+
+    ok = (
+        (rng > 0)
+        & (body_ratio >= min_body_vs_range)
+        & (((c > o) & (upper_wick_ratio <= 0.25)) | ((c < o) & (lower_wick_ratio <= 0.25)))
+    )
+    ok[: BT_WARMUP_BARS - 1] = False
+    return np.flatnonzero(ok)
+
+
+def _prepare_symbol(
+    job: Tuple[str, str, float, int, int],
+) -> Tuple[str, Optional[Klines], Optional[Dict[str, np.ndarray]]]:
+    data_dir, symbol, min_body_vs_range, max_entry_age, horizon = job
+    data = load_symbol(data_dir, symbol)
+    k5 = data.get("5m")
+    if k5 is None or k5["close"].size < BT_WARMUP_BARS:
+        return symbol, None, None
+
+    bars = prefilter_bars(k5, min_body_vs_range)
+    timeline = HTFTimeline(k5, data)
+
+    n = bars.size
+    prep = {
+        "bars": bars,
+        "htf_long": np.ones(n, dtype=np.bool_),
+        "htf_short": np.ones(n, dtype=np.bool_),
+        "code": np.zeros(n, dtype=np.int8),
+        "r": np.zeros(n, dtype=np.float64),
+        "fill": np.zeros(n, dtype=np.int32),
+        "held": np.zeros(n, dtype=np.int32),
+    }
+    for j, i in enumerate(bars):
+        i = int(i)
+        ctx = timeline.context_at(i)
+        prep["htf_long"][j] = bool(ctx.get("htf_ok_long", True))
+        prep["htf_short"][j] = bool(ctx.get("htf_ok_short", True))
+
+        side = "long" if k5["close"][i] > k5["open"][i] else "short"
+        last = {name: k5[name][i] for name in ("open", "high", "low", "close")}
+        setup = {**_build_levels(side, last), "side": side}
+        outcome, r, fill, held = resolve_outcome(k5, i, setup, max_entry_age, horizon)
+        prep["code"][j] = _OUTCOME_CODE[outcome]
+        prep["r"][j] = r
+        prep["fill"][j] = fill
+        prep["held"][j] = held
+
+    return symbol, k5, prep
+
+
+# ---------------------------------------------------------------------------
+# shared memory
+# ---------------------------------------------------------------------------
+
+class SharedColumns:
+    """
+    Kolom kline semua symbol (disambung) di shared memory.
+    spec = (nama blok, dtype, panjang) per kolom, cukup kecil untuk dikirim
+    ke initializer worker.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]) -> None:
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, str, int]] = {}
+        for name, arr in columns.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            view[:] = arr
+            self._blocks.append(shm)
+            self.spec[name] = (shm.name, arr.dtype.str, arr.size)
+
+    def close(self) -> None:
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+# state worker (diisi _init_worker sekali per proses)
+_w_blocks: List[shared_memory.SharedMemory] = []
+_w_columns: Dict[str, np.ndarray] = {}
+_w_offsets: Dict[str, Tuple[int, int]] = {}
+_w_prep: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def _init_worker(
+    spec: Dict[str, Tuple[str, str, int]],
+    offsets: Dict[str, Tuple[int, int]],
+    prep: Dict[str, Dict[str, np.ndarray]],
+) -> None:
+    global _w_offsets, _w_prep
+    for name, (shm_name, dtype, size) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _w_blocks.append(shm)
+        arr = np.ndarray((size,), dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        _w_columns[name] = arr
+    _w_offsets = offsets
+    _w_prep = prep
+
+
+def _eval_params(
+    job: Tuple[int, SniperSettings, Optional[str], int],
+) -> Tuple[int, RunResult]:
+    idx, s, min_tier, cooldown_seconds = job
+    times: List[int] = []
+    codes: List[int] = []
+    rs: List[float] = []
+
+    for symbol, (start, end) in _w_offsets.items():
+        p = _w_prep[symbol]
+        k5 = {name: col[start:end] for name, col in _w_columns.items()}
+        candidates = detect_candidates(k5, s, p["bars"])
+        if not candidates:
+            continue
+        pos = {int(b): j for j, b in enumerate(p["bars"])}
+
+        def context_at(i: int) -> Dict[str, object]:
+            j = pos[i]
+            return {"htf_ok_long": bool(p["htf_long"][j]), "htf_ok_short": bool(p["htf_short"][j])}
+
+        def outcome_at(i: int, setup: Dict) -> Tuple[str, float, int, int]:
+            j = pos[i]
+            return OUTCOMES[p["code"][j]], float(p["r"][j]), int(p["fill"][j]), int(p["held"][j])
+
+        for t in simulate(symbol, k5, candidates, s, min_tier, cooldown_seconds, context_at, outcome_at):
+            times.append(t.signal_time)
+            codes.append(_OUTCOME_CODE[t.outcome])
+            rs.append(t.r)
+
+    return idx, (
+        np.asarray(times, dtype=np.int64),
+        np.asarray(codes, dtype=np.int8),
+        np.asarray(rs, dtype=np.float64),
+    )
+
+
+# ---------------------------------------------------------------------------
+# walk-forward
+# ---------------------------------------------------------------------------
+
+def walk_forward_folds(
+    t_start: int,
+    t_end: int,
+    train_days: int,
+    test_days: int,
+) -> List[Tuple[int, int, int]]:
+    """
+    [(train_start, train_end, test_end)] bergeser test_days tiap fold (ms).
+    """
+    train = train_days * DAY_MS
+    test = test_days * DAY_MS
+    folds = []
+    k = 0
+    while t_start + k * test + train < t_end:
+        a = t_start + k * test
+        folds.append((a, a + train, min(a + train + test, t_end)))
+        k += 1
+    return folds
+
+
+def window_metrics(res: RunResult, a: int, b: int) -> Dict[str, float]:
+    times, codes, rs = res
+    m = (times >= a) & (times < b)
+    filled = m & (codes != _OUTCOME_CODE["NOFILL"])
+    n_filled = int(filled.sum())
+    wins = int((filled & (codes >= _OUTCOME_CODE["TP1"]) & (codes <= _OUTCOME_CODE["TP3"])).sum())
+    total_r = float(rs[filled].sum())
+    return {
+        "signals": int(m.sum()),
+        "filled": n_filled,
+        "win_rate": wins / n_filled if n_filled else 0.0,
+        "avg_r": total_r / n_filled if n_filled else 0.0,
+        "total_r": total_r,
+    }
+
+
+def _objective(metrics: Dict[str, float], objective: str, min_trades: int) -> float:
+    if metrics["filled"] < min_trades:
+        return float("-inf")
+    return metrics[objective]
+
+
+def _best(
+    results: Dict[int, RunResult],
+    a: int,
+    b: int,
+    objective: str,
+    min_trades: int,
+) -> Tuple[int, Dict[str, float]]:
+    scored = [(idx, window_metrics(res, a, b)) for idx, res in results.items()]
+    # seri → index kecil (baseline menang kalau sama baiknya)
+    return max(scored, key=lambda x: (_objective(x[1], objective, min_trades), -x[0]))
+
+
+def _fmt(m: Dict[str, float]) -> str:
+    return (
+        f"{m['filled']:>5} trade, win {m['win_rate'] * 100:5.1f}%, "
+        f"avg {m['avg_r']:+.3f}R, total {m['total_r']:+.1f}R"
+    )
+
+
+def _day(ts_ms: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts_ms / 1000))
+
+
+# ---------------------------------------------------------------------------
+# main
+# ---------------------------------------------------------------------------
+
+def run_optimizer(
+    data_dir: str,
+    symbols: List[str],
+    param_sets: List[Params],
+    min_tier: Optional[str],
+    cooldown_seconds: int = SIGNAL_COOLDOWN_SECONDS,
+    horizon: int = BT_HORIZON_BARS,
+    workers: Optional[int] = None,
+) -> Tuple[Dict[int, RunResult], int, int]:
+    """
+    Return ({index param: hasil run}, waktu bar pertama, waktu bar terakhir).
+    """
+    min_ratio = min(float(p.get("min_body_vs_range", sniper_settings.min_body_vs_range)) for p in param_sets)
+    max_entry_age = sniper_settings.max_entry_age_candles
+
+    t0 = time.perf_counter()
+    loaded: Dict[str, Klines] = {}
+    prep: Dict[str, Dict[str, np.ndarray]] = {}
+    jobs = [(data_dir, sym, min_ratio, max_entry_age, horizon) for sym in symbols]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for symbol, k5, p in pool.map(_prepare_symbol, jobs, chunksize=1):
+            if k5 is not None:
+                loaded[symbol] = k5
+                prep[symbol] = p
+    if not loaded:
+        return {}, 0, 0
+
+    n_bars = sum(k5["close"].size for k5 in loaded.values())
+    n_pre = sum(p["bars"].size for p in prep.values())
+    print(
+        f"Prepare {len(loaded)} symbol, {n_bars} bar 5m, {n_pre} bar lolos pra-filter "
+        f"({time.perf_counter() - t0:.1f}s)"
+    )
+
+    offsets: Dict[str, Tuple[int, int]] = {}
+    pos = 0
+    for symbol, k5 in loaded.items():
+        offsets[symbol] = (pos, pos + k5["close"].size)
+        pos += k5["close"].size
+    columns = {name: np.concatenate([k5[name] for k5 in loaded.values()]) for name in _COLUMNS}
+    t_first = int(columns["open_time"].min())
+    t_last = int(columns["open_time"].max())
+    del loaded
+
+    shared = SharedColumns(columns)
+    del columns
+    results: Dict[int, RunResult] = {}
+    t0 = time.perf_counter()
+    try:
+        jobs_eval = [
+            (idx, replace(sniper_settings, **params), min_tier, cooldown_seconds)
+            for idx, params in enumerate(param_sets)
+        ]
+        step = max(len(jobs_eval) // 10, 1)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.spec, offsets, prep),
+        ) as pool:
+            for idx, res in pool.map(_eval_params, jobs_eval, chunksize=1):
+                results[idx] = res
+                if len(results) % step == 0:
+                    print(
+                        f"  {len(results)}/{len(jobs_eval)} kombinasi "
+                        f"({time.perf_counter() - t0:.1f}s)"
+                    )
+    finally:
+        shared.close()
+
+    return results, t_first, t_last
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Sweep parameter SniperSettings + walk-forward")
+    ap.add_argument("data_dir", help="store kline lokal atau folder CSV (format data.binance.vision)")
+    ap.add_argument("-s", "--symbols", nargs="*", help="default: semua symbol yang ada 5m-nya")
+    ap.add_argument("--fields", nargs="*", default=list(SEARCH_SPACE), choices=list(SEARCH_SPACE))
+    ap.add_argument("--grid", action="store_true", help="grid penuh atas --fields")
+    ap.add_argument("--samples", type=int, default=200, help="jumlah kombinasi acak (tanpa --grid)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--train-days", type=int, default=28)
+    ap.add_argument("--test-days", type=int, default=7)
+    ap.add_argument("--objective", default="total_r", choices=("total_r", "avg_r", "win_rate"))
+    ap.add_argument("--min-trades", type=int, default=30, help="min trade fill di window train")
+    ap.add_argument("--min-tier", default=None, help="default: sniper_settings.default_min_tier")
+    ap.add_argument("--cooldown", type=int, default=SIGNAL_COOLDOWN_SECONDS, help="cooldown detik per symbol")
+    ap.add_argument("--horizon", type=int, default=BT_HORIZON_BARS, help="maks bar 5m setelah fill")
+    ap.add_argument("--workers", type=int, default=None, help="jumlah proses (default: semua core)")
+    ap.add_argument("--out", help="simpan setting terbaik window terakhir (JSON)")
+    args = ap.parse_args()
+
+    symbols = [s.upper() for s in args.symbols] if args.symbols else list_symbols(args.data_dir)
+    if not symbols:
+        raise SystemExit(f"Tidak ada data 5m di {args.data_dir}")
+
+    min_tier = args.min_tier or sniper_settings.default_min_tier
+    param_sets = build_param_sets(args.fields, 0 if args.grid else args.samples, args.seed)
+    print(f"Optimasi {len(param_sets)} kombinasi × {len(symbols)} symbol (min tier {min_tier})...")
+
+    results, t_first, t_last = run_optimizer(
+        args.data_dir,
+        symbols,
+        param_sets,
+        min_tier,
+        cooldown_seconds=args.cooldown,
+        horizon=args.horizon,
+        workers=args.workers,
+    )
+    if not results:
+        raise SystemExit("Tidak ada data yang bisa dipakai.")
+
+    t_end = t_last + 1
+    folds = walk_forward_folds(t_first, t_end, args.train_days, args.test_days)
+    print(f"\nWalk-forward {len(folds)} fold (train {args.train_days} hari, test {args.test_days} hari):")
+
+    oos = {"filled": 0, "total_r": 0.0, "wins": 0.0}
+    base_oos = {"filled": 0, "total_r": 0.0}
+    for a, b, c in folds:
+        idx, train_m = _best(results, a, b, args.objective, args.min_trades)
+        test_m = window_metrics(results[idx], b, c)
+        base_m = window_metrics(results[0], b, c)
+        oos["filled"] += test_m["filled"]
+        oos["total_r"] += test_m["total_r"]
+        oos["wins"] += test_m["win_rate"] * test_m["filled"]
+        base_oos["filled"] += base_m["filled"]
+        base_oos["total_r"] += base_m["total_r"]
+        print(
+            f"  {_day(a)}..{_day(b)} #{idx:<4} train {_fmt(train_m)} | "
+            f"test {_day(c)}: {_fmt(test_m)} (baseline {base_m['total_r']:+.1f}R)"
+        )
+
+    if folds:
+        win = oos["wins"] / oos["filled"] * 100 if oos["filled"] else 0.0
+        print(
+            f"Out-of-sample: {oos['filled']} trade, win {win:.1f}%, total {oos['total_r']:+.1f}R "
+            f"(baseline {base_oos['filled']} trade, {base_oos['total_r']:+.1f}R)"
+        )
+
+    # setting untuk minggu depan: terbaik di window train terakhir
+    a = max(t_end - args.train_days * DAY_MS, t_first)
+    idx, m = _best(results, a, t_end, args.objective, args.min_trades)
+    best = replace(sniper_settings, **param_sets[idx])
+    print(f"\nTerbaik {_day(a)}..{_day(t_end)}: #{idx} {_fmt(m)}")
+    for field in args.fields:
+        cur = getattr(sniper_settings, field)
+        new = getattr(best, field)
+        mark = "" if cur == new else f"  (sekarang {cur})"
+        print(f"  {field:<18}: {new}{mark}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(asdict(best), f, indent=2)
+        print(f"Setting disimpan ke {args.out}")
+
+
+if __name__ == "__main__":
+    main()
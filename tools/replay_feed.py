@@ -0,0 +1,178 @@
+# tools/replay_feed.py
+# Replay rekaman frame WebSocket (WS_RECORD_DIR) lewat SniperEngine yang sama
+# dengan produksi: decode + prefilter shard, buffer 5m, agregator HTF, batcher,
+# pipeline & analyzer. Jam simulasi mengikuti recv_ts rekaman, broadcast
+# Telegram diganti penampung, tanpa REST sama sekali.
+#
+#   python -m tools.replay_feed logs/feed/20250101-000000              # secepatnya
+#   python -m tools.replay_feed <sesi> --speed 1                       # real-time
+#   python -m tools.replay_feed <sesi> --signals-out a.jsonl
+#   python -m tools.replay_feed <sesi> --compare a.jsonl               # cek regresi
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+from binance.binance_stream import SniperEngine
+from binance.binance_ws_pool import WSShard
+from binance.feed_recorder import iter_frames
+from binance.ws_decode import DECODER_NAME, is_intrabar_kline
+from config import SNIPER_BATCH_MODE, WS_KLINE_PREFILTER
+from core import clock
+from core.bot_state import state
+
+# tanpa batch: antrian analisa dikosongkan setiap selang waktu simulasi ini
+DRAIN_INTERVAL_SECONDS = 1.0
+
+Signal = Tuple[float, str]
+
+
+async def replay(
+    path: str,
+    speed: float = 0.0,
+    batch_mode: bool = SNIPER_BATCH_MODE,
+    prefilter: bool = WS_KLINE_PREFILTER,
+) -> Tuple[List[Signal], dict]:
+    """
+    speed 0 = secepatnya, 1 = real-time, 10 = 10x, dst.
+    Return (daftar sinyal (ts simulasi, teks), ringkasan).
+    """
+    sim = clock.SimClock()
+    clock.use_clock(sim)
+    state.running = True
+    state.scanning = True
+
+    signals: List[Signal] = []
+
+    def capture(result: dict) -> None:
+        signals.append((sim(), result["message"]))
+
+    engine = SniperEngine(broadcast_fn=capture, batch_mode=batch_mode, replay=True)
+    engine.start()
+
+    def on_message(data: dict, recv_ts: float) -> None:
+        # frame !miniTicker@arr ikut terekam; universe replay = symbol di rekaman
+        if "@kline_" in data.get("stream", ""):
+            engine.on_kline(data, recv_ts)
+
+    shard = WSShard(
+        "replay",
+        [],
+        on_message,
+        skip_raw=is_intrabar_kline if prefilter else None,
+    )
+
+    first_ts: Optional[float] = None
+    last_ts = 0.0
+    last_drain = 0.0
+    wall0 = time.monotonic()
+    t0 = time.perf_counter()
+
+    try:
+        for recv_ts, raw in iter_frames(path):
+            if first_ts is None:
+                first_ts = last_drain = recv_ts
+
+            if speed > 0:
+                delay = wall0 + (recv_ts - first_ts) / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            # window batch / selang drain lewat menurut jam simulasi →
+            # selesaikan analisa dulu (deterministik: sinyal bar N selesai
+            # sebelum close bar N+1 diproses, sama seperti live normal)
+            if engine.batcher is not None:
+                if engine.batcher.flush_due(recv_ts):
+                    await engine.drain()
+            elif recv_ts - last_drain >= DRAIN_INTERVAL_SECONDS:
+                await engine.drain()
+                last_drain = recv_ts
+
+            sim.set(recv_ts)
+            last_ts = recv_ts
+            shard._handle_raw(raw, recv_ts)
+
+        await engine.drain()
+    finally:
+        await engine.stop()
+        clock.use_wall_clock()
+
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "frames": shard.msg_count,
+        "skipped": shard.skipped,
+        "sim_seconds": round(last_ts - first_ts, 1) if first_ts is not None else 0.0,
+        "wall_seconds": round(elapsed, 2),
+        "frames_per_sec": round(shard.msg_count / elapsed, 1) if elapsed > 0 else 0.0,
+        "symbols": len(engine.ohlc_mgr.symbols()),
+        "signals": len(signals),
+        "pipeline": engine.pipeline.stats(),
+    }
+    return signals, summary
+
+
+def _load_signals(path: str) -> List[Signal]:
+    out: List[Signal] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                out.append((float(row["ts"]), row["text"]))
+    return out
+
+
+def _compare(got: List[Signal], expected: List[Signal]) -> bool:
+    got_s = sorted(got)
+    exp_s = sorted(expected)
+    if got_s == exp_s:
+        print(f"IDENTIK: {len(got_s)} sinyal sama persis.")
+        return True
+
+    print(f"BERBEDA: {len(got_s)} sinyal vs {len(exp_s)} di referensi.")
+    only_got = [s for s in got_s if s not in exp_s]
+    only_exp = [s for s in exp_s if s not in got_s]
+    for ts, text in only_got[:5]:
+        print(f"  + [{ts:.3f}] {text.splitlines()[0] if text else ''}")
+    for ts, text in only_exp[:5]:
+        print(f"  - [{ts:.3f}] {text.splitlines()[0] if text else ''}")
+    return False
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay rekaman feed WebSocket lewat SniperEngine")
+    ap.add_argument("path", help="folder sesi rekaman atau satu file chunk")
+    ap.add_argument("--speed", type=float, default=0.0, help="0 = secepatnya, 1 = real-time")
+    ap.add_argument("--no-batch", action="store_true", help="matikan batch detector")
+    ap.add_argument("--no-prefilter", action="store_true", help="decode frame intrabar juga")
+    ap.add_argument("--signals-out", help="simpan sinyal (JSON lines)")
+    ap.add_argument("--compare", help="bandingkan dengan file --signals-out sebelumnya")
+    args = ap.parse_args()
+
+    print(f"Replay {args.path} (decoder {DECODER_NAME})...")
+    signals, summary = asyncio.run(
+        replay(
+            args.path,
+            speed=args.speed,
+            batch_mode=SNIPER_BATCH_MODE and not args.no_batch,
+            prefilter=WS_KLINE_PREFILTER and not args.no_prefilter,
+        )
+    )
+
+    for key, val in summary.items():
+        print(f"  {key:<15}: {val}")
+
+    if args.signals_out:
+        with open(args.signals_out, "w", encoding="utf-8") as f:
+            for ts, text in sorted(signals):
+                f.write(json.dumps({"ts": ts, "text": text}, ensure_ascii=False) + "\n")
+        print(f"{len(signals)} sinyal disimpan ke {args.signals_out}")
+
+    if args.compare:
+        ok = _compare(signals, _load_signals(args.compare))
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
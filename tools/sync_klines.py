@@ -0,0 +1,132 @@
+# tools/sync_klines.py
+# Sinkron store kline lokal (binance/kline_store.py) secara incremental:
+# per symbol & timeframe hanya bar setelah open_time terakhir yang diunduh
+# (halaman 1500 bar, lewat limiter weight bersama). Symbol baru diisi mundur
+# --days hari.
+#
+#   python -m tools.sync_klines                              # universe sniper, 5m/15m/1h
+#   python -m tools.sync_klines -s BTCUSDT ETHUSDT --days 365
+#   python -m tools.sync_klines --dir data/klines --intervals 5m
+
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+from binance import binance_http
+from binance.binance_pairs import get_usdt_pairs
+from binance.binance_ratelimit import PRIORITY_BACKFILL, format_weight_stats
+from binance.kline_store import INTERVAL_MS, STORE_FETCH_LIMIT, KlineStore
+from config import KLINE_STORE_DIR
+from sniper.sniper_settings import sniper_settings
+
+# request REST paralel (weight tetap dibatasi limiter)
+SYNC_CONCURRENCY = 8
+
+# history awal (hari) untuk symbol / timeframe yang belum ada di store
+SYNC_DEFAULT_DAYS = 30
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+async def sync_one(
+    store: KlineStore,
+    symbol: str,
+    interval: str,
+    days: int,
+) -> Tuple[int, int]:
+    """
+    Return (bar ditambahkan, request REST).
+    """
+    ms = INTERVAL_MS[interval]
+    last = store.last_open_time(symbol, interval)
+    now_ms = int(time.time() * 1000)
+    start = last + ms if last is not None else now_ms - days * DAY_MS
+    start -= start % ms
+
+    added = 0
+    requests = 0
+    # hanya bar yang sudah close (start + ms <= sekarang)
+    while start + ms <= now_ms:
+        rows = await binance_http.fetch_klines(
+            symbol, interval, STORE_FETCH_LIMIT, start, priority=PRIORITY_BACKFILL
+        )
+        requests += 1
+        if not rows:
+            break
+        n = store.append(symbol, interval, rows)
+        added += n
+        last = store.last_open_time(symbol, interval)
+        if n == 0 or last is None or len(rows) < STORE_FETCH_LIMIT:
+            break
+        start = last + ms
+    return added, requests
+
+
+async def sync_store(
+    store: KlineStore,
+    symbols: List[str],
+    intervals: List[str],
+    days: int = SYNC_DEFAULT_DAYS,
+    concurrency: int = SYNC_CONCURRENCY,
+) -> None:
+    sem = asyncio.Semaphore(concurrency)
+    done = 0
+    total = len(symbols) * len(intervals)
+
+    async def _one(sym: str, interval: str) -> Tuple[int, int]:
+        nonlocal done
+        async with sem:
+            try:
+                res = await sync_one(store, sym, interval, days)
+            except Exception as e:
+                print(f"[SYNC ERROR] {sym} {interval}: {e}")
+                res = (0, 0)
+            done += 1
+            if done % 50 == 0:
+                print(f"  {done}/{total} selesai")
+            return res
+
+    t0 = time.time()
+    try:
+        results = await asyncio.gather(*(_one(s, iv) for s in symbols for iv in intervals))
+    finally:
+        await binance_http.close_client()
+
+    bars = sum(r[0] for r in results)
+    reqs = sum(r[1] for r in results)
+    print(
+        f"Sync {len(symbols)} symbol × {'/'.join(intervals)}: {bars} bar baru, "
+        f"{reqs} request ({time.time() - t0:.1f}s)"
+    )
+    print(format_weight_stats().rstrip())
+
+
+async def _resolve_symbols(args) -> List[str]:
+    if args.symbols:
+        return [s.upper() for s in args.symbols]
+    pairs = await get_usdt_pairs(sniper_settings.max_pairs, sniper_settings.min_volume_usdt)
+    return [p.upper() for p in pairs]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Sinkron incremental store kline lokal dari REST")
+    ap.add_argument("--dir", default=KLINE_STORE_DIR or "data/klines", help="folder store")
+    ap.add_argument("-s", "--symbols", nargs="*", help="default: universe sniper (volume 24h)")
+    ap.add_argument("--intervals", nargs="*", default=["5m", "15m", "1h"], choices=list(INTERVAL_MS))
+    ap.add_argument("--days", type=int, default=SYNC_DEFAULT_DAYS, help="history awal symbol baru")
+    ap.add_argument("--concurrency", type=int, default=SYNC_CONCURRENCY)
+    args = ap.parse_args()
+
+    store = KlineStore(args.dir)
+
+    async def _run() -> None:
+        symbols = await _resolve_symbols(args)
+        print(f"Sync store {args.dir}: {len(symbols)} symbol...")
+        await sync_store(store, symbols, args.intervals, args.days, args.concurrency)
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()